@@ -1,4 +1,4 @@
-from .beluga_problem import BelugaProblem, BelugaProblemEncoder, BelugaProblemDecoder
+from .beluga_problem import BelugaProblem, BelugaProblemEncoder, BelugaProblemDecoder, ScenarioView
 from .jigs import Jig, JigType
 from .rack import Rack
 from .trailer import Trailer
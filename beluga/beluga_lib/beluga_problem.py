@@ -1,6 +1,8 @@
 from typing import Dict
 import json
 
+from . import json_codec
+
 from .jigs import Jig, JigType
 from .rack import Rack
 from .trailer import Trailer
@@ -31,6 +33,25 @@ class BelugaProblem:
         self.tt_prob : list[float] = None
 
 
+    def clone(self) -> "BelugaProblem":
+        """Structural copy of the problem: jigs, racks, trailers, flights and
+        production lines are copied, while jig types and names are shared. Much
+        cheaper than copy.deepcopy(), with the same result as long as jig types
+        are not modified."""
+        res = BelugaProblem()
+        res.trailers_beluga = [t.clone() for t in self.trailers_beluga]
+        res.trailers_factory = [t.clone() for t in self.trailers_factory]
+        res.hangars = list(self.hangars)
+        res.jig_types = dict(self.jig_types)
+        res.jigs = {name: j.clone() for name, j in self.jigs.items()}
+        res.racks = [r.clone(res.jigs) for r in self.racks]
+        res.flights = [f.clone(res.jigs) for f in self.flights]
+        res.production_lines = [pl.clone(res.jigs) for pl in self.production_lines]
+        res.tt_last = None if self.tt_last is None else list(self.tt_last)
+        res.tt_next = None if self.tt_next is None else list(self.tt_next)
+        res.tt_prob = None if self.tt_prob is None else list(self.tt_prob)
+        return res
+
     def occupancy_rate(self) -> float:
         ocr = []
         for rack in self.racks:
@@ -41,11 +62,49 @@ class BelugaProblem:
 
 
 
+class ScenarioView(BelugaProblem):
+    """Scenario of a problem, i.e. the problem with another flight ordering and
+    possibly other arrival times, which can be used wherever a BelugaProblem is.
+    The view only stores its own flight list and reads all the other attributes
+    from the wrapped problem, which is shared by all its views. Assigning an
+    attribute of the view only changes the view (copy-on-write), but the objects
+    it shares with the problem (racks, jigs, etc.) must not be modified in place.
+
+    Args:
+        problem (BelugaProblem): wrapped problem (the problem wrapped by a view
+        passed as argument is used instead)
+        flights (list[Flight]): flights of the problem in scenario order
+        arrival_times (list[float], optional): arrival times of the flights, which
+        override their scheduled arrivals. Defaults to None.
+    """
+
+    def __init__(self, problem: BelugaProblem, flights: list[Flight], arrival_times: list[float] = None):
+        # The attributes of the problem are not copied, see __getattr__
+        self.problem = problem.problem if isinstance(problem, ScenarioView) else problem
+        if arrival_times is not None:
+            flights = [f.with_arrival(t) for f, t in zip(flights, arrival_times)]
+        self.flights = list(flights)
+
+    def __getattr__(self, name):
+        # Only called for the attributes which are not set on the view
+        try:
+            problem = self.__dict__['problem']
+        except KeyError:
+            raise AttributeError(name)
+        return getattr(problem, name)
+
+
 class BelugaProblemEncoder(json.JSONEncoder):
 
     def default(self, obj):
-        if isinstance(obj, (Rack, JigType, ProductionLine, Trailer)):
-            return obj.__dict__
+        if isinstance(obj, Rack):
+            return {'name': obj.name, 'size': obj.size, 'jigs': list(obj.jigs)}
+        if isinstance(obj, JigType):
+            return {'name': obj.name, 'size_empty': obj.size_empty, 'size_loaded': obj.size_loaded}
+        if isinstance(obj, ProductionLine):
+            return {'name': obj.name, 'schedule': obj.schedule}
+        if isinstance(obj, Trailer):
+            return {'name': obj.name}
         if isinstance(obj, Jig):
             return obj.name
         if isinstance(obj, BelugaProblem):
@@ -121,7 +180,7 @@ class BelugaProblemEncoder(json.JSONEncoder):
 class BelugaProblemDecoder(json.JSONDecoder):
 
     def decode(self, json_str) -> BelugaProblem:
-        obj = json.loads(json_str)
+        obj = json_codec.loads(json_str)
         beluga_problem = BelugaProblem()
 
         beluga_problem.jig_types = {key: JigType(**t) for key, t in obj.get('jig_types', {}).items()}
@@ -1,13 +1,29 @@
+import sys
+
 from .jigs import Jig, JigType
 
 class Flight:
 
+    __slots__ = ("name", "incoming", "outgoing", "scheduled_arrival")
+
     def __init__(self, name, incoming: list[Jig] = [], outgoing: list[JigType] =[]) -> None:
-        self.name = name
+        self.name = sys.intern(name)
         self.incoming : list[Jig] = incoming
         self.outgoing : list[JigType] = outgoing
         self.scheduled_arrival = None
 
+    def clone(self, jigs: dict[str, Jig]) -> "Flight":
+        """Copy of the flight carrying the jigs of the given map"""
+        res = Flight(self.name, [jigs[j.name] for j in self.incoming], list(self.outgoing))
+        res.scheduled_arrival = self.scheduled_arrival
+        return res
+
+
+    def with_arrival(self, scheduled_arrival) -> "Flight":
+        """Shallow copy of the flight (sharing its jig lists) arriving at the given time"""
+        res = Flight(self.name, self.incoming, self.outgoing)
+        res.scheduled_arrival = scheduled_arrival
+        return res
 
     def add_incoming_jig(self, jigs: list[Jig]):
         self.incoming.append(type)
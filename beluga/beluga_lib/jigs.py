@@ -1,10 +1,19 @@
+import sys
+
+
 class JigType:
 
+    __slots__ = ("name", "size_empty", "size_loaded")
+
     def __init__(self, name: str, size_empty: int, size_loaded: int) -> None:
-        self.name = name
+        self.name = sys.intern(name)
         self.size_empty = size_empty
         self.size_loaded = size_loaded
 
+    def clone(self) -> "JigType":
+        # Jig types are never modified, hence shared by the clones of a problem
+        return self
+
     def __repr__(self):
         return  self.name + " (" + str(self.size_empty) + \
         "/" + str(self.size_loaded) + ")" 
@@ -15,10 +24,29 @@ class JigType:
 
 class Jig:
 
+    __slots__ = ("name", "type", "rack", "_empty")
+
     def __init__(self, name: str, type: JigType, empty=False) -> None:
-        self.name = name
+        self.name = sys.intern(name)
         self.type = type
-        self.empty = empty
+        # Rack holding the jig (if any), notified when the jig size changes
+        self.rack = None
+        self._empty = empty
+
+    @property
+    def empty(self) -> bool:
+        return self._empty
+
+    @empty.setter
+    def empty(self, empty: bool) -> None:
+        old_size = self.size()
+        self._empty = empty
+        if self.rack is not None:
+            self.rack.jig_size_changed(old_size, self.size())
+
+    def clone(self) -> "Jig":
+        """Copy of the jig, held by no rack"""
+        return Jig(self.name, self.type, self._empty)
 
     def size(self) -> int:
         return self.type.size_empty if self.empty else self.type.size_loaded
@@ -0,0 +1,55 @@
+import json
+from collections.abc import Iterable, Iterator
+from typing import Any, TextIO
+
+try:
+    import orjson
+except ImportError:
+    # Optional dependency: the standard json module is used instead
+    orjson = None
+
+
+def loads(s: str | bytes) -> Any:
+    """Parses a JSON document, with orjson if it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # E.g. NaN values, which orjson rejects but json.dumps produces
+            pass
+    return json.loads(s)
+
+
+def _dump_value(fp: TextIO, value: Any, indent: int, level: int) -> None:
+    if isinstance(value, Iterator):
+        _dump_array(fp, value, indent, level)
+    else:
+        fp.write(json.dumps(value, indent=indent).replace("\n", "\n" + " " * (indent * level)))
+
+
+def _dump_array(fp: TextIO, items: Iterator[Any], indent: int, level: int) -> None:
+    empty = True
+    for item in items:
+        fp.write(("[" if empty else ",") + "\n" + " " * (indent * (level + 1)))
+        _dump_value(fp, item, indent, level + 1)
+        empty = False
+    fp.write("[]" if empty else "\n" + " " * (indent * level) + "]")
+
+
+def dump_object(fp: TextIO, items: Iterable[tuple[str, Any]], indent: int = 4) -> None:
+    """Writes a JSON object incrementally: the values which are iterators are
+    written as arrays item by item, so that the whole document never has to be
+    held in memory. The output is the same as json.dump(dict(items), fp, indent=indent)
+    with the iterators replaced by lists.
+
+    Args:
+        fp (TextIO): output stream
+        items (Iterable[tuple[str, Any]]): the (key, value) pairs of the object
+        indent (int, optional): indentation level. Defaults to 4.
+    """
+    empty = True
+    for key, value in items:
+        fp.write(("{" if empty else ",") + "\n" + " " * indent + json.dumps(key) + ": ")
+        _dump_value(fp, value, indent, 1)
+        empty = False
+    fp.write("{}" if empty else "\n}")
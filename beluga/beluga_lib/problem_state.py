@@ -1,4 +1,5 @@
 from .beluga_problem import BelugaProblem
+from . import json_codec
 import json
 
 class BelugaProblemState:
@@ -91,7 +92,50 @@ class BelugaProblemState:
             raise ValueError(f'Invalid jig "{jig}"')
         self.hangar_host[hangar] = jig
 
+    def _is_valid_json_obj(self, json_obj : dict) -> bool:
+        # Validation in bulk of the names referenced by a JSON state
+        flights = self.flight_map.keys()
+        jigs = self.jig_map.keys()
+        try:
+            return (json_obj['current_beluga'] in flights
+                    and flights >= set(json_obj['last_belugas'])
+                    and jigs >= set(json_obj['beluga_contents'])
+                    and self.pl_map.keys() >= json_obj['production_line_deliveries'].keys()
+                    and all(jigs >= set(l) for l in json_obj['production_line_deliveries'].values())
+                    and self.rack_map.keys() >= json_obj['rack_contents'].keys()
+                    and all(jigs >= set(l) for l in json_obj['rack_contents'].values())
+                    and self.trailer_map.keys() >= json_obj['trailer_load'].keys()
+                    and jigs >= set(j for j in json_obj['trailer_load'].values() if j is not None)
+                    and jigs >= json_obj['jig_empty'].keys()
+                    and 'trailer_location' in json_obj
+                    and self.hangar_host.keys() >= json_obj['hangar_host'].keys()
+                    and jigs >= set(j for j in json_obj['hangar_host'].values() if j is not None))
+        except (KeyError, TypeError, AttributeError):
+            return False
+
     def from_json_obj(json_obj : dict, prb : BelugaProblem):
+        res = BelugaProblemState(prb)
+        if not res._is_valid_json_obj(json_obj):
+            # Report the error as the per-field setters do
+            return BelugaProblemState._from_json_obj_checked(json_obj, prb)
+        # All names are valid: set the fields directly
+        res.current_beluga = res.flight_map[json_obj['current_beluga']]
+        res.last_belugas = [res.flight_map[f] for f in json_obj['last_belugas']]
+        jig_map = res.jig_map
+        res.beluga_contents = [jig_map[j] for j in json_obj['beluga_contents']]
+        for pl, jigs in json_obj['production_line_deliveries'].items():
+            res.production_line_deliveries[pl] = [jig_map[j] for j in jigs]
+        for rack, jigs in json_obj['rack_contents'].items():
+            res.rack_contents[rack] = [jig_map[j] for j in jigs]
+        for trailer, jig in json_obj['trailer_load'].items():
+            res.trailer_load[trailer] = None if jig is None else jig_map[jig]
+        res.jig_empty.update(json_obj['jig_empty'])
+        for trailer, (loc, side) in json_obj['trailer_location'].items():
+            res.trailer_location[trailer] = (loc, side)
+        res.hangar_host.update(json_obj['hangar_host'])
+        return res
+
+    def _from_json_obj_checked(json_obj : dict, prb : BelugaProblem):
         # Start with an initial state
         res = BelugaProblemState(prb)
         # Set current_beluga
@@ -139,7 +183,7 @@ class BelugaProblemState:
         return res
 
     def from_json_str(s : str, prb : BelugaProblem):
-        return BelugaProblemState.from_json_obj(json.loads(s), prb)
+        return BelugaProblemState.from_json_obj(json_codec.loads(s), prb)
 
     def to_json_obj(self):
         res = {}
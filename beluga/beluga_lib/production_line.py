@@ -1,12 +1,20 @@
+import sys
+
 from .jigs import Jig
 from typing import List
 
 class ProductionLine:
 
+    __slots__ = ("name", "schedule")
+
     def __init__(self, name: str, schedule: list[Jig] = []) -> None:
-        self.name = name
+        self.name = sys.intern(name)
         self.schedule : list[Jig] = schedule
 
+    def clone(self, jigs: dict[str, Jig]) -> "ProductionLine":
+        """Copy of the production line scheduling the jigs of the given map"""
+        return ProductionLine(self.name, [jigs[j.name] for j in self.schedule])
+
     def add_jig_to_schedule(self, jig: Jig):
         self.schedule.append(jig)
 
@@ -1,22 +1,80 @@
+import sys
+from collections import deque
+
 from .jigs import Jig
 
+class RackJigs(deque):
+    """Jigs of a rack, from the Beluga side (index 0) to the factory side
+    (index -1). A deque, hence with O(1) insertions and removals on both sides,
+    which also supports the read accesses of lists (slicing, comparisons)."""
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        return super().__getitem__(index)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, list):
+            return list(self) == other
+        return super().__eq__(other)
+
+    def __ne__(self, other) -> bool:
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
 class Rack:
 
-    def __init__(self, name: str, size : int, jigs: list[Jig] =[]) -> None:
-        self.name: str = name
+    __slots__ = ("name", "size", "jigs", "_occupied_space")
+
+    def __init__(self, name: str, size : int, jigs: list[Jig] = None) -> None:
+        self.name: str = sys.intern(name)
         self.size: int = size
         # 0: Beluga side
         # -1: factory side
-        self.jigs: list[Jig] = jigs
+        self.jigs: RackJigs = RackJigs(jigs if jigs is not None else [])
+        # Running sum of the sizes of the jigs, kept up to date by the methods
+        # adding/removing jigs and by the jigs when they are emptied or filled
+        self._occupied_space: int = 0
+        for jig in self.jigs:
+            self._hold(jig)
+
+    def clone(self, jigs: dict[str, Jig]) -> "Rack":
+        """Copy of the rack holding the jigs of the given map"""
+        return Rack(self.name, self.size, [jigs[j.name] for j in self.jigs])
 
     def is_empty(self) -> bool:
         return len(self.jigs) == 0
 
+    def _hold(self, jig: Jig) -> None:
+        jig.rack = self
+        self._occupied_space += jig.size()
+
+    def _release(self, jig: Jig) -> Jig:
+        if jig.rack is self:
+            jig.rack = None
+        self._occupied_space -= jig.size()
+        return jig
+
+    def jig_size_changed(self, old_size: int, new_size: int) -> None:
+        """Called by a jig of the rack when it is emptied or filled"""
+        self._occupied_space += new_size - old_size
+
     def add_jig_factory_side(self, jig: Jig) -> None:
         self.jigs.append(jig)
+        self._hold(jig)
 
     def add_jig_beluga_side(self, jig: Jig) -> None:
-        self.jigs.insert(0,jig)
+        self.jigs.appendleft(jig)
+        self._hold(jig)
+
+    def remove_jig_factory_side(self) -> Jig:
+        return self._release(self.jigs.pop())
+
+    def remove_jig_beluga_side(self) -> Jig:
+        return self._release(self.jigs.popleft())
 
     def next_jig_factory_side(self) -> Jig:
         return self.jigs[-1]
@@ -28,10 +86,10 @@ class Rack:
         return self.free_space() >= jig.size()
     
     def free_space(self) -> int:
-        return self.size - self.occupied_space()
+        return self.size - self._occupied_space
     
     def occupied_space(self) -> int:
-        return sum([j.size() for j in self.jigs])
+        return self._occupied_space
     
     def __repr__(self) -> str:
-        return self.name 
\ No newline at end of file
+        return self.name 
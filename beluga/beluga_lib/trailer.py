@@ -1,7 +1,15 @@
+import sys
+
+
 class Trailer:
 
+    __slots__ = ("name",)
+
     def __init__(self, name: str) -> None:
-        self.name = name
+        self.name = sys.intern(name)
+
+    def clone(self) -> "Trailer":
+        return Trailer(self.name)
 
     def __repr__(self) -> str:
         return self.name
\ No newline at end of file
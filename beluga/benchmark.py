@@ -0,0 +1,223 @@
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import time
+
+import pandas as pd
+
+from beluga_lib.beluga_problem import BelugaProblemDecoder
+from skd_domains.profiling import Profiler
+
+from simulation import make_controller, make_domain, run_episode
+
+
+COLUMNS = [
+    "problem",
+    "controller",
+    "domain_seed",
+    "controller_seed",
+    "total_reward",
+    "steps",
+    "goal_reached",
+    "wall_time",
+    "error",
+]
+# The table also has a '<phase>_time' column with the total time of each profiled
+# phase of the run (see Profiler), e.g. 'problem_load_time', 'encode_time',
+# 'controller_decision_time' or 'domain_step_time'
+
+# Problem loaded by the current worker, reused by consecutive runs on the same problem
+_worker_cache = {}
+
+
+def seed_range(value):
+    """
+    Parse a seed range given either as a single seed 'N' or as a range 'A:B'
+    (B excluded).
+    """
+    if ":" in value:
+        start, stop = value.split(":")
+        return list(range(int(start), int(stop)))
+    return [int(value)]
+
+
+def reseed_domain(domain, domain_seed):
+    """
+    Put a domain built by make_domain() in the state of a fresh one built with the
+    given seed, without compiling the problem again.
+    """
+    domain.original_seed = domain_seed
+    domain._current_seed = domain_seed
+    # Like the first episode sampled by make_domain()
+    domain._state_reset()
+
+
+def _load_problem(problem_path, domain_seed, profiler):
+    """
+    Return the SkdSPDDLDomain of the problem with the given seed, which gives the same
+    episodes as the domain built by simulation.py with this seed. The problem is loaded
+    and compiled once per worker, and the domain records its phases in the profiler.
+    """
+    if _worker_cache.get("path") != problem_path:
+        if "domain" in _worker_cache:
+            _worker_cache["domain"].cleanup()
+        _worker_cache.clear()
+        with profiler.phase("problem_load"):
+            with open(problem_path, "r") as fp:
+                inst = json.load(fp, cls=BelugaProblemDecoder)
+        problem_name = os.path.basename(problem_path)
+        domain = make_domain(inst, problem_name, os.path.dirname(problem_path), domain_seed, profiler)
+        _worker_cache.update(path=problem_path, domain=domain)
+        return domain
+    domain = _worker_cache["domain"]
+    domain.set_profiler(profiler)
+    reseed_domain(domain, domain_seed)
+    return domain
+
+
+def run(task):
+    """
+    Run one simulation described by a (problem path, controller name, domain seed,
+    controller seed, max steps) tuple and return its row of the results table.
+    """
+    problem_path, controller_name, domain_seed, controller_seed, max_steps = task
+    row = {
+        "problem": os.path.basename(problem_path),
+        "controller": controller_name,
+        "domain_seed": domain_seed,
+        "controller_seed": controller_seed,
+        "error": "",
+    }
+    profiler = Profiler()
+    start_time = time.perf_counter()
+    try:
+        domain = _load_problem(problem_path, domain_seed, profiler)
+        controller, _ = make_controller(controller_name, domain, controller_seed)
+        row.update(run_episode(domain, controller, max_steps))
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["wall_time"] = time.perf_counter() - start_time
+    row.update((f"{name}_time", stats.total) for name, stats in profiler.phases.items())
+    return row
+
+
+def write_results(rows, path):
+    """
+    Write the results table to a Parquet file, or to a CSV file if the path ends
+    with '.csv'.
+    """
+    table = pd.DataFrame(rows)
+    phase_columns = sorted(c for c in table.columns if c not in COLUMNS)
+    table = table.reindex(columns=COLUMNS + phase_columns)
+    # Phases which did not happen in a run, e.g. the compilation of an already
+    # loaded problem
+    table[phase_columns] = table[phase_columns].fillna(0.0)
+    table = table.sort_values(["problem", "controller", "domain_seed", "controller_seed"])
+    if path.endswith(".csv"):
+        table.to_csv(path, index=False)
+    else:
+        table.to_parquet(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Batch evaluation of controllers on Beluga problems",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument(
+        "--problems",
+        type=str,
+        nargs="+",
+        default=[os.path.join("problems", "*.json")],
+        help="Glob patterns of the problem JSON files"
+    )
+
+    parser.add_argument(
+        "--controllers",
+        type=str,
+        nargs="+",
+        choices=["random", "median", "custom"],
+        default=["random"],
+        help="Controllers to evaluate"
+    )
+
+    parser.add_argument(
+        "--domain_seeds",
+        type=seed_range,
+        default=[0],
+        help="Seeds for the domain, either 'N' or a range 'A:B'"
+    )
+
+    parser.add_argument(
+        "--controller_seeds",
+        type=seed_range,
+        default=[0],
+        help="Seeds for the controllers, either 'N' or a range 'A:B'"
+    )
+
+    parser.add_argument(
+        "--max_simulation_steps",
+        type=int,
+        default=1000,
+        help="Maximum number of simulation steps"
+    )
+
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes"
+    )
+
+    parser.add_argument(
+        "-o", "--output",
+        type=str,
+        default="benchmark_results.parquet",
+        help="Parquet file in which the results table is written (CSV if it ends with '.csv')"
+    )
+
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Print each result as soon as it is available"
+    )
+
+    args = parser.parse_args()
+
+    problems = sorted(set(p for pattern in args.problems for p in glob.glob(pattern)))
+    if len(problems) == 0:
+        parser.error("no problem matches the given patterns")
+
+    # Runs are grouped by problem so that each worker mostly compiles a problem once
+    tasks = [
+        (problem, controller, domain_seed, controller_seed, args.max_simulation_steps)
+        for problem in problems
+        for controller in args.controllers
+        for domain_seed in args.domain_seeds
+        for controller_seed in args.controller_seeds
+    ]
+    num_workers = max(1, min(args.num_workers, len(tasks)))
+    chunksize = max(1, len(tasks) // (4 * num_workers))
+
+    start_time = time.time()
+    rows = []
+    with mp.Pool(num_workers) as pool:
+        for row in pool.imap_unordered(run, tasks, chunksize=chunksize):
+            rows.append(row)
+            if args.verbose:
+                print(f"[{len(rows)}/{len(tasks)}] {row['problem']} {row['controller']} "
+                      f"ds={row['domain_seed']} cs={row['controller_seed']}: "
+                      f"reward={row.get('total_reward')} steps={row.get('steps')} {row['error']}")
+    end_time = time.time()
+
+    write_results(rows, args.output)
+
+    print(f"{len(rows)} simulations completed in {end_time - start_time:.2f} seconds")
+    print(f"Results written to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
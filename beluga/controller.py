@@ -7,6 +7,7 @@ from plado.semantics.task import Action as PladoAction
 from plado.pddl.arguments import ArgumentDefinition
 from skd_domains.skd_base_domain import State, Action, ActionSpace, ObservationSpace
 from skd_domains.skd_spddl_domain import SkdSPDDLDomain
+from skd_domains.profiling import Profiler
 
 
 class Predicate:
@@ -113,6 +114,9 @@ class Controller:
         
     def domain(self) -> SkdSPDDLDomain:
         return self._domain
+
+    def profiler(self) -> Profiler:
+        return self._domain.profiler
     
     def get_available_actions(self, observation: State) -> list[Action]:
         return self._domain.get_applicable_actions(observation).get_elements()
@@ -13,6 +13,7 @@ parser.add_argument('-p', dest="probabilistic", help="probabilistic encoding", a
 parser.add_argument('-i', help="inout folder of json problem definitions", default=None, required=True)
 parser.add_argument('-o', help="output folder to store the domain file and problem files", default=None, required=True)
 parser.add_argument('-y', dest="no_questions", help="just run", action='store_true' , required=False)
+parser.add_argument('-c', dest="skip_comments", help="do not write comments in the PDDL files", action='store_true', required=False)
 
 args = parser.parse_args()
 
@@ -45,7 +46,7 @@ os.system("rm -f " + out_folder + "/*")
 for problem in os.listdir(input_folder):
     if num_instances % 10 == 0 and num_instances > 0:
         print(str(num_instances) + "/" + str(final_num_instances))
-    run(os.path.join(input_folder, problem), variant, out_folder)
+    run(os.path.join(input_folder, problem), variant, out_folder, args.skip_comments)
     num_instances += 1
 
 print("Number of encoded instances: " + str(num_instances))
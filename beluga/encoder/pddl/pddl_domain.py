@@ -1,4 +1,5 @@
-from typing import List
+import io
+from typing import List, TextIO
 
 from .pddl_predicate_def import PDDLPredicateDef
 
@@ -33,7 +34,15 @@ class PDDLDomain:
         assert name in self.functions, "Function " + name + " not defined in domain!"
         return self.functions[name]
 
-    def to_pddl(self, name: str) -> str:
+    def write_pddl(self, out: TextIO, name: str, skip_comments: bool = False) -> None:
+        """Writes the domain in PDDL to a text stream (e.g. a file or an io.StringIO)
+
+        Args:
+            out (TextIO): output stream
+            name (str): name of the domain
+            skip_comments (bool, optional): do not write the comments of the
+            predicates and functions. Defaults to False.
+        """
 
         sorted_types = list(self.types.values())
         sorted_types.sort()
@@ -47,12 +56,19 @@ class PDDLDomain:
         sorted_function = list(self.functions.values())
         sorted_function.sort()
 
-        s = f"(define (domain {name})\n"
-        s += f"  (:requirements {' '.join(self.requirements)})\n"
-        s += "  (:types\n\t\t" + "\n\t\t".join(t.to_pddl() for t in sorted_types) + "\n)\n"
-        s += "  (:constants\n\t\t" + "\n\t\t".join(constant.to_pddl() for constant in sorted_constants) + "\n\t)\n\n\n"
-        s += "  (:predicates\n\t\t" + "\n\t\t".join(predicate.to_pddl() for predicate in sorted_predicates) + "\n\t)\n\n\n"
-        s += "  (:functions\n\t\t" + "\n\t\t".join(f"{function.to_pddl()}" for function in sorted_function) + "\n\t)\n\n\n"
-        s += "\n\n\n".join(action.to_pddl() for action in self.actions)
-        s += ")"
-        return s
\ No newline at end of file
+        out.write(f"(define (domain {name})\n")
+        out.write(f"  (:requirements {' '.join(self.requirements)})\n")
+        out.write("  (:types\n\t\t" + "\n\t\t".join(t.to_pddl() for t in sorted_types) + "\n)\n")
+        out.write("  (:constants\n\t\t" + "\n\t\t".join(constant.to_pddl() for constant in sorted_constants) + "\n\t)\n\n\n")
+        out.write("  (:predicates\n\t\t" + "\n\t\t".join(predicate.to_pddl(not skip_comments) for predicate in sorted_predicates) + "\n\t)\n\n\n")
+        out.write("  (:functions\n\t\t" + "\n\t\t".join(f"{function.to_pddl(not skip_comments)}" for function in sorted_function) + "\n\t)\n\n\n")
+        for i, action in enumerate(self.actions):
+            if i > 0:
+                out.write("\n\n\n")
+            out.write(action.to_pddl())
+        out.write(")")
+
+    def to_pddl(self, name: str, skip_comments: bool = False) -> str:
+        out = io.StringIO()
+        self.write_pddl(out, name, skip_comments)
+        return out.getvalue()
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, TextIO
 
 class PDDLLiteral(ABC):
     @abstractmethod
@@ -19,4 +20,18 @@ class PDDLComment(PDDLLiteral):
         return "; " + self.text
 
     def __repr__(self) -> str:
-        return self.text
\ No newline at end of file
+        return self.text
+
+
+def write_literals(
+    out: TextIO, literals: Iterable[PDDLLiteral], separator: str, skip_comments: bool = False
+) -> None:
+    """Writes literals to a text stream, separated as by `separator.join(...)`"""
+    first = True
+    for literal in literals:
+        if skip_comments and isinstance(literal, PDDLComment):
+            continue
+        if not first:
+            out.write(separator)
+        out.write(literal.to_pddl())
+        first = False
@@ -5,21 +5,29 @@ class PDDLNumericFluent(PDDLLiteral):
     def __init__(self, operation: str, *args: PDDLLiteral):
         self.args = list(args)
         self.operation = operation
+        # Fluents are not modified once created: their texts are computed on
+        # first use and cached, since the encoder sorts and hashes them
+        self._repr = None
+        self._pddl = None
 
     def __repr__(self) -> str:
-        return "(" + ",".join(p.to_pddl() for p in self.args) + ") " + self.operation
+        if self._repr is None:
+            self._repr = "(" + ",".join(p.to_pddl() for p in self.args) + ") " + self.operation
+        return self._repr
 
     def to_pddl(self) -> str:
-        return (
-            "("
-            + self.operation
-            + " "
-            + " ".join([p.to_pddl() for p in self.args])
-            + ")"
-        )
+        if self._pddl is None:
+            self._pddl = (
+                "("
+                + self.operation
+                + " "
+                + " ".join([p.to_pddl() for p in self.args])
+                + ")"
+            )
+        return self._pddl
 
     def __eq__(self, value) -> bool:
-        return str(self) == str(value)
+        return self is value or str(self) == str(value)
 
     def __hash__(self) -> int:
         return str(self).__hash__()
@@ -27,4 +35,4 @@ class PDDLNumericFluent(PDDLLiteral):
     def __lt__(self, __value: object) -> bool:
         if not type(__value) == PDDLNumericFluent:
             return False
-        return self.to_pddl().__lt__(__value.to_pddl())
+        return self.to_pddl() < __value.to_pddl()
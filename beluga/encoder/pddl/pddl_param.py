@@ -1,25 +1,46 @@
+import sys
+
 from .type import Type
 
 
 class PDDLParam:
     def __init__(self, name: str, type: Type):
-        self.name = name
+        self.name = sys.intern(name) if isinstance(name, str) else name
         self.type = type
+        # Parameters are not modified once created: their text and hash are
+        # computed on first use and cached, since the encoder sorts and hashes them
+        self._pddl = None
+        self._hash = None
 
     def __repr__(self) -> str:
         return f"{self.name} - {self.type}"
 
     def to_pddl(self) -> str:
-        return f"{self.name} - {self.type.name}"
+        if self._pddl is None:
+            self._pddl = f"{self.name} - {self.type.name}"
+        return self._pddl
+
+    def __getstate__(self) -> dict:
+        # The cached hash depends on the hash seed of the process, hence is not
+        # pickled (nor the cached text, which is recomputed along with it)
+        state = self.__dict__.copy()
+        state["_pddl"] = None
+        state["_hash"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
 
     def __eq__(self, __value: object) -> bool:
-        return self.name == __value.name and self.type == __value.type
+        return self is __value or (self.name == __value.name and self.type == __value.type)
 
     def __lt__(self, __value: object) -> bool:
-        return self.to_pddl().__lt__(__value.to_pddl())
+        return self.to_pddl() < __value.to_pddl()
 
     def __hash__(self) -> int:
-        return str(self).__hash__()
+        if self._hash is None:
+            self._hash = hash((self.name, self.type.name))
+        return self._hash
 
 
 class PDDLNumericValue:
@@ -1,3 +1,5 @@
+import sys
+
 from .pddl_param import PDDLParam
 from .pddl_numeric_fluent import PDDLNumericFluent
 from .pddl_literal import PDDLLiteral
@@ -5,18 +7,30 @@ from .pddl_literal import PDDLLiteral
 
 class PDDLPredicate(PDDLLiteral):
     def __init__(self, name: str, *args: PDDLParam, negated: bool = False):
-        self.name = name
+        self.name = sys.intern(name)
         self.args = list(args)
         self.negated = negated
+        # Predicates are not modified once created: their text and hash are
+        # computed on first use and cached, since the encoder sorts and hashes them
+        self._pddl = None
+        self._hash = None
 
     def to_pddl(self) -> str:
-        s = ""
-        if self.negated:
-            s += "(not "
-        s += f"({self.name} {' '.join([str(a.name) for a in self.args])})"
-        if self.negated:
-            s += ")"
-        return s
+        if self._pddl is None:
+            s = f"({self.name} {' '.join([str(a.name) for a in self.args])})"
+            self._pddl = "(not " + s + ")" if self.negated else s
+        return self._pddl
+
+    def __getstate__(self) -> dict:
+        # The cached hash depends on the hash seed of the process, hence is not
+        # pickled (nor the cached text, which is recomputed along with it)
+        state = self.__dict__.copy()
+        state["_pddl"] = None
+        state["_hash"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
 
     def to_prefix(self) -> str:
         if self.negated:
@@ -33,10 +47,12 @@ class PDDLPredicate(PDDLLiteral):
         return s
 
     def __hash__(self) -> int:
-        return str(self).__hash__()
+        if self._hash is None:
+            self._hash = hash((self.name, *(a.name for a in self.args), self.negated))
+        return self._hash
 
     def __eq__(self, __value: object) -> bool:
-        return (
+        return self is __value or (
             self.name == __value.name
             and self.args == __value.args
             and self.negated == __value.negated
@@ -50,4 +66,4 @@ class PDDLPredicate(PDDLLiteral):
             return False
         if not self.negated and type(__value) == PDDLPredicate and __value.negated:
             return True
-        return self.to_pddl().__lt__(__value.to_pddl())
+        return self.to_pddl() < __value.to_pddl()
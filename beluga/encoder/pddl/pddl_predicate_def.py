@@ -13,8 +13,8 @@ class PDDLPredicateDef(PDDLLiteral):
     def __repr__(self) -> str:
         return f"({self.name} {' '.join(arg.to_pddl() for arg in self.args)})"
 
-    def to_pddl(self) -> str:
-        if self.comment:
+    def to_pddl(self, comment: bool = True) -> str:
+        if comment and self.comment:
             return f"({self.name} {' '.join(arg.to_pddl() for arg in self.args)}) ; {self.comment}"
         return f"({self.name} {' '.join(arg.to_pddl() for arg in self.args)})"
 
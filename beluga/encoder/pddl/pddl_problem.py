@@ -1,9 +1,11 @@
+import io
 import re
+from typing import TextIO
 
 from .pddl_param import PDDLParam
 from .pddl_predicate import PDDLPredicate
 from .pddl_numeric_fluent import PDDLNumericFluent
-from .pddl_literal import PDDLLiteral
+from .pddl_literal import PDDLLiteral, write_literals
 
 class PDDLProblem:
     def __init__(self, name: str, domain_name: str):
@@ -23,17 +25,32 @@ class PDDLProblem:
         self.goal.append(l)
 
 
-    def to_pddl(self, name: str) -> str:
+    def write_pddl(self, out: TextIO, name: str, skip_comments: bool = False) -> None:
+        """Writes the problem in PDDL to a text stream (e.g. a file or an io.StringIO)
+        element by element, without building the whole text in memory.
+
+        Args:
+            out (TextIO): output stream
+            name (str): name of the problem
+            skip_comments (bool, optional): do not write the comments. Defaults to False.
+        """
         sanitized_name = re.sub(r"\s+", '_', name)
         sanitized_domain_name = re.sub(r"\s+", '_', self.domain_name)
 
-        s = f"(define\n\t(problem {sanitized_name})\n\t(:domain " + sanitized_domain_name + ")\n"
-        s += "  (:objects\n\t\t" + "\n\t\t".join(obj.to_pddl() for obj in self.objects) + "\n\t)\n"
-        s += "  (:init\n\t\t" + "\n\t\t".join(init.to_pddl() for init in self.init) + "\n\t)\n"
-        s += "  (:goal (and\n\t\t" + "\n\t\t".join(goal.to_pddl() for goal in self.goal) + "\n\t))\n"
-        s += "  (:metric minimize (total-cost))\n"
-        s += ")"
-        return s
-    
-
-
+        out.write(f"(define\n\t(problem {sanitized_name})\n\t(:domain " + sanitized_domain_name + ")\n")
+        out.write("  (:objects\n\t\t")
+        write_literals(out, self.objects, "\n\t\t", skip_comments)
+        out.write("\n\t)\n")
+        out.write("  (:init\n\t\t")
+        write_literals(out, self.init, "\n\t\t", skip_comments)
+        out.write("\n\t)\n")
+        out.write("  (:goal (and\n\t\t")
+        write_literals(out, self.goal, "\n\t\t", skip_comments)
+        out.write("\n\t))\n")
+        out.write("  (:metric minimize (total-cost))\n")
+        out.write(")")
+
+    def to_pddl(self, name: str, skip_comments: bool = False) -> str:
+        out = io.StringIO()
+        self.write_pddl(out, name, skip_comments)
+        return out.getvalue()
@@ -1,7 +1,13 @@
+import sys
+
+
 class Type:
     def __init__(self, name, base_type = 'object'):
-        self.name = name
+        self.name = sys.intern(name)
         self.base_type = base_type
+        # Rendered once, used for sorting
+        self._pddl = f"{self.name} - \
+        {self.base_type if isinstance(self.base_type, str) else self.base_type.name}"
 
     def get_name(self) -> str:
         return self.name
@@ -10,14 +16,16 @@ class Type:
         return self.name == t.name or (isinstance(self.base_type,Type) and self.base_type.is_subtype(t))
 
     def to_pddl(self):
-        return f"{self.name} - \
-        {self.base_type if isinstance(self.base_type, str) else self.base_type.name}"
+        return self._pddl
     
     def __eq__(self, __value: object) -> bool:
-        return self.name == __value.name and self.base_type == __value.base_type
+        return self is __value or (self.name == __value.name and self.base_type == __value.base_type)
     
     def __lt__(self, __value: object) -> bool:
-        return self.to_pddl().__lt__(__value.to_pddl())
+        return self._pddl < __value.to_pddl()
+
+    def __hash__(self) -> int:
+        return hash(self.name)
     
     def __repr__(self) -> str:
         return self.name + "(" + str(self.base_type) + ")"
\ No newline at end of file
@@ -1,2 +1,3 @@
 from .beluga_pddl_domain_encoding import DomainEncoding
-from .beluga_pddl_problem_encoding import encode
\ No newline at end of file
+from .beluga_pddl_problem_encoding import encode
+from .domain_cache import DOMAIN_CACHE, DomainCache
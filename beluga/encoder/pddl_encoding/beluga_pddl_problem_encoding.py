@@ -1,6 +1,5 @@
 # from beluga_lib.problem_def import BelugaProblem
-from beluga_lib.beluga_problem import BelugaProblem
-from beluga_lib.rack import Rack
+from beluga_lib.beluga_problem import BelugaProblem, ScenarioView
 from beluga_lib.flight_schedule import Flight
 from ..pddl.pddl_domain import PDDLDomain
 from ..pddl.pddl_literal import PDDLComment
@@ -9,7 +8,6 @@ from ..pddl import PDDLProblem, PDDLParam, PDDLNumericFluent
 from .variant import Variant
 import encoder.utils as utils
 from beluga_lib.problem_state import BelugaProblemState
-import copy
 
 def _reorder_flights(flights, last_belugas):
     flight_map = {f.name : f for f in flights}
@@ -36,9 +34,10 @@ def encode(
         state = BelugaProblemState(beluga_problem) # This should be identical to the initial state
 
     # Reorder flights according to the state content
-    beluga_problem = copy.deepcopy(beluga_problem) # NOTE Michele's change
     # print([f.name for f in beluga_problem.flights])
-    beluga_problem.flights = _reorder_flights(beluga_problem.flights, state.last_belugas)
+    beluga_problem = ScenarioView(
+        beluga_problem, _reorder_flights(beluga_problem.flights, state.last_belugas)
+    )
     # print([f.name for f in beluga_problem.flights])
 
     jig_sizes = set(
@@ -85,25 +84,27 @@ def init_classic_sizes(
 
     numbers = set()
     num_t = domain.get_type("num")
+    rack_t = domain.get_type("rack")
+    jig_sizes = frozenset(jig_sizes)
+    # Number objects are shared by all the fit facts
+    params = {}
+
+    def param(n: int) -> PDDLParam:
+        p = params.get(n)
+        if p is None:
+            p = params[n] = PDDLParam(" n" + utils.format_number(n, max_num), num_t)
+        return p
 
     problem.add_init(PDDLComment("Number encoding"))
     fit = domain.get_predicate("fit")
     for rack in beluga_problem.racks:
         problem.add_init(PDDLComment("Sizes fitting rack: " + rack.name))
-        for n1 in utils.get_necessary_rack_numbers(jig_sizes, rack.size):
-            numbers.add(n1)
-            for n2 in jig_sizes:
-                if n1 - n2 >= 0:
-                    problem.add_init(
-                        fit.inst(
-                            PDDLParam(
-                                " n" + utils.format_number(n1 - n2, max_num), num_t
-                            ),
-                            PDDLParam(" n" + utils.format_number(n2, max_num), num_t),
-                            PDDLParam(" n" + utils.format_number(n1, max_num), num_t),
-                            PDDLParam(rack.name, domain.get_type("rack")),
-                        )
-                    )
+        rack_param = PDDLParam(rack.name, rack_t)
+        for left, size, free in utils.get_fit_table(jig_sizes, rack.size):
+            problem.add_init(
+                fit.inst(param(left), param(size), param(free), rack_param)
+            )
+        numbers.update(utils.get_necessary_rack_numbers(jig_sizes, rack.size))
     numbers.update(jig_sizes)
     problem.add_object(PDDLComment("Numbers: " + str(numbers)))
     numbers = list(numbers)
@@ -218,32 +219,33 @@ def init_racks(
     problem.add_init(PDDLComment("Racks " + str(len(state.rack_map))))
     for init_rack in state.rack_map.values():
         
-        state_rack = Rack(init_rack.name, init_rack.size, state.rack_contents[init_rack.name])
+        rack_jigs = state.rack_contents[init_rack.name]
 
-        problem.add_init(PDDLComment("Rack:" + state_rack.name))
-        if len(state_rack.jigs) == 0:
+        problem.add_init(PDDLComment("Rack:" + init_rack.name))
+        if len(rack_jigs) == 0:
             problem.add_init(
-                domain.get_predicate("empty").inst(PDDLParam(state_rack.name, rack_t))
+                domain.get_predicate("empty").inst(PDDLParam(init_rack.name, rack_t))
             )
 
         problem.add_init(
             domain.get_predicate("at-side").inst(
-                PDDLParam(state_rack.name, rack_t), domain.get_constant("bside")
+                PDDLParam(init_rack.name, rack_t), domain.get_constant("bside")
             )
         )
         problem.add_init(
             domain.get_predicate("at-side").inst(
-                PDDLParam(state_rack.name, rack_t), domain.get_constant("fside")
+                PDDLParam(init_rack.name, rack_t), domain.get_constant("fside")
             )
         )
 
-        free_space = state_rack.free_space()
-        assert free_space >= 0, "Rack " + state_rack.name + " contains more jigs than fit!"
+        # The racks of the problem hold their initial jigs, not the ones of the state
+        free_space = init_rack.size - sum(jig.size() for jig in rack_jigs)
+        assert free_space >= 0, "Rack " + init_rack.name + " contains more jigs than fit!"
 
         if variant.classic:
             problem.add_init(
                 domain.get_predicate("free-space").inst(
-                    PDDLParam(state_rack.name, rack_t),
+                    PDDLParam(init_rack.name, rack_t),
                     PDDLParam(
                         "n" + utils.format_number(free_space, max_num),
                         domain.get_type("num"),
@@ -255,7 +257,7 @@ def init_racks(
                 PDDLNumericFluent(
                     "=",
                     domain.get_function("free-space").inst(
-                        PDDLParam(state_rack.name, rack_t)
+                        PDDLParam(init_rack.name, rack_t)
                     ),
                     PDDLNumericValue(free_space),
                 )
@@ -263,10 +265,10 @@ def init_racks(
 
         jig_t = domain.get_type("jig")
 
-        for i, jig in enumerate(state_rack.jigs):
+        for i, jig in enumerate(rack_jigs):
             problem.add_init(
                 domain.get_predicate("in").inst(
-                    PDDLParam(jig, jig_t), PDDLParam(state_rack.name, rack_t)
+                    PDDLParam(jig, jig_t), PDDLParam(init_rack.name, rack_t)
                 )
             )
             if i == 0:
@@ -275,22 +277,22 @@ def init_racks(
                         PDDLParam(jig.name, jig_t), domain.get_constant("bside")
                     )
                 )
-            if i < len(state_rack.jigs) - 1:
+            if i < len(rack_jigs) - 1:
                 problem.add_init(
                     domain.get_predicate("next-to").inst(
                         PDDLParam(jig.name, jig_t),
-                        PDDLParam(state_rack.jigs[i + 1], jig_t),
+                        PDDLParam(rack_jigs[i + 1], jig_t),
                         domain.get_constant("bside"),
                     )
                 )
                 problem.add_init(
                     domain.get_predicate("next-to").inst(
-                        PDDLParam(state_rack.jigs[i + 1], jig_t),
+                        PDDLParam(rack_jigs[i + 1], jig_t),
                         PDDLParam(jig.name, jig_t),
                         domain.get_constant("fside"),
                     )
                 )
-            if i == len(state_rack.jigs) - 1:
+            if i == len(rack_jigs) - 1:
                 problem.add_init(
                     domain.get_predicate("clear").inst(
                         PDDLParam(jig.name, jig_t), domain.get_constant("fside")
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from tempfile import NamedTemporaryFile
+
+from beluga_lib.beluga_problem import BelugaProblem
+
+from .beluga_pddl_domain_encoding import DomainEncoding
+from .variant import Variant
+
+# Version of the stored domains, to be increased whenever the pickled classes
+# change, so that the files written by older versions are rebuilt
+DOMAIN_CACHE_VERSION = 2
+
+
+def domain_key(variant: Variant, beluga_problem: BelugaProblem, name: str) -> tuple:
+    """Parts of the variant and of the problem the encoded domain depends on:
+    only the probabilistic encoding depends on the problem (flights and flight
+    transition tables), the other ones are the same for every problem."""
+    key = (name,) + tuple(sorted(vars(variant).items()))
+    if variant.probabilistic:
+        key += (
+            tuple(f.name for f in beluga_problem.flights),
+            tuple(tuple(h) for h in beluga_problem.tt_last),
+            tuple(beluga_problem.tt_next),
+            tuple(beluga_problem.tt_prob),
+        )
+    return key
+
+
+class CachedDomain:
+    """Encoded domain and its PDDL text. The encoding is shared by all the users
+    of the cache and must not be modified."""
+
+    def __init__(self, encoding: DomainEncoding, domain_str: str) -> None:
+        self.encoding: DomainEncoding = encoding
+        self.domain_str: str = domain_str
+
+
+class DomainCache:
+    """Cache of the encoded domains, keyed by the variant and the parts of the
+    problem the domain depends on (see `domain_key`).
+
+    Args:
+        directory (os.PathLike, optional): directory in which the domains are also
+        stored, to be shared between processes. Defaults to None (in-memory only).
+        maxsize (int, optional): maximum number of domains kept in memory. Defaults to 64.
+    """
+
+    def __init__(self, directory: os.PathLike = None, maxsize: int = 64) -> None:
+        self.directory: os.PathLike = directory
+        self.maxsize: int = maxsize
+        self._domains: OrderedDict[tuple, CachedDomain] = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: tuple) -> str:
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, digest + ".domain")
+
+    def _load(self, key: tuple) -> CachedDomain | None:
+        try:
+            with open(self._path(key), "rb") as f:
+                version, stored_key, domain = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Partially written or stale file, whose unpickling may raise about
+            # anything (AttributeError, ModuleNotFoundError, ...): rebuilt and
+            # overwritten
+            return None
+        if version != DOMAIN_CACHE_VERSION or stored_key != key:
+            return None
+        return domain
+
+    def _store(self, key: tuple, domain: CachedDomain) -> None:
+        with NamedTemporaryFile("wb", dir=self.directory, delete=False) as f:
+            pickle.dump(
+                (DOMAIN_CACHE_VERSION, key, domain), f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(f.name, self._path(key))
+
+    def get(
+        self, variant: Variant, beluga_problem: BelugaProblem, name: str = "beluga"
+    ) -> CachedDomain:
+        """Returns the encoded domain of a problem, encoding it if it is not cached
+
+        Args:
+            variant (Variant): planning variant
+            beluga_problem (BelugaProblem): problem (only used by the probabilistic variant)
+            name (str, optional): name of the PDDL domain. Defaults to "beluga".
+
+        Returns:
+            CachedDomain: The encoded domain
+        """
+        key = domain_key(variant, beluga_problem, name)
+        domain = self._domains.get(key)
+        if domain is not None:
+            self._domains.move_to_end(key)
+            return domain
+        if self.directory is not None:
+            domain = self._load(key)
+        if domain is None:
+            encoding = DomainEncoding(variant, beluga_problem)
+            domain = CachedDomain(encoding, encoding.domain.to_pddl(name))
+            if self.directory is not None:
+                self._store(key, domain)
+        self._domains[key] = domain
+        if len(self._domains) > self.maxsize:
+            self._domains.popitem(last=False)
+        return domain
+
+
+# Process-level cache
+DOMAIN_CACHE = DomainCache()
@@ -1,3 +1,6 @@
+import functools
+
+
 def format_number(i, max_val) -> str:
     return format_str(i, len(str(max(max_val,10))))
 
@@ -31,21 +34,33 @@ def get_necessary_numbers(jig_sizes, rack_sizes) -> set[int]:
 
 
 def get_necessary_rack_numbers(jig_sizes, rack_size) -> set[int]:
-        
-        numbers = set()
-        numbers.add(0)
-        numbers.add(rack_size)
-        changed = True
+        """Free spaces a rack of the given size can have, i.e. 0 and the rack size
+        minus any sum of jig sizes (with repetitions) that fits in the rack"""
+        return set(_rack_numbers(frozenset(jig_sizes), rack_size))
 
-        while changed:
-            new_numbers = set()
-            for rack in numbers:              
-                for jig in jig_sizes:
-                    new_number = rack - jig
-                    if (new_number >= 0):
-                        new_numbers.add(new_number)
 
-            changed = not new_numbers.issubset(numbers)
-            numbers.update(new_numbers)         
+@functools.lru_cache(maxsize=None)
+def _rack_numbers(jig_sizes: frozenset[int], rack_size: int) -> tuple[int]:
+        # Unbounded knapsack over the jig sizes: reachable[s] tells whether some
+        # multiset of jigs has a total size of s
+        sizes = [j for j in jig_sizes if 0 < j <= rack_size]
+        reachable = [False] * (rack_size + 1)
+        reachable[0] = True
+        for s in range(1, rack_size + 1):
+            reachable[s] = any(reachable[s - j] for j in sizes if j <= s)
+        numbers = set(rack_size - s for s in range(rack_size + 1) if reachable[s])
+        numbers.add(0)
+        return tuple(sorted(numbers))
+
 
-        return numbers
\ No newline at end of file
+@functools.lru_cache(maxsize=None)
+def get_fit_table(jig_sizes: frozenset[int], rack_size: int) -> tuple[tuple[int, int, int]]:
+        """(n1 - n2, n2, n1) triples of the `fit` facts of a rack of the given size:
+        placing a jig of size n2 in a rack with n1 free space leaves n1 - n2. The
+        table is computed once and shared by the racks of the same size."""
+        return tuple(
+                (n1 - n2, n2, n1)
+                for n1 in _rack_numbers(jig_sizes, rack_size)
+                for n2 in sorted(jig_sizes)
+                if n1 - n2 >= 0
+        )
@@ -74,6 +74,24 @@ if __name__ == "__main__":
         required=False,
     )
 
+    parser.add_argument(
+        "-nw",
+        "--num_workers",
+        dest="num_workers",
+        help="number of worker processes running the samples of a probabilistic evaluation in parallel. This parameter has no effect in case of a deterministic evaluation",
+        default=1,
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--validate-states",
+        dest="validate_states",
+        help="debug mode: check the states incrementally translated during a probabilistic evaluation against their full translation",
+        action='store_true',
+        required=False,
+    )
+
     parser.add_argument(
         "-tl",
         "--time-limit",
@@ -192,7 +210,9 @@ if __name__ == "__main__":
                               planner=planner,
                               seed=gen_params['config'].seed,
                               alpha=args.alpha,
-                              beta=args.beta)
+                              beta=args.beta,
+                              num_workers=args.num_workers,
+                              validate_states=args.validate_states)
     else:
         evaluator = DeterministicEvaluator(prb=inst,
                               problem_name=problem_name,
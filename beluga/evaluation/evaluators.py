@@ -6,15 +6,22 @@ from .planner_api import ProbabilisticPlannerAPI, ProbabilisticPlanningMetatada
 from .planner_api import DeterministicPlannerAPI
 from .planner_api import BelugaAction, BelugaPlan
 from skd_domains.skd_base_domain import State
+from skd_domains.packed_state import PackedState
 import json
+from beluga_lib import json_codec
 from beluga_lib.problem_state import BelugaProblemState
 import time
 from .planner_api import LoadBeluga, UnloadBeluga
 from .planner_api import PutDownRack, PickUpRack
 from .planner_api import DeliverToHangar, GetFromHangar
 from .planner_api import SwitchToNextBeluga
+from .prefix_cache import PlanPrefixCache, prefix_hashes, state_size
 import os
+import copy
+import multiprocessing as mp
+import traceback
 import numpy as np
+from operator import attrgetter, itemgetter
 
 # ============================================================================
 # Outcome classes
@@ -124,18 +131,23 @@ class MultipleSimulationOutcome:
         keys = self.individual_outcomes[0].score.keys()
         return {k:np.nanmean([o.score[k] for o in self.individual_outcomes]) for k in keys}
 
+    def json_items(self):
+        # Items of the JSON representation, the individual outcomes being
+        # converted lazily (see json_codec.dump_object)
+        return [
+                    ('individual_outcomes', (o.to_json_obj() for o in self.individual_outcomes)),
+                    ('avg_plan_construction_time', self._avg_plan_construction_time()),
+                    ('avg_plan_length', self._avg_plan_length()),
+                    ('avg_free_racks', self._avg_free_racks()),
+                    ('frac_goal_reached', self._frac_goal_reached()),
+                    ('frac_invalid_plan', self._frac_invalid_plan()),
+                    ('frac_time_limit_reached', self._frac_time_limit_reached()),
+                    ('frac_step_limit_reached', self._frac_step_limit_reached()),
+                    ('avg_score', self._avg_score_dict())
+                ]
+
     def to_json_obj(self):
-        return {
-                    'individual_outcomes': [o.to_json_obj() for o in self.individual_outcomes],
-                    'avg_plan_construction_time': self._avg_plan_construction_time(),
-                    'avg_plan_length': self._avg_plan_length(),
-                    'avg_free_racks': self._avg_free_racks(),
-                    'frac_goal_reached': self._frac_goal_reached(),
-                    'frac_invalid_plan': self._frac_invalid_plan(),
-                    'frac_time_limit_reached': self._frac_time_limit_reached(),
-                    'frac_step_limit_reached': self._frac_step_limit_reached(),
-                    'avg_score': self._avg_score_dict()
-                }
+        return {k: list(v) if k == 'individual_outcomes' else v for k, v in self.json_items()}
 
     def to_json_str(self, **args):
         return json.dumps(self.to_json_obj(), **args)
@@ -191,20 +203,88 @@ def compute_score_dict(outcome : SingleSimulationOutcome,
 # Class factoring common evaluation functions
 # ============================================================================
 
+# Grounded actions matching each kind of BelugaAction, with the positions of
+# their arguments that must be equal to the given fields of the BelugaAction
+# (None standing for the current flight, since in the probabilistic case the
+# next flight cannot be known in advance)
+ACTION_MATCHERS = {
+    LoadBeluga.name: (('load-beluga', (0, 4, 3), ('jig', 'trailer', 'flight')),),
+    UnloadBeluga.name: (('unload-beluga', (0, 2, 3), ('jig', 'trailer', 'flight')),),
+    DeliverToHangar.name: (('deliver-to-hangar', (0, 2, 3, 4), ('jig', 'trailer', 'hangar', 'pl')),),
+    GetFromHangar.name: (('get-from-hangar', (0, 2, 1), ('jig', 'trailer', 'hangar')),),
+    PutDownRack.name: (('put-down-rack', (0, 1, 2, 3), ('jig', 'trailer', 'rack', 'side')),
+                       ('stack-rack', (0, 2, 3, 4), ('jig', 'trailer', 'rack', 'side'))),
+    PickUpRack.name: (('pick-up-rack', (0, 1, 2, 3), ('jig', 'trailer', 'rack', 'side')),
+                      ('unstack-rack', (0, 2, 3, 4), ('jig', 'trailer', 'rack', 'side'))),
+    SwitchToNextBeluga.name: (('beluga-complete', (0,), (None,)),),
+}
+
+# Categories of the objects the state translation distinguishes
+_OTHER, _FLIGHT, _TRAILER, _RACK, _HANGAR, _JIG = range(6)
+
+
+class _TranslationMemory:
+    """State being translated by EvaluationSupport, together with the intermediate
+    data of the translation, all in terms of object ids: contents of flights and
+    racks, rack orderings, jigs to be delivered next. It is kept between the steps
+    of a simulation, so that the following state can be translated from the atoms
+    that changed only, in which case the dirty fields tell which parts of the
+    state have to be reconstructed."""
+
+    def __init__(self, es):
+        self.skd_state = None
+        self.bstate = BelugaProblemState(es.prb)
+        self.flight_content = {f : set() for f in es.flight_ids}
+        self.rack_content = {r : set() for r in es.rack_ids}
+        self.jig_rack = {}
+        self.clear_jigs = set()
+        self.next_jig = {}
+        self.current_pl_jigs = {pl : None for pl in es.pl_ids}
+        self.dirty_racks = set(es.rack_ids)
+        self.dirty_pls = set(es.pl_ids)
+        self.dirty_beluga = True
+        self.changed_jigs = []
+
+
+def _copy_beluga_state(state : BelugaProblemState):
+    # Shallow copy: the containers of the copy can be modified without affecting
+    # the original, the jig lists they hold are shared
+    res = copy.copy(state)
+    res.last_belugas = list(state.last_belugas)
+    res.beluga_contents = list(state.beluga_contents)
+    res.production_line_deliveries = dict(state.production_line_deliveries)
+    res.rack_contents = dict(state.rack_contents)
+    res.trailer_load = dict(state.trailer_load)
+    res.jig_empty = dict(state.jig_empty)
+    res.trailer_location = dict(state.trailer_location)
+    res.hangar_host = dict(state.hangar_host)
+    return res
+
+
+def _comparable_state(state : BelugaProblemState):
+    res = state.to_json_obj()
+    # The beluga contents are reconstructed from a set
+    res['beluga_contents'] = sorted(res['beluga_contents'])
+    return res
+
+
 class EvaluationSupport:
 
     def __init__(self,
                  prb : BelugaProblem,
-                 domain : SkdBaseDomain
+                 domain : SkdBaseDomain,
+                 validate_states : bool = False
                  ):
         # Configuration fields
         self.prb = prb
         self.domain = domain
+        self.validate_states = validate_states
         # Internal fields
         self.action_space = None
         self.observation_space = None
         self.objects = None
         self.predicates = None
+        self.translation = None
 
     def refresh_cache(self):
         # Cached problem data
@@ -216,6 +296,7 @@ class EvaluationSupport:
         self.pl_names = [pl.name for pl in self.prb.production_lines]
         self.flight_names = [f.name for f in self.prb.flights]
         self.flight_map = {f.name : f for f in self.prb.flights}
+        self.pl_schedules = {pl.name : [j.name for j in pl.schedule] for pl in self.prb.production_lines}
 
         # Store and initialize the domain
         self.action_space = self.domain.get_action_space()
@@ -226,55 +307,135 @@ class EvaluationSupport:
         self.predicates = self.domain.task.predicates
         self.actions = self.domain.task.actions
 
-    def _process_pred_clear(self, args : list[str],
+        # Index of the grounded action schemas matching each kind of BelugaAction:
+        # schema id, getter of the matched arguments, getter of the matched fields
+        self.object_ids = {o : i for i, o in enumerate(self.objects)}
+        action_ids = {a.name : i for i, a in enumerate(self.actions)}
+        self.action_matchers = {
+            kind : tuple((action_ids[name],
+                          itemgetter(*positions),
+                          None if fields == (None,) else attrgetter(*fields))
+                         for name, positions, fields in matchers if name in action_ids)
+            for kind, matchers in ACTION_MATCHERS.items()
+        }
+
+        # Object categories and per-predicate processing functions of the state
+        # translation, indexed by object and predicate ids
+        object_ids = self.object_ids
+        category = {}
+        for names, cat in ((self.jig_names, _JIG), (self.hangar_names, _HANGAR),
+                           (self.rack_names, _RACK), (self.trailer_names, _TRAILER),
+                           (self.flight_names, _FLIGHT)):
+            category.update((name, cat) for name in names)
+        self.object_categories = [category.get(o, _OTHER) for o in self.objects]
+        self.flight_ids = [i for i, c in enumerate(self.object_categories) if c == _FLIGHT]
+        self.rack_ids = [i for i, c in enumerate(self.object_categories) if c == _RACK]
+        self.pl_ids = [object_ids[plname] for plname in self.pl_names]
+        self.bside_id = object_ids.get('bside')
+        # Position in the production line schedule of each jig
+        self.pl_schedule_pos = {
+            object_ids[plname] : {object_ids[jname] : k for k, jname in enumerate(self.pl_schedules[plname])}
+            for plname in self.pl_names
+        }
+        processors = {
+            'clear' : self._process_pred_clear,
+            'empty' : self._process_pred_empty,
+            'in' : self._process_pred_in,
+            'processed-flight' : self._process_pred_processed_flight,
+            'to_deliver' : self._process_to_deliver,
+            'next-to' : self._process_next_to,
+        }
+        self.pred_processors = [processors.get(p.name) for p in self.predicates]
+        self.processed_flight_pid = next((pid for pid, p in enumerate(self.predicates)
+                                          if p.name == 'processed-flight'), None)
+
+        # Incremental state translation (restarted, as the objects may have changed)
+        self.translation = None
+
+    def _process_pred_clear(self, args : tuple[int],
                             state : BelugaProblemState,
-                            clear_jigs : set[str]):
-        arg1, arg2 = args
-        if arg2 == 'bside':
-            clear_jigs.add(arg1)
-
-    def _process_pred_empty(self, args : list[str], state : BelugaProblemState):
+                            mem : _TranslationMemory,
+                            added : bool):
+        jig, side = args
+        if side == self.bside_id:
+            if added:
+                mem.clear_jigs.add(jig)
+            else:
+                mem.clear_jigs.discard(jig)
+            mem.changed_jigs.append(jig)
+
+    def _process_pred_empty(self, args : tuple[int],
+                            state : BelugaProblemState,
+                            mem : _TranslationMemory,
+                            added : bool):
         arg = args[0]
-        if arg in self.trailer_names:
-            state.sfs_trailer_load(trailer=arg, jig=None)
-        elif arg in self.rack_names:
-            state.sfs_rack_contents(rack=arg, jigs=[])
-        elif arg in self.hangar_names:
-            state.sfs_hangar_host(arg, None)
-        elif arg in self.jig_names:
-            state.jig_empty[arg] = True
-
-    def _process_pred_in(self, args : list[str],
+        category = self.object_categories[arg]
+        if category == _TRAILER:
+            if added:
+                state.sfs_trailer_load(trailer=self.objects[arg], jig=None)
+        elif category == _HANGAR:
+            if added:
+                state.sfs_hangar_host(self.objects[arg], None)
+        elif category == _JIG:
+            jig = state.jig_map[self.objects[arg]]
+            state.jig_empty[jig.name] = True if added else jig.empty
+        # The empty racks are handled by the reconstruction of the rack contents
+
+    def _process_pred_in(self, args : tuple[int],
                          state : BelugaProblemState,
-                         flight_content : dict[str, set[str]],
-                         rack_content : dict[str, set[str]]):
-        arg1, arg2 = args
-        if arg2 in self.flight_names:
-            flight_content[arg2].add(arg1)
-        elif arg2 in self.trailer_names:
-            state.sfs_trailer_load(arg2, arg1)
-        elif arg2 in self.rack_names:
-            rack_content[arg2].add(arg1)
-        elif arg2 in self.hangar_names:
-            state.sfs_hangar_host(arg2, arg1)
-
-    def _process_pred_processed_flight(self, args : list[str], state : BelugaProblemState):
-        arg = args[0]
-        state.sfs_current_beluga(arg)
-
-    def _process_to_deliver(self, args : list[str],
+                         mem : _TranslationMemory,
+                         added : bool):
+        jig, loc = args
+        category = self.object_categories[loc]
+        if category == _FLIGHT:
+            if added:
+                mem.flight_content[loc].add(jig)
+            else:
+                mem.flight_content[loc].discard(jig)
+            mem.dirty_beluga = True
+        elif category == _TRAILER:
+            state.sfs_trailer_load(self.objects[loc], self.objects[jig] if added else None)
+        elif category == _RACK:
+            if added:
+                mem.rack_content[loc].add(jig)
+                mem.jig_rack[jig] = loc
+            else:
+                mem.rack_content[loc].discard(jig)
+                mem.jig_rack.pop(jig, None)
+            mem.dirty_racks.add(loc)
+        elif category == _HANGAR:
+            state.sfs_hangar_host(self.objects[loc], self.objects[jig] if added else None)
+
+    def _process_pred_processed_flight(self, args : tuple[int],
+                                       state : BelugaProblemState,
+                                       mem : _TranslationMemory,
+                                       added : bool):
+        if added:
+            state.sfs_current_beluga(self.objects[args[0]])
+        else:
+            state.current_beluga = self.prb.flights[0]
+        mem.dirty_beluga = True
+
+    def _process_to_deliver(self, args : tuple[int],
                             state : BelugaProblemState,
-                            current_pl_jigs : dict[str, str]):
-        arg1, arg2 = args
-        current_pl_jigs[arg2] = arg1
+                            mem : _TranslationMemory,
+                            added : bool):
+        jig, pl = args
+        mem.current_pl_jigs[pl] = jig if added else None
+        mem.dirty_pls.add(pl)
 
-    def _process_next_to(self, args : list[str],
-                            state : BelugaProblemState,
-                            next_jig : dict[str, str]):
-        arg1, arg2, arg3 = args
-        if arg3 != 'bside':
+    def _process_next_to(self, args : tuple[int],
+                         state : BelugaProblemState,
+                         mem : _TranslationMemory,
+                         added : bool):
+        jig, next_jig, side = args
+        if side != self.bside_id:
             return
-        next_jig[arg1] = arg2
+        if added:
+            mem.next_jig[jig] = next_jig
+        else:
+            mem.next_jig.pop(jig, None)
+        mem.changed_jigs.append(jig)
 
     def _reconstruct_rack_content(self, rname, content, clear_jigs, next_jig):
         # Handle empty racks
@@ -298,6 +459,46 @@ class EvaluationSupport:
         # Return the result
         return sorted_jigs
 
+    def _process_atoms(self,
+                       atoms : list[tuple[int, tuple[int]]],
+                       state : BelugaProblemState,
+                       mem : _TranslationMemory,
+                       added : bool):
+        processors = self.pred_processors
+        for pid, args in atoms:
+            process = processors[pid]
+            if process is not None:
+                process(args, state, mem, added)
+
+    def _reconstruct_dirty_fields(self,
+                                  state : BelugaProblemState,
+                                  mem : _TranslationMemory):
+        objects = self.objects
+        # Set the beluga content
+        if mem.dirty_beluga:
+            current_beluga = self.object_ids[state.current_beluga.name]
+            state.sfs_beluga_contents([objects[j] for j in mem.flight_content[current_beluga]])
+        # Reconstruct the rack contents (of the racks holding a jig whose
+        # position changed as well)
+        mem.dirty_racks.update(mem.jig_rack[jig] for jig in mem.changed_jigs if jig in mem.jig_rack)
+        for rack in mem.dirty_racks:
+            sorted_jigs = self._reconstruct_rack_content(objects[rack], mem.rack_content[rack],
+                                                         mem.clear_jigs, mem.next_jig)
+            state.sfs_rack_contents(objects[rack], [objects[j] for j in sorted_jigs])
+        # Update the production line schedules
+        for pl in mem.dirty_pls:
+            plname = objects[pl]
+            schedule = self.pl_schedules[plname]
+            cur_jig_idx = self.pl_schedule_pos[pl].get(mem.current_pl_jigs[pl])
+            if cur_jig_idx is None:
+                state.sfs_production_line_deliveries(plname, schedule)
+            else:
+                state.sfs_production_line_deliveries(plname, schedule[:cur_jig_idx])
+        mem.dirty_racks.clear()
+        mem.dirty_pls.clear()
+        mem.dirty_beluga = False
+        mem.changed_jigs.clear()
+
     def _skd_state_to_beluga_state(self,
                                    state : State,
                                    beluga_seq : list[str] = [],
@@ -311,56 +512,79 @@ class EvaluationSupport:
         #             if val < 0:
         #                 raise Exception('KABOOM')
 
-        # Build a competition state object
-        res = BelugaProblemState(self.prb)
+        # Build a competition state object, with fresh temporary fields
+        mem = _TranslationMemory(self)
+        res = mem.bstate
         # Store the sequence of belugas
         res.sfs_last_belugas(beluga_seq)
         # Store the trailer locations
         for trailer, (loc, side) in trailer_location.items():
             res.sfs_trailer_location(trailer, loc, side)
-        # Temporary fields
-        flight_content = {fname : set() for fname in self.flight_names}
-        next_jig = {}
-        clear_jigs = set()
-        rack_content = {rname : set() for rname in self.rack_names}
-        current_pl_jigs = {plname : None for plname in self.pl_names}
         # Loop over all atom types (i.e. predicates)
+        processors = self.pred_processors
         for pid, atom_list in enumerate(state.atoms):
-            # Retrieve predicate and arguments
-            pred = self.predicates[pid].name
-            # Loop over atoms for this predicate
-            for args_ids in atom_list:
-                args = [self.objects[k] for k in args_ids]
+            process = processors[pid]
+            if process is not None:
                 # Update the state
-                if pred == 'clear':
-                    self._process_pred_clear(args, res, clear_jigs)
-                elif pred == 'empty':
-                    self._process_pred_empty(args, res)
-                elif pred == 'in':
-                    self._process_pred_in(args, res, flight_content, rack_content)
-                elif pred == 'processed-flight':
-                    self._process_pred_processed_flight(args, res)
-                elif pred == 'to_deliver':
-                    self._process_to_deliver(args, res, current_pl_jigs)
-                elif pred == 'next-to':
-                    self._process_next_to(args, res, next_jig)
-        # Set the beluga content
-        res.sfs_beluga_contents(flight_content[res.current_beluga.name])
-        # Reconstruct the rack content
-        for rname, content in rack_content.items():
-            sorted_jigs = self._reconstruct_rack_content(rname, content, clear_jigs, next_jig)
-            res.sfs_rack_contents(rname, sorted_jigs)
-        # Update the production line schedule
-        for pl in self.prb.production_lines:
-            schedule = [j.name for j in pl.schedule]
-            try:
-                cur_jig_idx = schedule.index(current_pl_jigs[pl.name])
-                res.sfs_production_line_deliveries(pl.name, schedule[:cur_jig_idx])
-            except ValueError:
-                res.sfs_production_line_deliveries(pl.name, schedule)
+                for args_ids in atom_list:
+                    process(args_ids, res, mem, True)
+        # Set the beluga content, the rack contents and the production line schedules
+        self._reconstruct_dirty_fields(res, mem)
         # Return the converted state
         return res
 
+    def _atom_delta(self, prev : State, state : State):
+        # Atoms deleted and added between two states, as (predicate id, argument ids) pairs
+        if isinstance(prev, PackedState) and isinstance(state, PackedState):
+            layout = self.domain.state_layout
+            changed = layout.atom_ids_of(prev.bits ^ state.bits)
+            deleted = [layout.atoms[i] for i in changed if prev.bits >> i & 1]
+            added = [layout.atoms[i] for i in changed if state.bits >> i & 1]
+            return deleted, added
+        deleted, added = [], []
+        for pid, (old_atoms, new_atoms) in enumerate(zip(prev.atoms, state.atoms)):
+            if old_atoms != new_atoms:
+                old_atoms, new_atoms = set(old_atoms), set(new_atoms)
+                deleted.extend((pid, args) for args in old_atoms - new_atoms)
+                added.extend((pid, args) for args in new_atoms - old_atoms)
+        return deleted, added
+
+    def _update_beluga_state(self,
+                             state : State,
+                             beluga_seq : list[str] = [],
+                             trailer_location : dict[str, tuple[str, str]] = {}):
+        """Same result as _skd_state_to_beluga_state, but obtained by applying to
+        the previously translated state only the atoms that changed since then
+        (e.g. the effects of the last applied action), so that the cost does
+        not grow with the size of the instance. With `validate_states`, the
+        result is checked against the full translation."""
+        mem = self.translation
+        if mem is None:
+            mem = self.translation = _TranslationMemory(self)
+            deleted = []
+            added = [(pid, args) for pid, atom_list in enumerate(state.atoms) for args in atom_list]
+        else:
+            deleted, added = self._atom_delta(mem.skd_state, state)
+        res = mem.bstate
+        # Deleted atoms are processed first, so that an atom replaced by the
+        # same action (e.g. the jig on a trailer) ends up with its new value
+        self._process_atoms(deleted, res, mem, False)
+        self._process_atoms(added, res, mem, True)
+        # Store the sequence of belugas and the trailer locations
+        res.sfs_last_belugas(beluga_seq)
+        for trailer, (loc, side) in trailer_location.items():
+            res.sfs_trailer_location(trailer, loc, side)
+        # Reconstruct the parts of the state that changed
+        self._reconstruct_dirty_fields(res, mem)
+        mem.skd_state = state
+        # Check the result against the full translation
+        if self.validate_states:
+            expected = self._skd_state_to_beluga_state(state, beluga_seq, trailer_location)
+            if _comparable_state(res) != _comparable_state(expected):
+                raise EvaluationException('The incremental state translation differs from the full one')
+        # The planner gets a copy, so that the memory cannot be altered through it
+        return _copy_beluga_state(res)
+
     def _find_valid_action(self, ba : BelugaAction, state : State, beluga_seq : list[str]):
         # Retrieve applicable actions
         applicable_actions_space = self.domain.get_applicable_actions(state)
@@ -376,65 +600,36 @@ class EvaluationSupport:
         # Determine whether there's any applicable action
         if len(applicable_actions) == 0:
             raise EvaluationException('No applicable actions from this state')
+        # Argument ids each matching action schema must have (at given positions)
+        object_ids = self.object_ids
+        wanted = {}
+        for action_id, args_getter, fields_getter in self.action_matchers.get(ba.name, ()):
+            if fields_getter is None:
+                key = object_ids.get(beluga_seq[-1])
+            else:
+                values = fields_getter(ba)
+                key = tuple(map(object_ids.get, values)) if type(values) is tuple else object_ids.get(values)
+            wanted[action_id] = (args_getter, key)
         for a in applicable_actions:
-            action_name = self.actions[a.action_id].name
-            action_args = [self.objects[o] for o in a.args]
-            # Determine whethere there's a match
-            if action_name == 'load-beluga' and ba.name == LoadBeluga.name:
-                jig, _, _, flight, trailer, _, _ = action_args
-                if jig == ba.jig and trailer == ba.trailer and flight == ba.flight:
-                    return a
-            elif action_name == 'unload-beluga' and ba.name == UnloadBeluga.name:
-                jig, _, trailer, flight = action_args
-                if jig == ba.jig and trailer == ba.trailer and flight == ba.flight:
-                    return a
-            elif action_name == 'deliver-to-hangar' and ba.name == DeliverToHangar.name:
-                jig, _, trailer, hangar, pl = action_args
-                if jig == ba.jig and trailer == ba.trailer and hangar == ba.hangar and pl == ba.pl:
-                    return a
-            elif action_name == 'get-from-hangar' and ba.name == GetFromHangar.name:
-                jig, hangar, trailer = action_args
-                if jig == ba.jig and trailer == ba.trailer and hangar == ba.hangar:
-                    return a
-            elif action_name == 'put-down-rack' and ba.name == PutDownRack.name :
-                jig, trailer, rack, side = action_args
-                if jig == ba.jig and trailer == ba.trailer and rack == ba.rack and side == ba.side:
-                    return a
-            elif action_name == 'stack-rack' and ba.name == PutDownRack.name :
-                jig, _, trailer, rack, side, _ = action_args
-                if jig == ba.jig and trailer == ba.trailer and rack == ba.rack and side == ba.side:
-                    return a
-            elif action_name == 'pick-up-rack' and ba.name == PickUpRack.name:
-                jig, trailer, rack, side, _ = action_args
-                if jig == ba.jig and trailer == ba.trailer and rack == ba.rack and side == ba.side:
-                    return a
-            elif action_name == 'unstack-rack' and ba.name == PickUpRack.name:
-                jig, _, trailer, rack, side, _ = action_args
-                if jig == ba.jig and trailer == ba.trailer and rack == ba.rack and side == ba.side:
-                    return a
-            elif action_name == 'beluga-complete' and ba.name == SwitchToNextBeluga.name:
-                # prev_flight, flight = action_args
-                # if prev_flight == beluga_seq[-1] and flight == ba.flight:
-                #     return a
-                prev_flight, _ = action_args # No check on the next flight, since in the probabilisti case it cannot be known in advance
-                if prev_flight == beluga_seq[-1]:
-                    return a
+            match = wanted.get(a.action_id)
+            if match is not None and match[0](a.args) == match[1]:
+                return a
         # If no matching action is found, return None
         raise InvalidActionException(f'No matching applicable action found for {ba}')
 
 
     def _get_current_beluga(self, state):
         # Find the correct predicate
-        for pid, atoms in enumerate(state.atoms):
-            if self.predicates[pid].name == 'processed-flight':
-                # Check that there's a single atom
-                if len(atoms) > 1:
-                    raise EvaluationException('There cannot be more than one processed beluga')
-                elif len(atoms) == 0:
-                    return None
-                arg = atoms[0][0]
-                return self.objects[arg]
-        raise EvaluationException('No "processed-flight" predicate found in the state')
+        if self.processed_flight_pid is None:
+            raise EvaluationException('No "processed-flight" predicate found in the state')
+        atoms = state.atoms[self.processed_flight_pid]
+        # Check that there's a single atom
+        if len(atoms) > 1:
+            raise EvaluationException('There cannot be more than one processed beluga')
+        elif len(atoms) == 0:
+            return None
+        arg = atoms[0][0]
+        return self.objects[arg]
 
     def _update_trailer_location(self,
                                  ba : BelugaAction,
@@ -451,7 +646,61 @@ class EvaluationSupport:
 
     def _dump_to_json_file(self, out_file, obj):
         with open(out_file, 'w') as fp:
-            json.dump(obj.to_json_obj(), fp, indent=4)
+            if hasattr(obj, 'json_items'):
+                # Streamed, so that large outcomes are not converted all at once
+                json_codec.dump_object(fp, obj.json_items(), indent=4)
+            else:
+                json.dump(obj.to_json_obj(), fp, indent=4)
+
+
+class _PlanTrieNode:
+    """Node of the trie of the plans validated by a DeterministicEvaluator: state
+    reached by a plan prefix, together with the fields that cannot be computed
+    from it, and the nodes reached by applying the next actions (or the exception
+    raised when trying to)"""
+
+    def __init__(self,
+                 state : State,
+                 beluga_seq : list[str],
+                 trailer_location : dict[str, tuple[str, str]],
+                 es : EvaluationSupport,
+                 domain : SkdBaseDomain):
+        self.state = state
+        self.trailer_location = trailer_location
+        self.children = {}
+        self.final_state = None
+        self.error = None
+        # Determine the currently processed flight
+        self.beluga_seq = beluga_seq
+        try:
+            cbeluga = es._get_current_beluga(state)
+            if len(beluga_seq) == 0 or beluga_seq[-1] != cbeluga:
+                self.beluga_seq = beluga_seq + [cbeluga]
+        except EvaluationException as e:
+            self.error = e
+        self.terminal = self.error is None and domain._is_terminal(state)
+
+    def get_final_state(self, es : EvaluationSupport):
+        if self.final_state is None:
+            self.final_state = es._skd_state_to_beluga_state(state=self.state,
+                                                             beluga_seq=self.beluga_seq,
+                                                             trailer_location=self.trailer_location)
+        return self.final_state
+
+    def detached(self):
+        # Copy of the node without its children, to be stored in (or taken from)
+        # a prefix cache without holding (or altering) a branch of a trie
+        res = copy.copy(self)
+        res.children = {}
+        return res
+
+
+def _action_key(ba : BelugaAction):
+    return ba.to_json_str()
+
+
+def _plan_keys(plans : list[BelugaPlan]):
+    return [tuple(map(_action_key, plan.actions)) if plan is not None else () for plan in plans]
 
 
 class DeterministicEvaluator:
@@ -464,7 +713,8 @@ class DeterministicEvaluator:
                  max_steps : int = None,
                  time_limit : int = None,
                  alpha : float = 0.7,
-                 beta : float = 0.0004
+                 beta : float = 0.0004,
+                 prefix_cache : PlanPrefixCache = None
                  ):
         # Check arguments
         if max_steps is not None and max_steps <= 0:
@@ -480,18 +730,32 @@ class DeterministicEvaluator:
         self.time_limit = time_limit
         self.alpha = alpha
         self.beta = beta
+        # States reached by the prefixes of the plans evaluated so far (kept
+        # across evaluations, but not shared with the worker processes)
+        self.prefix_cache = prefix_cache
         # Internal fields
         self.es = None
         self.domain = None
 
     def setup(self):
+        # Build the SKD domain and the support object
+        self._setup_domain()
+        # Setup the planner
+        self.planner.setup()
+
+    def _setup_domain(self):
         # Build an SKD domain
         self.domain = SkdPDDLDomain(self.prb, self.problem_name, classic=False)
         # Build an support object
         self.es = EvaluationSupport(self.prb, self.domain)
         self.es.refresh_cache()
-        # Setup the planner
-        self.planner.setup()
+        # Cached states belong to the previous domain
+        if self.prefix_cache is not None:
+            self.prefix_cache.clear()
+
+    def _plan_trie(self):
+        # Root of a trie of plans, i.e. the initial state
+        return _PlanTrieNode(self.domain.reset(), [], {}, self.es, self.domain)
 
     def evaluate(self):
         # Define the stem for all output files
@@ -509,140 +773,244 @@ class DeterministicEvaluator:
         plan = self.planner.build_plan(self.prb)
         elapsed_time += time.time() - tstart
 
+        # Check the plan
+        timeout = (self.time_limit is not None and elapsed_time > self.time_limit)
+        outcome = self._validate_plan(plan, elapsed_time, timeout, self._plan_trie())
+        if out_stem is not None:
+            self.es._dump_to_json_file(out_stem + '_outcome.json', outcome)
+
+        # Return the outcome
+        return outcome
+
+    def _validate_plan(self,
+                       plan : BelugaPlan,
+                       elapsed_time : float,
+                       timeout : bool,
+                       root : _PlanTrieNode):
         # Handle the case where no plan has been built
         no_plan = (plan is None or len(plan.actions) == 0)
-        timeout = (self.time_limit is not None and elapsed_time > self.time_limit)
         if no_plan or timeout:
             msg = 'No plan was produced' if no_plan else 'Plan not accepted (time limit reached)'
-            outcome = SingleSimulationOutcome(plan_construction_time=elapsed_time,
-                                              error_msg=msg,
-                                              plan=plan,
-                                              final_state=None,
-                                              final_step=None,
-                                              goal_reached=False,
-                                              abrupt_plan_end=False,
-                                              invalid_plan=False,
-                                              time_limit_reached=timeout,
-                                              step_limit_reached=False,
-                                              free_racks=None,
-                                              prb=self.prb,
-                                              alpha=self.alpha,
-                                              beta=self.beta)
-            if out_stem is not None:
-                self.es._dump_to_json_file(out_stem + '_outcome.json', outcome)
-            return outcome
-
-        # State fields that cannot be computed based on predicates
-        beluga_seq = []
-        trailer_location = {}
+            return SingleSimulationOutcome(plan_construction_time=elapsed_time,
+                                           error_msg=msg,
+                                           plan=plan,
+                                           final_state=None,
+                                           final_step=None,
+                                           goal_reached=False,
+                                           abrupt_plan_end=False,
+                                           invalid_plan=False,
+                                           time_limit_reached=timeout,
+                                           step_limit_reached=False,
+                                           free_racks=None,
+                                           prb=self.prb,
+                                           alpha=self.alpha,
+                                           beta=self.beta)
 
         # Planning process stats
         goal_reached = False
         abrupt_plan_end = False
-
-        # Retrieve the initial state
-        state = self.domain.reset()
-
-        # Start plan execution
+        error = None
+
+        # Start plan execution from the initial state: the states reached by
+        # the prefixes of the plan are only computed if no previous plan
+        # shared them, either in the trie or in the prefix cache
+        cache = self.prefix_cache
+        lookup = cache is not None
+        node = root
         scaled_max_steps = len(self.prb.jigs) * self.max_steps
-        for step in range(scaled_max_steps):
-            try:
-                # Determine the currently processed flight
-                cbeluga = self.es._get_current_beluga(state)
-                if len(beluga_seq) == 0 or beluga_seq[-1] != cbeluga:
-                    beluga_seq.append(cbeluga)
-
-                # # TODO for debugging
-                # bstate = self.es._skd_state_to_beluga_state(state=state,
-                #                                             beluga_seq=beluga_seq,
-                #                                             trailer_location=trailer_location)
-                # with open(f'problem_and_state_test/new_test_instances2/ba_state_{step}.json', 'w') as fp:
-                #     json.dump(bstate.to_json_obj(), fp)
-                # with open(f'problem_and_state_test/new_test_instances2/skd_state_{step}.txt', 'w') as fp:
-                #     fp.write(str(state))
-                # print('-' * 78)
-                # print(state)
-                # print('-' * 78)
-                # for k, v in bstate.to_json_obj().items():
-                #     print(f'"{k}": {v}')
-                # print(bstate.to_json_str(indent=2))
+        step = 0
+        while step < scaled_max_steps:
+            if node.error is not None:
+                error = node.error
+                break
+
+            # Check whether the goal has been reached
+            if node.terminal:
+                goal_reached = True
+                break
+
+            # Check whether the plan has already ended
+            if step >= len(plan.actions):
+                abrupt_plan_end = True
+                break
+
+            # Retrive current action
+            ba = plan.actions[step]
+            key = _action_key(ba)
+            child = node.children.get(key)
+            if child is None and lookup:
+                # Resume from the longest cached prefix of the plan (only looked
+                # up once, as no longer prefix of the plan can be cached later)
+                lookup = False
+                hashes = prefix_hashes(map(_action_key, plan.actions))
+                length, cached = cache.longest_prefix(hashes, step + 1, min(len(plan.actions), scaled_max_steps))
+                if length > step + 1:
+                    node = cached.detached()
+                    step = length
+                    continue
+                if cached is not None:
+                    child = cached.detached()
+                    node.children[key] = child
+            if child is None:
+                try:
+                    # Determine valid actions for the current state
+                    action = self.es._find_valid_action(ba, node.state, node.beluga_seq)
+                except EvaluationException as e:
+                    child = e
+                else:
+                    # Apply the action and move to the next state, updating the trailer location
+                    trailer_location = dict(node.trailer_location)
+                    self.es._update_trailer_location(ba, trailer_location)
+                    child = _PlanTrieNode(self.domain.get_next_state(node.state, action),
+                                          node.beluga_seq, trailer_location, self.es, self.domain)
+                    if cache is not None:
+                        cache.put(hashes[step], child.detached(), state_size(child.state))
+                node.children[key] = child
+            if isinstance(child, EvaluationException):
+                error = child
+                break
+            node = child
+            step += 1
+        else:
+            # Same final step as when all the steps have been simulated
+            step = scaled_max_steps - 1
+
+        final_state = node.get_final_state(self.es)
+        if error is not None:
+            return SingleSimulationOutcome(plan_construction_time=elapsed_time,
+                                           error_msg=error.args[0],
+                                           plan=plan,
+                                           final_state=final_state,
+                                           final_step=step,
+                                           goal_reached=False,
+                                           abrupt_plan_end=False,
+                                           invalid_plan=isinstance(error, InvalidActionException),
+                                           time_limit_reached=False,
+                                           step_limit_reached=False,
+                                           free_racks=self.es._get_free_racks(final_state),
+                                           prb=self.prb,
+                                           alpha=self.alpha,
+                                           beta=self.beta)
 
-                # Check whether the goal has been reached
-                if self.domain._is_terminal(state):
-                    goal_reached = True
+        # The evaluation proceeded normally
+        return SingleSimulationOutcome(plan_construction_time=elapsed_time,
+                                       error_msg=None,
+                                       plan=plan,
+                                       final_state=final_state,
+                                       final_step=step,
+                                       goal_reached=goal_reached,
+                                       abrupt_plan_end=abrupt_plan_end,
+                                       invalid_plan=False,
+                                       time_limit_reached=False,
+                                       step_limit_reached= (step == self.max_steps-1),
+                                       free_racks=self.es._get_free_racks(final_state),
+                                       prb=self.prb,
+                                       alpha=self.alpha,
+                                       beta=self.beta)
+
+    def validate_many(self, plans : list[BelugaPlan], num_workers : int = 1):
+        """Validates a collection of plans on the same domain, without calling the
+        planner. The plans are processed in lexicographic order of their actions
+        through a trie of the visited states, so that the prefixes they share are
+        only simulated once; a trie node is dropped as soon as no remaining plan
+        goes through it. The planner is not used, and the construction time of
+        the outcomes is None.
+
+        Args:
+            plans (list[BelugaPlan]): plans to validate
+            num_workers (int, optional): number of worker processes; each one
+            builds its own domain and validates a contiguous range of the sorted
+            plans. Defaults to 1.
+
+        Returns:
+            list[SingleSimulationOutcome]: The outcome of each plan, in the same order
+        """
+        if num_workers <= 0:
+            raise Exception('The number of workers should be strictly positive')
+        # Sort the plans, so that the plans sharing a prefix are consecutive
+        keys = _plan_keys(plans)
+        order = sorted(range(len(plans)), key=keys.__getitem__)
+        num_workers = min(num_workers, len(plans))
+        if num_workers > 1:
+            return self._validate_many_parallel(plans, order, num_workers)
+        if self.domain is None:
+            self._setup_domain()
+        outcomes = [None] * len(plans)
+        for plan_num, outcome in self._validate_sorted(plans, keys, order):
+            outcomes[plan_num] = outcome
+        return outcomes
+
+    def _validate_sorted(self, plans, keys, order):
+        # Yields the outcomes of the plans, visited in the given (sorted) order
+        root = self._plan_trie()
+        prev_key = ()
+        for plan_num in order:
+            key = keys[plan_num]
+            # Drop the branches of the trie no later plan can go through, i.e.
+            # at the node where the plan leaves the previous one, all the
+            # children but the one the plan goes to
+            node = root
+            for k, action_key in enumerate(key):
+                if k >= len(prev_key) or prev_key[k] != action_key:
+                    child = node.children.get(action_key)
+                    node.children = {} if child is None else {action_key : child}
                     break
-
-                # Check whether the plan has already ended
-                if step >= len(plan.actions):
-                    abrupt_plan_end = True
+                node = node.children.get(action_key)
+                if not isinstance(node, _PlanTrieNode):
                     break
-
-                # Retrive current action
-                ba = plan.actions[step]
-                # Determine valid actions for the current state
-                action = self.es._find_valid_action(ba, state, beluga_seq)
-
-                # print('=' * 78)
-                # print(action)
-
-                # Apply the action and move to the next state
-                o = self.domain.step(action)
-                state = o.observation
-
-                # Update the trailer location
-                self.es._update_trailer_location(ba, trailer_location)
-
-            except EvaluationException as e:
-                final_state = self.es._skd_state_to_beluga_state(state=state,
-                                                            beluga_seq=beluga_seq,
-                                                            trailer_location=trailer_location)
-                outcome = SingleSimulationOutcome(plan_construction_time=elapsed_time,
-                                                  error_msg=e.args[0],
-                                                  plan=plan,
-                                                  final_state=final_state,
-                                                  final_step=step,
-                                                  goal_reached=False,
-                                                  abrupt_plan_end=False,
-                                                  invalid_plan=isinstance(e, InvalidActionException),
-                                                  time_limit_reached=False,
-                                                  step_limit_reached=False,
-                                                  free_racks=self.es._get_free_racks(final_state),
-                                                  prb=self.prb,
-                                                  alpha=self.alpha,
-                                                  beta=self.beta)
-                if out_stem is not None:
-                    self.es._dump_to_json_file(out_stem + '_outcome.json', outcome)
-                return outcome
-
-        # The evaluation proceeded normally
-        final_state = self.es._skd_state_to_beluga_state(state=state,
-                                                    beluga_seq=beluga_seq,
-                                                    trailer_location=trailer_location)
-        outcome = SingleSimulationOutcome(plan_construction_time=elapsed_time,
-                                          error_msg=None,
-                                          plan=plan,
-                                          final_state=final_state,
-                                          final_step=step,
-                                          goal_reached=goal_reached,
-                                          abrupt_plan_end=abrupt_plan_end,
-                                          invalid_plan=False,
-                                          time_limit_reached=False,
-                                          step_limit_reached= (step == self.max_steps-1),
-                                          free_racks=self.es._get_free_racks(final_state),
-                                          prb=self.prb,
-                                          alpha=self.alpha,
-                                          beta=self.beta)
-        if out_stem is not None:
-            self.es._dump_to_json_file(out_stem + '_outcome.json', outcome)
-
-        # Return the outcome
-        return outcome
+            prev_key = key
+            yield plan_num, self._validate_plan(plans[plan_num], None, False, root)
+
+    def _validate_many_parallel(self, plans, order, num_workers):
+        ctx = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+        template = copy.copy(self)
+        template.planner = None
+        template.domain = None
+        template.es = None
+        results = ctx.Queue()
+        # Contiguous ranges of the sorted plans, so that the plans sharing a
+        # prefix are mostly validated by the same worker
+        bounds = [len(order) * w // num_workers for w in range(num_workers + 1)]
+        chunks = [order[bounds[w]:bounds[w+1]] for w in range(num_workers)]
+        workers = [ctx.Process(target=_validation_worker,
+                               args=(template, chunk, [plans[i] for i in chunk], results),
+                               daemon=True)
+                   for chunk in chunks]
+        for worker in workers:
+            worker.start()
+        try:
+            outcomes = [None] * len(plans)
+            for _ in range(len(plans)):
+                plan_num, json_obj = results.get()
+                if plan_num is None:
+                    raise Exception(f'Error in a validation worker:\n{json_obj}')
+                outcomes[plan_num] = SingleSimulationOutcome.from_json_obj(json_obj, self.prb, self.alpha, self.beta)
+        finally:
+            for worker in workers:
+                worker.join(timeout=1)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+        return outcomes
 
     def __del__(self):
         if self.domain is not None:
             self.domain.cleanup()
 
 
+def _validation_worker(evaluator : DeterministicEvaluator,
+                       plan_nums : list[int],
+                       plans : list[BelugaPlan],
+                       results):
+    try:
+        evaluator._setup_domain()
+        keys = _plan_keys(plans)
+        for k, outcome in evaluator._validate_sorted(plans, keys, range(len(plans))):
+            results.put((plan_nums[k], outcome.to_json_obj()))
+        evaluator.domain.cleanup()
+    except Exception:
+        results.put((None, traceback.format_exc()))
+
 
 class ProbabilisticEvaluator:
 
@@ -656,11 +1024,15 @@ class ProbabilisticEvaluator:
                  time_limit : int = None,
                  seed : int = None,
                  alpha : float = 0.7,
-                 beta : float = 0.0004
+                 beta : float = 0.0004,
+                 num_workers : int = 1,
+                 validate_states : bool = False
                  ):
         # Check arguments
         if nsamples <= 0:
             raise Exception('The number of samples should be strictly positive')
+        if num_workers <= 0:
+            raise Exception('The number of workers should be strictly positive')
         if max_steps is not None and max_steps <= 0:
             raise Exception('The number of steps should be None or strictly positive')
         if time_limit is not None and time_limit <= 0:
@@ -676,9 +1048,15 @@ class ProbabilisticEvaluator:
         self.seed = seed
         self.alpha = alpha
         self.beta = beta
+        self.num_workers = num_workers
+        self.validate_states = validate_states
         # Internal fields
         self.es = None
         self.domain = None
+        # Planner time of every worker of a parallel evaluation, and index of
+        # the current worker (see _time_limit_exceeded)
+        self._shared_elapsed_times = None
+        self._worker = None
 
     def setup(self):
         # Build an SKD domain
@@ -687,10 +1065,22 @@ class ProbabilisticEvaluator:
                                      seed=self.seed,
                                      classic=False)
         # Build a support object
-        self.es = EvaluationSupport(self.prb, self.domain)
+        self.es = EvaluationSupport(self.prb, self.domain, validate_states=self.validate_states)
         # Setup the planner
         self.planner.setup(self.prb)
 
+    def _time_limit_exceeded(self, past_elapsed_time, elapsed_time):
+        if self.time_limit is None:
+            return False
+        if self._shared_elapsed_times is None:
+            return past_elapsed_time + elapsed_time > self.time_limit
+        # Parallel evaluation: publish the time spent by this worker so far, and
+        # count the time spent by the other workers, including on their current
+        # samples, so that all the running simulations stop at the deadline
+        with self._shared_elapsed_times.get_lock():
+            self._shared_elapsed_times[self._worker] = past_elapsed_time + elapsed_time
+            return sum(self._shared_elapsed_times) > self.time_limit
+
     def _run_simulation(self, past_elapsed_time):
         # Tell the planner that another episode is starting
         try:
@@ -735,8 +1125,8 @@ class ProbabilisticEvaluator:
                 if len(beluga_seq) == 0 or beluga_seq[-1] != cbeluga:
                     beluga_seq.append(cbeluga)
 
-                # Convert the state
-                bstate = self.es._skd_state_to_beluga_state(state, beluga_seq, trailer_location)
+                # Convert the state (from the changes since the previous step)
+                bstate = self.es._update_beluga_state(state, beluga_seq, trailer_location)
 
                 # Obtain the current metadata
                 metadata = ProbabilisticPlanningMetatada(current_step, elapsed_time)
@@ -760,7 +1150,7 @@ class ProbabilisticEvaluator:
 
                 # First time limit check: this might be triggered in case the time spent
                 # on past iterations already exceeds the limit
-                if self.time_limit is not None and past_elapsed_time + elapsed_time > self.time_limit:
+                if self._time_limit_exceeded(past_elapsed_time, elapsed_time):
                     time_limit_reached = True
                     raise EvaluationException('Time limit exceeded')
 
@@ -777,7 +1167,7 @@ class ProbabilisticEvaluator:
                 # print(ba)
 
                 # Second time limit check. This refers to the current simulation.
-                if self.time_limit is not None and past_elapsed_time + elapsed_time > self.time_limit:
+                if self._time_limit_exceeded(past_elapsed_time, elapsed_time):
                     time_limit_reached = True
                     raise EvaluationException('Time limit exceeded')
 
@@ -839,15 +1229,18 @@ class ProbabilisticEvaluator:
                 out_stem = os.path.join(out_stem, self.problem_name)
 
         # Run simulations
-        sim_outcomes = []
-        total_elapsed_time = 0
-        for sample_num in range(self.nsamples):
-            # Run a simulation
-            sim_outcome = self._run_simulation(total_elapsed_time)
-            # Update the total elapsed time
-            total_elapsed_time += sim_outcome.plan_construction_time
-            # Store the outcome
-            sim_outcomes.append(sim_outcome)
+        if self.num_workers > 1 and self.nsamples > 1:
+            sim_outcomes = self._run_parallel_simulations()
+        else:
+            sim_outcomes = []
+            total_elapsed_time = 0
+            for sample_num in range(self.nsamples):
+                # Run a simulation
+                sim_outcome = self._run_simulation(total_elapsed_time)
+                # Update the total elapsed time
+                total_elapsed_time += sim_outcome.plan_construction_time
+                # Store the outcome
+                sim_outcomes.append(sim_outcome)
         # Compute an aggregated outcome
         outcome = MultipleSimulationOutcome(sim_outcomes)
 
@@ -858,7 +1251,76 @@ class ProbabilisticEvaluator:
         # Return the result
         return outcome
 
+    def _run_parallel_simulations(self):
+        # Each worker gets its own domain and planner (built by setup() in the
+        # worker) and takes the next sample from the queue once it is done with
+        # the previous one
+        num_workers = min(self.num_workers, self.nsamples)
+        ctx = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+        template = copy.copy(self)
+        template.domain = None
+        template.es = None
+        # Time spent by the planner in each worker, updated after every planner
+        # call: the time limit applies to the sum over all workers, as it applies
+        # to the sum over all samples in the sequential case. Once it is exceeded,
+        # the running simulations stop at their next time limit check and the
+        # remaining ones stop before their first planner call, hence all samples
+        # are reported, as in the sequential case
+        elapsed_times = ctx.Array('d', num_workers)
+        samples = ctx.Queue()
+        for sample_num in range(self.nsamples):
+            samples.put(sample_num)
+        for _ in range(num_workers):
+            samples.put(None)
+        results = ctx.Queue()
+        workers = [ctx.Process(target=_probabilistic_evaluation_worker,
+                               args=(template, w, samples, elapsed_times, results),
+                               daemon=True)
+                   for w in range(num_workers)]
+        for worker in workers:
+            worker.start()
+        try:
+            sim_outcomes = [None] * self.nsamples
+            for _ in range(self.nsamples):
+                sample_num, json_obj = results.get()
+                if sample_num is None:
+                    raise Exception(f'Error in an evaluation worker:\n{json_obj}')
+                sim_outcomes[sample_num] = SingleSimulationOutcome.from_json_obj(json_obj, self.prb, self.alpha, self.beta)
+        finally:
+            for worker in workers:
+                worker.join(timeout=1)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+        return sim_outcomes
+
     # def __del__(self): # TODO this one does not work when an output folder is specified: ask Florent about it
     #     if self.domain is not None:
     #         self.domain.cleanup()
 
+
+def _probabilistic_evaluation_worker(evaluator : ProbabilisticEvaluator,
+                                     worker : int,
+                                     samples,
+                                     elapsed_times,
+                                     results):
+    try:
+        evaluator.setup()
+        evaluator._shared_elapsed_times = elapsed_times
+        evaluator._worker = worker
+        # Time spent by the planner on the samples completed by this worker
+        worker_elapsed_time = 0
+        for sample_num in iter(samples.get, None):
+            # Use the same flight ordering as the sequential evaluation,
+            # where the domain seed is incremented at every sample
+            if evaluator.seed is not None:
+                evaluator.domain._current_seed = evaluator.seed + sample_num
+            sim_outcome = evaluator._run_simulation(worker_elapsed_time)
+            if sim_outcome.plan_construction_time is not None:
+                worker_elapsed_time += sim_outcome.plan_construction_time
+            with elapsed_times.get_lock():
+                elapsed_times[worker] = worker_elapsed_time
+            results.put((sample_num, sim_outcome.to_json_obj()))
+        evaluator.domain.cleanup()
+    except Exception:
+        results.put((None, traceback.format_exc()))
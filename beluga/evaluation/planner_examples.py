@@ -8,7 +8,7 @@ from .planner_api import SwitchToNextBeluga
 from encoder.pddl_encoding.variant import Variant
 from beluga_lib.beluga_problem import BelugaProblem
 from beluga_lib.problem_state import BelugaProblemState
-from encoder.pddl_encoding import DomainEncoding, encode
+from encoder.pddl_encoding import DOMAIN_CACHE, encode
 from skd_domains.skd_pddl_domain import SkdPDDLDomain
 from skd_domains.skd_base_domain import Action, SkdBaseDomain
 from skdecide.hub.solver.lazy_astar import LazyAstar
@@ -31,13 +31,13 @@ def _generate_pddl(
     variant.classic = classic
     variant.probabilistic = probabilistic
 
-    domain_encoding = DomainEncoding(variant, beluga_problem)
-    domain_str = domain_encoding.domain.to_pddl("beluga")
+    cached_domain = DOMAIN_CACHE.get(variant, beluga_problem)
+    domain_str = cached_domain.domain_str
 
     problem_name = 'Internal Beluga Problem Instance'
     pddl_problem = encode(name=problem_name,
                           beluga_problem=beluga_problem,
-                          domain=domain_encoding.domain,
+                          domain=cached_domain.encoding.domain,
                           variant=variant,
                           state=state)
 
@@ -0,0 +1,109 @@
+import hashlib
+import sys
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+from skd_domains.packed_state import PackedState
+
+
+def prefix_hashes(action_keys : Iterable[str]) -> list[bytes]:
+    """Chained hashes of the prefixes of a plan, the k-th one identifying the
+    first k+1 actions
+
+    Args:
+        action_keys (Iterable[str]): keys of the actions of the plan
+
+    Returns:
+        list[bytes]: The hash of each prefix
+    """
+    res = []
+    digest = b''
+    for key in action_keys:
+        digest = hashlib.blake2b(digest + key.encode(), digest_size=16).digest()
+        res.append(digest)
+    return res
+
+
+def state_size(state : Any) -> int:
+    """Approximate memory used by a state, not counting the argument tuples of
+    the atoms, which are shared between states"""
+    if isinstance(state, PackedState):
+        return sys.getsizeof(state.bits) + sys.getsizeof(state.values)
+    return (sum(sys.getsizeof(atoms) for atoms in state.atoms)
+            + sum(sys.getsizeof(values) for values in state.fluents))
+
+
+class PlanPrefixCache:
+    """LRU cache of the states reached by plan prefixes, keyed by the hashes
+    computed by `prefix_hashes`, so that the evaluation of a plan can resume from
+    the longest prefix it shares with the plans evaluated before. The cache is
+    bounded both in number of entries and in (approximate) memory.
+
+    Args:
+        max_entries (int, optional): maximum number of cached prefixes. Defaults to 10000.
+        max_bytes (int, optional): maximum memory used by the cached states, as
+        estimated by `state_size`. Defaults to None (no limit).
+    """
+
+    def __init__(self, max_entries : int = 10000, max_bytes : int = None) -> None:
+        if max_entries <= 0:
+            raise ValueError('The number of entries should be strictly positive')
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError('The memory limit should be None or strictly positive')
+        self.max_entries : int = max_entries
+        self.max_bytes : int = max_bytes
+        self.hits : int = 0
+        self.misses : int = 0
+        self.bytes : int = 0
+        self._entries : OrderedDict[bytes, tuple[Any, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def longest_prefix(self, hashes : list[bytes], start : int, stop : int) -> tuple[int, Any]:
+        """Returns the longest cached prefix whose length is in [start, stop],
+        counting a hit or a miss
+
+        Args:
+            hashes (list[bytes]): hashes of the prefixes of the plan (see `prefix_hashes`)
+            start (int): minimum length of the prefix
+            stop (int): maximum length of the prefix
+
+        Returns:
+            tuple[int, Any]: The length and the cached value of the prefix, or (0, None)
+        """
+        entries = self._entries
+        for length in range(stop, start - 1, -1):
+            key = hashes[length - 1]
+            entry = entries.get(key)
+            if entry is not None:
+                entries.move_to_end(key)
+                self.hits += 1
+                return length, entry[0]
+        self.misses += 1
+        return 0, None
+
+    def put(self, key : bytes, value : Any, size : int) -> None:
+        """Stores the value reached by a prefix, evicting the least recently used
+        ones if a limit is exceeded"""
+        entries = self._entries
+        old = entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        entries[key] = (value, size)
+        self.bytes += size
+        while len(entries) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            _, (_, evicted_size) = entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def clear(self) -> None:
+        """Removes all the entries (the counters are kept)"""
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {'entries': len(self._entries), 'bytes': self.bytes,
+                'hits': self.hits, 'misses': self.misses}
@@ -29,6 +29,7 @@ from skd_domains.skd_pddl_domain import SkdPDDLDomain
 from skd_domains.skd_ppddl_domain import SkdPPDDLDomain
 from skd_domains.skd_spddl_domain import SkdSPDDLDomain
 from skd_domains.skd_gym_domain import BelugaGymCompatibleDomain, BelugaGymEnv
+from skd_domains.skd_subproc_env import BelugaSubprocVecEnv
 
 from generate_instance import ProbConfig, main as encode_json
 
@@ -321,6 +322,7 @@ class ExampleBelugaGymCompatibleDomain(BelugaGymCompatibleDomain):
             self.current_pddl_state
         ).contains(pddl_action):
             outcome = self.skd_beluga_domain._state_step(pddl_action)
+            self.current_pddl_state = outcome.state
             outcome.state = self.make_state_array(outcome.state)
             return TransitionOutcome(
                 state=outcome.state,
@@ -493,6 +495,27 @@ if __name__ == "__main__":
         required=False,
     )
 
+    parser.add_argument(
+        "-nw",
+        "--num-workers",
+        dest="num_workers",
+        type=int,
+        required=False,
+        default=0,
+        help="number of worker processes simulating the environments during training \
+            (BelugaSubprocVecEnv), 0 to train on a single BelugaGymEnv",
+    )
+
+    parser.add_argument(
+        "-epw",
+        "--envs-per-worker",
+        dest="envs_per_worker",
+        type=int,
+        required=False,
+        default=1,
+        help="number of environments simulated by each worker process",
+    )
+
     # Parse command line arguments
     args = parser.parse_args()
 
@@ -566,11 +589,13 @@ if __name__ == "__main__":
             )
         )
     )
-    domain_factory = lambda: (
+    domain_factory = lambda seed=None: (
         SkdPPDDLDomain(inst, problem_name, problem_folder)
         if args.probabilistic and args.probabilistic_model == "ppddl"
         else (
-            SkdSPDDLDomain(inst, problem_name, problem_folder, classic=classic)
+            SkdSPDDLDomain(
+                inst, problem_name, problem_folder, seed=seed, classic=classic
+            )
             if args.probabilistic and args.probabilistic_model == "arrivals"
             else SkdPDDLDomain(inst, problem_name, problem_folder, classic=classic)
         )
@@ -596,6 +621,25 @@ if __name__ == "__main__":
     # If you just want to have a gymnasium environment on which to train your RL agent,
     # do the 2 following tasks: 1) specialize the BelugaGymCompatibleDomain class to your tensor representation
     # needs; 2) pass this specialized class to the BelugaGymEnv class, which is your gym environment.
+    # The BelugaSubprocVecEnv can be used instead of the BelugaGymEnv to simulate several
+    # environments in parallel worker processes: it takes a factory of Gym-compatible
+    # domains rather than a domain, since each worker creates its own domains.
+    if args.num_workers > 0:
+        env = BelugaSubprocVecEnv
+        env_config = {
+            "domain_factory": lambda seed: ExampleBelugaGymCompatibleDomain(
+                skd_beluga_domain=domain_factory(seed),
+                max_fluent_value=1000,
+                max_nb_atoms_or_fluents=1000,
+                max_nb_steps=1000,
+            ),
+            "num_workers": args.num_workers,
+            "envs_per_worker": args.envs_per_worker,
+            "domain_seed": args.seed,
+        }
+    else:
+        env = BelugaGymEnv
+        env_config = {"domain": gym_compatible_domain}
     config = (
         PPOConfig()
         .api_stack(
@@ -603,8 +647,8 @@ if __name__ == "__main__":
             enable_env_runner_and_connector_v2=False,
         )
         .environment(
-            env=BelugaGymEnv,
-            env_config={"domain": gym_compatible_domain},
+            env=env,
+            env_config=env_config,
         )
         .env_runners(num_env_runners=1)
     )
@@ -6,37 +6,44 @@ import argparse
 import os
 
 from beluga_lib.beluga_problem import BelugaProblem
-from encoder.pddl_encoding import DomainEncoding
+from encoder.pddl_encoding import DOMAIN_CACHE, DomainEncoding
 from encoder.pddl_encoding import encode
 from beluga_lib.beluga_problem import BelugaProblemDecoder
 from encoder.pddl_encoding.variant import Variant
 
 
-def generate_domain(variant: Variant, problem_out, inst=None, domain_name="domain.pddl"):
-    domain_encoding = DomainEncoding(variant, inst)
-    name = 'beluga'
+def generate_domain(variant: Variant, problem_out, inst=None, domain_name="domain.pddl", skip_comments=False):
+    cached_domain = DOMAIN_CACHE.get(variant, inst, 'beluga')
     if problem_out:
         with open(os.path.join(problem_out, domain_name), 'w') as out_file:
-            out_file.write(domain_encoding.domain.to_pddl(name))
+            if skip_comments:
+                cached_domain.encoding.domain.write_pddl(out_file, 'beluga', skip_comments)
+            else:
+                out_file.write(cached_domain.domain_str)
+    elif skip_comments:
+        cached_domain.encoding.domain.write_pddl(sys.stdout, 'beluga', skip_comments)
+        print()
     else:
-        print(domain_encoding.domain.to_pddl(name))
+        print(cached_domain.domain_str)
 
-    return domain_encoding
+    return cached_domain.encoding
 
 
-def generate_problem( variant: Variant, inst: BelugaProblem, problem_name: str, domain_encoding: DomainEncoding, problem_out):
+def generate_problem( variant: Variant, inst: BelugaProblem, problem_name: str, domain_encoding: DomainEncoding, problem_out, skip_comments=False):
     pddl_problem = encode(problem_name, inst, domain_encoding.domain, variant)
 
     name = "beluga-" + problem_name
     name = name.replace(".","")
+    # The PDDL text is streamed to the output, it is never built in memory
     if problem_out:
         with open(os.path.join(problem_out, problem_name + ".pddl"), 'w') as out_file:
-            out_file.write(pddl_problem.to_pddl(name))
+            pddl_problem.write_pddl(out_file, name, skip_comments)
     else:
-        print(pddl_problem.to_pddl(name))
+        pddl_problem.write_pddl(sys.stdout, name, skip_comments)
+        print()
 
 
-def main(instance_file, variant: Variant, problem_out):
+def main(instance_file, variant: Variant, problem_out, skip_comments=False):
 
     with open(instance_file, 'r') as fp:
         inst = json.load(fp, cls=BelugaProblemDecoder)
@@ -45,11 +52,11 @@ def main(instance_file, variant: Variant, problem_out):
     instance_name = problem_name.replace('problem_', '')
 
     if variant.probabilistic:
-        domain_encoding = generate_domain(variant, problem_out, inst, 'domain_' + problem_name + ".pddl")
+        domain_encoding = generate_domain(variant, problem_out, inst, 'domain_' + problem_name + ".pddl", skip_comments)
     else:
-        domain_encoding = generate_domain(variant, problem_out, inst=None, domain_name='domain_' + problem_name + ".pddl")
+        domain_encoding = generate_domain(variant, problem_out, inst=None, domain_name='domain_' + problem_name + ".pddl", skip_comments=skip_comments)
 
-    generate_problem(variant, inst, problem_name, domain_encoding, problem_out)
+    generate_problem(variant, inst, problem_name, domain_encoding, problem_out, skip_comments)
 
 
 
@@ -69,6 +76,9 @@ if __name__ == "__main__":
     parser.add_argument('-p', dest="probabilistic", 
                         help="probabilistic encoding", 
                         action='store_true')
+    parser.add_argument('-c', '--skip-comments', dest="skip_comments",
+                        help="do not write comments in the PDDL files",
+                        action='store_true')
 
 
     args = parser.parse_args()
@@ -80,4 +90,4 @@ if __name__ == "__main__":
     variant.classic = not args.numeric
     variant.probabilistic = args.probabilistic
 
-    main(instance_file, variant, problem_out)
+    main(instance_file, variant, problem_out, args.skip_comments)
@@ -5,6 +5,7 @@ import time
 
 from beluga_lib.beluga_problem import BelugaProblemDecoder
 from skd_domains.skd_spddl_domain import SkdSPDDLDomain
+from skd_domains.profiling import Profiler
 
 from controller import CustomController, RandomController, MedianIndexController
 
@@ -44,6 +45,81 @@ def save_reward_to_file(total_reward, max_steps, domain_seed, controller_seed, p
     return filepath
 
 
+def make_controller(controller_name, domain, controller_seed):
+    """
+    Build the controller with the given name ('random', 'median' or 'custom').
+    Returns the controller and its display name.
+    """
+    if controller_name == "random":
+        return RandomController(domain, seed=controller_seed), "RandomController"
+    elif controller_name == "median":
+        return MedianIndexController(domain), "MedianIndexController"
+    elif controller_name == "custom":
+        return CustomController(domain, seed=controller_seed), "CustomController"
+    else:
+        raise ValueError(f"Unknown controller: {controller_name}")
+
+
+def make_domain(inst, problem_name, problem_folder, domain_seed, profiler=None):
+    """
+    Build the SkdSPDDLDomain of the problem with the given seed, and its action and
+    observation spaces (which samples a first episode, so that the next reset gives
+    the episode following the one of the seed).
+    If a profiler is given, the domain records its phases in it.
+    """
+    domain = SkdSPDDLDomain(inst, problem_name, problem_folder, seed=domain_seed, classic=True) # type: ignore
+    if profiler is not None:
+        domain.set_profiler(profiler)
+    domain.get_action_space()
+    domain.get_observation_space()
+    return domain
+
+
+def run_episode(domain, controller, max_simulation_steps, verbose=False):
+    """
+    Simulate one episode of the domain with the controller.
+    Returns a dictionary with the total reward, the number of steps, and whether the
+    goal was reached. The time spent in the controller and in the domain is recorded
+    in the 'controller_decision' and 'domain_step' phases of the profiler of the domain.
+    """
+    s = domain.reset()
+    if verbose:
+        print(f"\nInitial state: {s}")
+    
+    total_reward = 0
+    step = 0
+    
+    while not domain._is_terminal(s) and step < max_simulation_steps:
+        with controller.profiler().phase("controller_decision"):
+            a = controller.control(s)
+        if verbose:
+            print(f"\nApplying action: {a}")
+        
+        with domain.profiler.phase("domain_step"):
+            o = domain.step(a)
+        is_terminated = o.termination
+        s = o.observation
+        r = o.value.reward
+        
+        if verbose:
+            print(f"\nCurrent state: {s}")
+            print(f"Reward: {r}")
+        
+        step += 1
+        total_reward += r
+
+        if is_terminated:
+            if verbose:
+                print("\nEpisode terminated.")
+            break
+    
+    return {
+        "total_reward": total_reward,
+        "steps": step,
+        "goal_reached": domain._is_terminal(s),
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Beluga simulation with controller",
@@ -95,6 +171,13 @@ def main():
         help="Save the final reward to a text file in the final_rewards folder"
     )
     
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="Write per-phase timings (encoding, parsing, action generation, controller, ...) to this JSON file"
+    )
+    
     args = parser.parse_args()
     
     # Process problem_name: add .json if not present
@@ -111,58 +194,21 @@ def main():
         inst = json.load(fp, cls=BelugaProblemDecoder)
 
     # Initialize domain
-    domain = SkdSPDDLDomain(inst, problem_name, problem_folder, seed=args.domain_seed, classic=True) # type: ignore
-    action_space = domain.get_action_space()
-    observation_space = domain.get_observation_space()
+    domain = make_domain(inst, problem_name, problem_folder, args.domain_seed,
+                         Profiler() if args.profile is not None else None)
 
     # Initialize controller based on controller_name
-    if args.controller_name == "random":
-        controller = RandomController(domain, seed=args.controller_seed)
-        controller_display = "RandomController"
-    elif args.controller_name == "median":
-        controller = MedianIndexController(domain)
-        controller_display = "MedianIndexController"
-    elif args.controller_name == "custom":
-        controller = CustomController(domain, seed=args.controller_seed)
-        controller_display = "CustomController"
-    else:
-        raise ValueError(f"Unknown controller: {args.controller_name}")
+    controller, controller_display = make_controller(args.controller_name, domain, args.controller_seed)
 
     if args.verbose:
         print(f"Simulating with {controller_display}")
         print(f"Domain seed: {args.domain_seed}, Controller seed: {args.controller_seed}")
         print(f"Problem: {problem_name}, Max steps: {args.max_simulation_steps}")
     
-    s = domain.reset()
-    if args.verbose:
-        print(f"\nInitial state: {s}")
-    
-    total_reward = 0
-    step = 0
-    
     start_time = time.time()
-    
-    while not domain._is_terminal(s) and step < args.max_simulation_steps:
-        a = controller.control(s)
-        if args.verbose:
-            print(f"\nApplying action: {a}")
-        
-        o = domain.step(a)
-        is_terminated = o.termination
-        s = o.observation
-        r = o.value.reward
-        
-        if args.verbose:
-            print(f"\nCurrent state: {s}")
-            print(f"Reward: {r}")
-        
-        step += 1
-        total_reward += r
 
-        if is_terminated:
-            if args.verbose:
-                print("\nEpisode terminated.")
-            break
+    outcome = run_episode(domain, controller, args.max_simulation_steps, verbose=args.verbose)
+    total_reward = outcome["total_reward"]
     
     domain.cleanup()
     
@@ -173,6 +219,10 @@ def main():
     
     print(f"Total reward: {total_reward}")
     
+    if args.profile is not None:
+        domain.profiler.dump(args.profile)
+        print(f"Profile saved to: {args.profile}")
+    
     # Save final reward if requested
     if args.save_final_reward:
         filepath = save_reward_to_file(
@@ -0,0 +1,161 @@
+import itertools
+from typing import Iterable, NamedTuple, Sequence
+
+from plado import pddl
+from plado.semantics.task import State as PladoState
+from plado.semantics.task import Task
+
+# Predicates whose facts follow the position of the flights in the processing
+# order (and not the flights themselves): they are left untouched when patching
+SEQUENCING_PREDICATES = ("next-flight-to-process", "processed-flight")
+
+
+class Episode(NamedTuple):
+    """Episode-specific parts of a task patched by an EpisodeTemplate"""
+
+    order: tuple[int]
+    objects: tuple[str]
+    initial_state: PladoState
+    static_facts: tuple[set[tuple[int]]]
+
+
+class EpisodeTemplate:
+    """Grounded plado task compiled once for a Beluga problem, from which the task of
+    every episode is obtained by patching the flight ordering.
+
+    Episodes of the SkdSPDDLDomain only differ by the order in which Beluga flights
+    are processed. In the PDDL encoding, flights are declared in processing order, the
+    first one is the `processed-flight` and consecutive ones are linked by
+    `next-flight-to-process` facts. The template therefore sees flights as positional
+    slots: the sequencing facts only refer to slots and never change, whereas every
+    other fact about the flight in slot i of the template is moved to the slot the
+    flight occupies in the episode. The resulting task is identical to the one obtained
+    by encoding and parsing the episode problem from scratch, down to the object ids
+    and the insertion order of the static facts.
+
+    Args:
+        task (Task): plado task of the problem encoded with the template flight order
+        problem (pddl.Problem): parsed plado problem the task was built from
+        flight_names (Sequence[str]): names of the flights, in template order
+    """
+
+    def __init__(
+        self, task: Task, problem: pddl.Problem, flight_names: Sequence[str]
+    ) -> None:
+        self.task: Task = task
+        self.flight_names: tuple[str] = tuple(flight_names)
+        self.objects: tuple[str] = task.objects
+        object_idx = {o: i for i, o in enumerate(task.objects)}
+        self.flight_ids: tuple[int] = tuple(object_idx[f] for f in self.flight_names)
+        slot_of = {o: k for k, o in enumerate(self.flight_ids)}
+        self.initial_state: PladoState = task.initial_state
+        self.static_facts: tuple[set[tuple[int]]] = task.static_facts
+
+        predicate_idx = {p.name: i for i, p in enumerate(task.predicates)}
+        skipped = set(predicate_idx[p] for p in SEQUENCING_PREDICATES if p in predicate_idx)
+
+        # For every predicate mentioning flights, record the facts in insertion order:
+        # non-flight facts are kept as is, flight facts are replaced by a placeholder
+        # and stored per flight, split around the flight argument, so that they can be
+        # emitted in episode order with the flight argument replaced by its new slot
+        self._layouts: dict[int, list[tuple[int] | None]] = {}
+        self._flight_facts: dict[int, list[list[tuple[tuple[int], tuple[int]]]]] = {}
+        for x in problem.initial:
+            if not isinstance(x, pddl.Atom):
+                continue
+            pid = predicate_idx[x.name]
+            if pid in skipped:
+                continue
+            args = tuple(object_idx[a.name] for a in x.arguments)
+            layout = self._layouts.setdefault(pid, [])
+            pos = next((i for i, o in enumerate(args) if o in slot_of), None)
+            if pos is None:
+                layout.append(args)
+            else:
+                layout.append(None)
+                self._flight_facts.setdefault(pid, [[] for _ in self.flight_ids])[
+                    slot_of[args[pos]]
+                ].append((args[:pos], args[pos + 1 :]))
+        # Facts only made of a flight (e.g. types) are the same whatever the ordering
+        self._layouts = {
+            pid: layout
+            for pid, layout in self._layouts.items()
+            if pid in self._flight_facts
+            and any(h or t for facts in self._flight_facts[pid] for h, t in facts)
+        }
+
+    def _remap_facts(self, pid: int, order: Sequence[int]) -> set[tuple[int]]:
+        flight_facts = (
+            h + (self.flight_ids[k],) + t
+            for k, slot in enumerate(order)
+            for h, t in self._flight_facts[pid][slot]
+        )
+        if pid < self.task.num_fluent_predicates:
+            # Insertion order of the initial state does not matter
+            return set(
+                itertools.chain(
+                    (args for args in self._layouts[pid] if args is not None),
+                    flight_facts,
+                )
+            )
+        return set(
+            args if args is not None else next(flight_facts)
+            for args in self._layouts[pid]
+        )
+
+    def episode(self, order: Iterable[int]) -> Episode:
+        """Computes the task patch of the episode whose flights are processed in the
+        given order, without installing it
+
+        Args:
+            order (Iterable[int]): template indices of the flights, in processing order
+
+        Returns:
+            Episode: The objects, initial state and static facts of the episode
+        """
+        order = tuple(order)
+        assert sorted(order) == list(range(len(self.flight_ids))), "invalid flight order"
+
+        objects = list(self.objects)
+        for k, slot in enumerate(order):
+            objects[self.flight_ids[k]] = self.flight_names[slot]
+
+        offset = len(self.task.predicates) - self.task.num_static_predicates
+        initial_state = PladoState(0, 0)
+        initial_state.atoms = [
+            self._remap_facts(p, order) if p in self._layouts else set(atoms)
+            for p, atoms in enumerate(self.initial_state.atoms)
+        ]
+        initial_state.fluents = [dict(x) for x in self.initial_state.fluents]
+        static_facts = tuple(
+            self._remap_facts(offset + i, order)
+            if offset + i in self._layouts
+            else facts
+            for i, facts in enumerate(self.static_facts)
+        )
+        return Episode(order, tuple(objects), initial_state, static_facts)
+
+    def install(self, episode: Episode) -> None:
+        """Patches the task with a previously computed episode. Installing an episode
+        is cheap, which allows to switch between several episodes of the same task.
+
+        Args:
+            episode (Episode): episode computed by the `episode()` method
+        """
+        self.task.objects = episode.objects
+        self.task.initial_state = episode.initial_state
+        self.task.static_facts = episode.static_facts
+
+    def apply(self, order: Iterable[int]) -> Episode:
+        """Patches the task so that it corresponds to the episode whose flights are
+        processed in the given order
+
+        Args:
+            order (Iterable[int]): template indices of the flights, in processing order
+
+        Returns:
+            Episode: The installed episode
+        """
+        episode = self.episode(order)
+        self.install(episode)
+        return episode
@@ -0,0 +1,382 @@
+import itertools
+import time
+from collections.abc import Iterable
+
+import plado.datalog.program as datalog
+from plado.datalog.evaluator import DatalogEngine
+from plado.datalog.numeric import fluent_iterator
+from plado.semantics.applicable_actions_generator import (
+    ApplicableActionsGenerator,
+    GroundActionRef,
+)
+from plado.semantics.task import State, Task
+
+# Argument of a precondition atom: (True, parameter index) or (False, object index)
+ArgSpec = tuple[tuple[bool, int]]
+
+
+class PladoApplicableActionsGenerator(ApplicableActionsGenerator):
+    """plado's generator, evaluating every query from scratch (and enumerating the
+    actions in plado's order), with the interface of the incremental one"""
+
+    def invalidate(self) -> None:
+        pass
+
+    def save(self) -> None:
+        return None
+
+    def restore(self, memory: None) -> None:
+        pass
+
+
+def make_applicable_actions_generator(
+    task: Task, incremental: bool = False
+) -> "PladoApplicableActionsGenerator | IncrementalApplicableActionsGenerator":
+    """Applicable actions generator of a task
+
+    Args:
+        task (Task): plado task
+        incremental (bool, optional): use the incremental generator, which is
+        faster but enumerates the actions in another order than plado's. Defaults to False.
+
+    Returns:
+        PladoApplicableActionsGenerator | IncrementalApplicableActionsGenerator: The generator
+    """
+    if incremental:
+        return IncrementalApplicableActionsGenerator(task)
+    return PladoApplicableActionsGenerator(task)
+
+
+def _smooth(estimate: float, duration: float) -> float:
+    """Exponential moving average of durations (0 meaning no measurement yet)"""
+    return duration if estimate == 0.0 else 0.5 * (estimate + duration)
+
+
+class IncrementalApplicableActionsGenerator:
+    """Drop-in replacement of plado's ApplicableActionsGenerator which only
+    re-evaluates the groundings of the action schemas that may be affected by the
+    differences between the queried state and the previously queried one.
+
+    Every action schema gets its own datalog engine, and a second one whose
+    parameters are restricted to given sets of objects. When the precondition of
+    a schema only mentions its own parameters (no existential variable nor derived
+    predicate), whether a grounding is applicable only depends on the precondition
+    atoms and fluents instantiated by this grounding. Hence, for each atom (or
+    fluent) which changed since the last query and each precondition atom it
+    matches, only the groundings agreeing with the partial binding of the
+    parameters made by this match need to be checked again: they are removed from
+    the previous groundings, and the restricted engine computes the applicable
+    ones among them. The other schemas are re-evaluated entirely whenever one of
+    the predicates (or fluents) their precondition depends on changes, as well as
+    the schemas for which a full evaluation is estimated to be faster than the
+    restricted ones (based on the durations of the previous evaluations).
+
+    Unlike plado's generator, the groundings of each schema are enumerated in
+    lexicographic order, which only depends on the queried state: the actions are
+    the same, but their order differs, hence so do the choices of the controllers
+    picking actions by position. The generator is therefore only used when
+    requested (see `make_applicable_actions_generator`). It caches results
+    computed on the static facts of the task: when they change, the `invalidate()`
+    method must be called, or the results computed on the new static facts must be
+    reinstated with `restore()` (see `save()`).
+
+    Args:
+        task (Task): plado task
+    """
+
+    def __init__(self, task: Task) -> None:
+        self.task: Task = task
+        self.num_predicates: int = len(task.predicates)
+        self.engines: list[DatalogEngine] = []
+        self.clauses: list[datalog.Clause] = []
+        self.relations: list[int] = []
+        self.dependencies: list[frozenset[int]] = []
+        self.relevant: list[frozenset[int]] = []
+        self.preconditions: list[dict[int, list[ArgSpec]] | None] = []
+        # Engines restricted to given parameters, compiled on demand
+        self.restricted_engines: list[dict[tuple[int], DatalogEngine]] = []
+        for action in task.actions:
+            program = task.create_datalog_program()
+            rel_id = program.add_relation(action.parameters)
+            clause = datalog.Clause(
+                datalog.Atom(
+                    rel_id,
+                    (datalog.Constant(var, True) for var in range(action.parameters)),
+                ),
+                [],
+                [],
+                [],
+            )
+            action.precondition.to_datalog(len(task.predicates), clause)
+            program.add_clause(clause)
+            relations = self._dependencies(program, clause)
+            self.engines.append(DatalogEngine(program, len(task.objects)))
+            self.clauses.append(clause)
+            self.relevant.append(frozenset(relations))
+            self.relations.append(rel_id)
+            self.dependencies.append(
+                frozenset(
+                    r
+                    for r in relations
+                    if r < task.num_fluent_predicates or r >= self.num_predicates
+                )
+            )
+            self.preconditions.append(
+                self._preconditions(action.parameters, clause, relations)
+            )
+            self.restricted_engines.append({})
+        # Running estimates of the durations of an evaluation of a schema, and of
+        # a restricted evaluation for one pattern of bound parameters
+        self._full_cost: list[float] = [0.0] * len(self.engines)
+        self._restricted_cost: list[float] = [0.0] * len(self.engines)
+        self.invalidate()
+
+    def _dependencies(
+        self, program: datalog.DatalogProgram, clause: datalog.Clause
+    ) -> set[int]:
+        """Relations (including functions) a clause depends on, following the
+        derived predicates"""
+        derived = {}
+        for c in program.clauses:
+            derived.setdefault(c.head.relation_id, []).append(c)
+        relations = set()
+        queue = [clause]
+        while len(queue) > 0:
+            c = queue.pop()
+            for atom in c.pos_body + c.neg_body:
+                r = atom.relation_id
+                if r in relations:
+                    continue
+                relations.add(r)
+                queue.extend(x for x in derived.get(r, []) if x is not c)
+            for constraint in c.constraints:
+                for fluent in fluent_iterator(constraint.expr):
+                    relations.add(self.num_predicates + fluent.function_id)
+        return relations
+
+    def _preconditions(
+        self, num_parameters: int, clause: datalog.Clause, relations: set[int]
+    ) -> dict[int, list[ArgSpec]] | None:
+        """Arguments of the precondition atoms and fluents of a clause, indexed by
+        relation, or None if the applicability of a grounding may depend on atoms
+        which are not instantiated by the grounding itself"""
+        task = self.task
+        first_derived = task.num_fluent_predicates
+        if any(
+            first_derived <= r < first_derived + task.num_derived_predicates
+            for r in relations
+        ):
+            return None
+        preconditions = {}
+        for atom in clause.pos_body + clause.neg_body:
+            if any(
+                arg.is_variable() and arg.id >= num_parameters for arg in atom.arguments
+            ):
+                return None
+            preconditions.setdefault(atom.relation_id, []).append(
+                tuple((arg.is_variable(), arg.id) for arg in atom.arguments)
+            )
+        for constraint in clause.constraints:
+            for fluent in fluent_iterator(constraint.expr):
+                args = [(False, o) for o in fluent.args]
+                for var, pos in fluent.variables:
+                    if var >= num_parameters:
+                        return None
+                    args[pos] = (True, var)
+                preconditions.setdefault(
+                    self.num_predicates + fluent.function_id, []
+                ).append(tuple(args))
+        return preconditions
+
+    def invalidate(self) -> None:
+        """Forgets the previously queried state"""
+        self._atoms: tuple[Iterable[tuple[int]]] | None = None
+        self._fluents: list[dict[tuple[int], float]] | None = None
+        self._groundings: list[set[tuple[int]] | None] = [None] * len(self.engines)
+        self._sorted: list[list[tuple[int]] | None] = [None] * len(self.engines)
+
+    def save(self) -> tuple:
+        """Returns the results computed for the previously queried state, which can
+        be reinstated by `restore()` once the static facts of the task are the same
+        again. They must not be reinstated more than once, since the generator
+        updates them in place."""
+        return self._atoms, self._fluents, self._groundings, self._sorted
+
+    def restore(self, memory: tuple) -> None:
+        """Reinstates results returned by `save()`"""
+        self._atoms, self._fluents, self._groundings, self._sorted = memory
+
+    def _changes(self, state: State) -> dict[int, set[tuple[int]]]:
+        """Atoms and fluents which differ between the state and the previously
+        queried one, indexed by relation"""
+        changes = {}
+        for p, (x, y) in enumerate(zip(state.atoms, self._atoms)):
+            if x is not y and x != y:
+                changes[p] = set(x).symmetric_difference(y)
+        for f, (x, y) in enumerate(zip(state.fluents, self._fluents)):
+            if x is not y and x != y:
+                changes[self.num_predicates + f] = set(
+                    args
+                    for args in set(x).union(y)
+                    if x.get(args) != y.get(args)
+                )
+        return changes
+
+    def _bindings(
+        self,
+        preconditions: dict[int, list[ArgSpec]],
+        changes: dict[int, set[tuple[int]]],
+    ) -> set[tuple[tuple[int, int]]]:
+        """Partial bindings of the parameters of a schema under which a changed
+        atom or fluent matches one of its precondition atoms"""
+        bindings = set()
+        for r, specs in preconditions.items():
+            changed = changes.get(r)
+            if changed is None:
+                continue
+            for spec in specs:
+                for args in changed:
+                    binding = {}
+                    for (variable, idx), o in zip(spec, args):
+                        if not variable:
+                            if idx != o:
+                                break
+                        elif binding.setdefault(idx, o) != o:
+                            break
+                    else:
+                        bindings.add(tuple(sorted(binding.items())))
+        return bindings
+
+    def _relevant(
+        self, i: int, query: tuple[list[set[tuple[int]]], list[dict]]
+    ) -> tuple[list[set[tuple[int]]], list[dict]]:
+        """Query database in which the relations the precondition of the i-th schema
+        does not mention are empty, since the engines copy all their input relations"""
+        atoms, fluents = query
+        relevant = self.relevant[i]
+        return [
+            facts if r in relevant else set() for r, facts in enumerate(atoms)
+        ], fluents
+
+    def _restricted_engine(self, i: int, parameters: tuple[int]) -> DatalogEngine:
+        """Engine computing the groundings of the i-th schema whose given parameters
+        belong to the unary relations following the predicates and functions"""
+        engine = self.restricted_engines[i].get(parameters)
+        if engine is None:
+            clause = self.clauses[i]
+            program = self.task.create_datalog_program()
+            first = program.num_relations()
+            for _ in parameters:
+                program.add_relation(1)
+            head = program.add_relation(len(clause.head.arguments))
+            program.add_clause(
+                datalog.Clause(
+                    datalog.Atom(head, clause.head.arguments),
+                    clause.pos_body
+                    + tuple(
+                        datalog.Atom(first + j, [datalog.Constant(k, True)])
+                        for j, k in enumerate(parameters)
+                    ),
+                    clause.neg_body,
+                    clause.constraints,
+                )
+            )
+
+            # Start joining from the (small) restricting relations
+            def cost_function(relations, args, join_relations, join_args):
+                restricted = any(
+                    r >= first for r in itertools.chain(relations, join_relations)
+                )
+                return -len(join_args) - (1000 if restricted else 0)
+
+            engine = DatalogEngine(program, len(self.task.objects), cost_function)
+            self.restricted_engines[i][parameters] = engine
+        return engine
+
+    def _patterns(
+        self, bindings: set[tuple[tuple[int, int]]]
+    ) -> dict[tuple[int], set[tuple[int]]]:
+        """Groups partial bindings by the parameters they bind"""
+        patterns = {}
+        for b in bindings:
+            patterns.setdefault(tuple(k for k, _ in b), set()).add(
+                tuple(o for _, o in b)
+            )
+        return patterns
+
+    def _update(
+        self, i: int, patterns: dict[tuple[int], set[tuple[int]]], query: tuple
+    ) -> None:
+        """Re-evaluates the groundings of the i-th schema agreeing with one of the
+        given partial bindings, grouped by bound parameters"""
+        groundings = self._groundings[i]
+        groundings.difference_update(
+            [
+                args
+                for args in groundings
+                if any(
+                    tuple(args[k] for k in parameters) in values
+                    for parameters, values in patterns.items()
+                )
+            ]
+        )
+        atoms, fluents = self._relevant(i, query)
+        for parameters, values in patterns.items():
+            # Each parameter ranges over the objects it is bound to
+            domains = [set((v[j],) for v in values) for j in range(len(parameters))]
+            model = self._restricted_engine(i, parameters)(
+                atoms + domains + [set()], fluents
+            )
+            groundings.update(model[len(atoms) + len(parameters)])
+
+    def __call__(self, state: State) -> Iterable[GroundActionRef]:
+        changes = None if self._atoms is None else self._changes(state)
+        query = None
+        for i in range(len(self.engines)):
+            patterns = None
+            if changes is not None and self._groundings[i] is not None:
+                if self.dependencies[i].isdisjoint(changes):
+                    continue
+                if self.preconditions[i] is not None:
+                    bindings = self._bindings(self.preconditions[i], changes)
+                    if len(bindings) == 0:
+                        continue
+                    if () not in bindings:
+                        patterns = self._patterns(bindings)
+            if query is None:
+                query = self.task.prepare_for_query(state.atoms, state.fluents)
+            self._sorted[i] = None
+            # Each restricted evaluation has a fixed cost (the engines copy their
+            # input), so the schemas which are cheap to evaluate are re-evaluated
+            # entirely when it is estimated to be faster
+            if (
+                patterns is not None
+                and len(patterns) * self._restricted_cost[i] <= self._full_cost[i]
+            ):
+                for parameters in patterns:
+                    self._restricted_engine(i, parameters)
+                start = time.perf_counter()
+                self._update(i, patterns, query)
+                self._restricted_cost[i] = _smooth(
+                    self._restricted_cost[i],
+                    (time.perf_counter() - start) / len(patterns),
+                )
+            else:
+                start = time.perf_counter()
+                atoms, fluents = self._relevant(i, query)
+                model = self.engines[i](atoms + [set()], fluents)
+                self._groundings[i] = model[self.relations[i]]
+                self._full_cost[i] = _smooth(
+                    self._full_cost[i], time.perf_counter() - start
+                )
+        self._atoms = state.atoms
+        self._fluents = state.fluents
+        # The groundings are sorted so that their order only depends on the state,
+        # not on the sequence of updates of the sets
+        for i, groundings in enumerate(self._groundings):
+            if self._sorted[i] is None:
+                self._sorted[i] = sorted(groundings)
+        applicable = list(self._sorted)
+        return (
+            (i, args) for i, groundings in enumerate(applicable) for args in groundings
+        )
@@ -0,0 +1,186 @@
+import random
+from array import array
+from typing import Any
+
+from plado.semantics.task import State as PladoState
+from plado.semantics.task import Task
+from plado.utils import Float
+
+# Positions of the set bits of every byte value
+_BYTE_BITS: tuple[tuple[int]] = tuple(
+    tuple(i for i in range(8) if b & (1 << i)) for b in range(256)
+)
+
+
+class StateLayout:
+    """Fixed layout shared by all the packed states of a plado task: grounded
+    atoms of fluent predicates are mapped to bit positions (assigned the first
+    time an atom is seen, so that only reachable atoms are ever indexed) and
+    non-cost fluents to slots of an integer array. Every atom also gets a random
+    64-bit Zobrist key used to hash the states incrementally.
+
+    Args:
+        task (Task): plado task whose states are packed
+        cost_functions (set[int]): functions excluded from the states
+        seed (int, optional): seed of the Zobrist keys. Defaults to 0.
+    """
+
+    def __init__(self, task: Task, cost_functions: set[int], seed: int = 0) -> None:
+        self.num_predicates: int = task.num_fluent_predicates
+        self.num_functions: int = len(task.functions)
+        self.cost_functions: set[int] = set(cost_functions)
+        self._rng = random.Random(seed)
+        self.atom_ids: list[dict[tuple[int], int]] = [
+            {} for _ in range(self.num_predicates)
+        ]
+        self.atoms: list[tuple[int, tuple[int]]] = []
+        self.keys: list[int] = []
+        self.fluent_ids: list[dict[tuple[int], int]] = [
+            {} for _ in range(self.num_functions)
+        ]
+        self.fluents: list[tuple[int, tuple[int]]] = []
+        for f, values in enumerate(task.initial_state.fluents):
+            if f in self.cost_functions:
+                continue
+            for args in sorted(values.keys()):
+                self.fluent_ids[f][args] = len(self.fluents)
+                self.fluents.append((f, args))
+
+    def atom_id(self, predicate: int, args: tuple[int]) -> int:
+        ids = self.atom_ids[predicate]
+        idx = ids.get(args)
+        if idx is None:
+            idx = len(self.atoms)
+            ids[args] = idx
+            self.atoms.append((predicate, args))
+            self.keys.append(self._rng.getrandbits(64))
+        return idx
+
+    def pack_atoms(self, state: PladoState) -> tuple[int, int]:
+        """Returns the bitset and the Zobrist key of the atoms of a plado state"""
+        ids = [
+            self.atom_id(p, args)
+            for p in range(self.num_predicates)
+            for args in state.atoms[p]
+        ]
+        if len(ids) == 0:
+            return 0, 0
+        buffer = bytearray(max(ids) // 8 + 1)
+        key = 0
+        for i in ids:
+            buffer[i >> 3] |= 1 << (i & 7)
+            key ^= self.keys[i]
+        return int.from_bytes(buffer, "little"), key
+
+    def pack_fluents(self, state: PladoState) -> array:
+        values = array("q", bytes(8 * len(self.fluents)))
+        for f in range(self.num_functions):
+            if f in self.cost_functions:
+                continue
+            ids = self.fluent_ids[f]
+            for args, val in state.fluents[f].items():
+                idx = ids.get(args)
+                if idx is None:
+                    raise ValueError(
+                        f"fluent {f}{args} is not defined in the initial state"
+                    )
+                values[idx] = int(val)
+        return values
+
+    def atom_ids_of(self, bits: int) -> list[int]:
+        """Returns the (sorted) indices of the atoms set in a bitset"""
+        res = []
+        for i, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, "little")):
+            if byte:
+                base = i << 3
+                res.extend(base + j for j in _BYTE_BITS[byte])
+        return res
+
+
+class PackedState:
+    """Compact alternative to the State class, with the same interface: the
+    atoms are stored in a bitset following the StateLayout of the domain, the
+    non-cost fluents in an integer array, and the hash is maintained incrementally
+    with Zobrist keys. The tuple-based `atoms` and `fluents` views of State are
+    decoded on demand, and kept since the state is immutable."""
+
+    __slots__ = ("domain", "bits", "values", "atoms_key", "key", "_atoms", "_fluents")
+
+    def __init__(self, domain: Any, state: PladoState = None) -> None:
+        self.domain: Any = domain
+        self._atoms: tuple[tuple[tuple[int]]] | None = None
+        self._fluents: tuple[tuple[tuple[int], int]] | None = None
+        if state is not None:
+            layout: StateLayout = domain.state_layout
+            self.bits, self.atoms_key = layout.pack_atoms(state)
+            self.values: array = layout.pack_fluents(state)
+            self.key: int = hash((self.atoms_key, self.values.tobytes()))
+
+    def successor(self, state: PladoState, successor: PladoState) -> "PackedState":
+        """Packs a successor state by only applying the atoms that changed
+
+        Args:
+            state (PladoState): plado state corresponding to this state
+            successor (PladoState): plado successor state
+
+        Returns:
+            PackedState: The packed successor state
+        """
+        layout: StateLayout = self.domain.state_layout
+        res = PackedState(self.domain)
+        bits, key = self.bits, self.atoms_key
+        for p in range(layout.num_predicates):
+            for args in successor.atoms[p].symmetric_difference(state.atoms[p]):
+                i = layout.atom_id(p, args)
+                bits ^= 1 << i
+                key ^= layout.keys[i]
+        res.bits, res.atoms_key = bits, key
+        res.values = layout.pack_fluents(successor)
+        res.key = hash((key, res.values.tobytes()))
+        return res
+
+    @property
+    def atoms(self) -> tuple[tuple[tuple[int]]]:
+        if self._atoms is None:
+            layout: StateLayout = self.domain.state_layout
+            atoms = [[] for _ in range(layout.num_predicates)]
+            for i in layout.atom_ids_of(self.bits):
+                p, args = layout.atoms[i]
+                atoms[p].append(args)
+            self._atoms = tuple(tuple(sorted(a)) for a in atoms)
+        return self._atoms
+
+    @property
+    def fluents(self) -> tuple[tuple[tuple[int], int]]:
+        if self._fluents is None:
+            layout: StateLayout = self.domain.state_layout
+            fluents = [[] for _ in range(layout.num_functions)]
+            for (f, args), val in zip(layout.fluents, self.values):
+                fluents[f].append((args, val))
+            self._fluents = tuple(tuple(x) for x in fluents)
+        return self._fluents
+
+    def to_plado(self, cost_functions: set[int]) -> PladoState:
+        layout: StateLayout = self.domain.state_layout
+        state = PladoState(0, layout.num_functions)
+        # Same atom ordering as State.to_plado
+        state.atoms = self.atoms
+        for (f, args), val in zip(layout.fluents, self.values):
+            state.fluents[f][args] = Float(val)
+        for f in cost_functions:
+            state.fluents[f][tuple()] = Float(0)
+        return state
+
+    def __str__(self) -> str:
+        return self.domain.task.dump_state(self.to_plado(self.domain.cost_functions))
+
+    def __hash__(self) -> int:
+        return self.key
+
+    def __eq__(self, o: object) -> bool:
+        return (
+            isinstance(o, PackedState)
+            and self.key == o.key
+            and self.bits == o.bits
+            and self.values == o.values
+        )
@@ -0,0 +1,122 @@
+import pickle
+import re
+
+from encoder.pddl import PDDLNumericFluent, PDDLParam, PDDLPredicate, PDDLProblem
+from encoder.pddl.pddl_literal import PDDLComment, PDDLLiteral
+from plado import pddl
+from plado.parser.parser import LookaheadStreamer, parse_domain
+from plado.parser.sanity_checks import make_checks
+from plado.parser.tokenizer import tokenize
+from plado.pddl_utils.normalize import normalize_conditions, normalize_effects
+
+
+def _name(o) -> str:
+    # plado's tokenizer lower-cases the whole PDDL content, and some encoder
+    # parameters are built with surrounding spaces
+    return str(o).strip().lower()
+
+
+def _arguments(args: list[PDDLParam]) -> list[pddl.ObjectArgument]:
+    return [pddl.ObjectArgument(_name(a.name)) for a in args]
+
+
+def _atom(literal: PDDLPredicate) -> pddl.BooleanExpression:
+    atom = pddl.Atom(_name(literal.name), _arguments(literal.args))
+    return pddl.Negation(atom) if literal.negated else atom
+
+
+def _initial_fact(
+    literal: PDDLLiteral,
+) -> pddl.Atom | pddl.NumericAssignEffect:
+    if isinstance(literal, PDDLNumericFluent):
+        assert literal.operation == "=", "Only assignments allowed in the initial state"
+        fluent, value = literal.args
+        return pddl.NumericAssignEffect(
+            pddl.FunctionCall(_name(fluent.name), _arguments(fluent.args)),
+            pddl.NumericConstant(_name(value.to_pddl())),
+        )
+    assert not literal.negated, "Negated facts not allowed in the initial state"
+    return _atom(literal)
+
+
+# Parsed domains by PDDL text, pickled since the normalization modifies the
+# domain in place: every call of parse_domain_str gets its own copy
+_parsed_domains: dict[str, bytes] = {}
+
+
+def parse_domain_str(domain_str: str) -> pddl.Domain:
+    """Parses a PDDL domain from its string representation. The domains with the
+    same text (e.g. the deterministic domains of all problems) are only parsed once
+    per process.
+
+    Args:
+        domain_str (str): PDDL domain
+
+    Returns:
+        pddl.Domain: The (not yet normalized) plado domain
+    """
+    parsed = _parsed_domains.get(domain_str)
+    if parsed is None:
+        domain = parse_domain(LookaheadStreamer(tokenize(domain_str)))
+        _parsed_domains[domain_str] = pickle.dumps(
+            domain, protocol=pickle.HIGHEST_PROTOCOL
+        )
+        return domain
+    return pickle.loads(parsed)
+
+
+def build_problem(problem: PDDLProblem, name: str) -> pddl.Problem:
+    """Translates an encoded PDDL problem into the plado problem that
+    would be obtained by parsing `problem.to_pddl(name)`, without generating
+    the PDDL text
+
+    Args:
+        problem (PDDLProblem): PDDL problem generated by the encoder
+        name (str): Name of the problem
+
+    Returns:
+        pddl.Problem: The (not yet normalized) plado problem
+    """
+    return pddl.Problem(
+        _name(re.sub(r"\s+", "_", name)),
+        _name(re.sub(r"\s+", "_", problem.domain_name)),
+        [
+            pddl.ArgumentDefinition(_name(o.name), _name(o.type.name))
+            for o in problem.objects
+            if not isinstance(o, PDDLComment)
+        ],
+        [_initial_fact(l) for l in problem.init if not isinstance(l, PDDLComment)],
+        pddl.Conjunction(
+            [_atom(l) for l in problem.goal if not isinstance(l, PDDLComment)]
+        ),
+        None,
+        pddl.Metric(pddl.Metric.MINIMIZE, pddl.FunctionCall("total-cost", [])),
+    )
+
+
+def build_and_normalize(
+    domain_str: str, problem: PDDLProblem, name: str, skip_checks: bool = False
+) -> tuple[pddl.Domain, pddl.Problem]:
+    """In-memory equivalent of plado's `parse_and_normalize`, taking the
+    PDDL domain as a string and the PDDL problem as generated by the encoder
+
+    Args:
+        domain_str (str): PDDL domain
+        problem (PDDLProblem): PDDL problem generated by the encoder
+        name (str): Name of the problem
+        skip_checks (bool, optional): Skip plado's sanity checks. Defaults to False.
+
+    Raises:
+        ValueError: if the domain or the problem are not valid
+
+    Returns:
+        tuple[pddl.Domain, pddl.Problem]: The normalized plado domain and problem
+    """
+    domain = parse_domain_str(domain_str)
+    plado_problem = build_problem(problem, name)
+    if not skip_checks:
+        if make_checks(domain, plado_problem):
+            raise ValueError("invalid pddl syntax")
+    normalize_conditions(domain, plado_problem)
+    normalize_effects(domain)
+    return domain, plado_problem
@@ -0,0 +1,123 @@
+import json
+import math
+import os
+import time
+from typing import Any
+
+
+class _Phase:
+    """Context manager timing one execution of a phase"""
+
+    __slots__ = ("stats", "start")
+
+    def __init__(self, stats: "PhaseStats") -> None:
+        self.stats: PhaseStats = stats
+        self.start: float = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stats.add(time.perf_counter() - self.start)
+
+
+class PhaseStats:
+    """Counters of a profiled phase, with a histogram of its durations using
+    power-of-two buckets of microseconds (bucket k counts the durations in
+    [2^(k-1), 2^k) microseconds, bucket 0 the ones below 1 microsecond)"""
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.total: float = 0.0
+        self.min: float = math.inf
+        self.max: float = 0.0
+        self.histogram: dict[int, int] = {}
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+        bucket = int(duration * 1e6).bit_length()
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def to_json_obj(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count > 0 else None,
+            "min": self.min if self.count > 0 else None,
+            "max": self.max,
+            "histogram_us": {
+                f"<{1 << k}": n for k, n in sorted(self.histogram.items())
+            },
+        }
+
+
+class Profiler:
+    """Accumulates per-phase timings of a simulation, e.g.:
+
+        with profiler.phase("successor_generation"):
+            successors = succ_gen(state, action)
+
+    The domains and controllers use the NULL_PROFILER by default, whose phases
+    do nothing, so that instrumentation has no noticeable cost when disabled.
+    """
+
+    enabled: bool = True
+
+    def __init__(self) -> None:
+        self.phases: dict[str, PhaseStats] = {}
+        self._contexts: dict[str, _Phase] = {}
+
+    def phase(self, name: str) -> _Phase:
+        """Returns a context manager timing an execution of the given phase"""
+        ctx = self._contexts.get(name)
+        if ctx is None:
+            stats = self.phases.setdefault(name, PhaseStats())
+            ctx = self._contexts[name] = _Phase(stats)
+        return ctx
+
+    def record(self, name: str, duration: float) -> None:
+        """Records an execution of the given phase which lasted `duration` seconds"""
+        self.phases.setdefault(name, PhaseStats()).add(duration)
+
+    def reset(self) -> None:
+        self.phases.clear()
+        self._contexts.clear()
+
+    def to_json_obj(self) -> dict[str, Any]:
+        return {name: stats.to_json_obj() for name, stats in self.phases.items()}
+
+    def dump(self, path: os.PathLike) -> None:
+        """Writes the per-phase statistics to a JSON file"""
+        with open(path, "w") as f:
+            json.dump(self.to_json_obj(), f, indent=4)
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+class NullProfiler(Profiler):
+    """Disabled profiler"""
+
+    enabled: bool = False
+
+    def phase(self, name: str) -> _NullPhase:
+        return _NULL_PHASE
+
+    def record(self, name: str, duration: float) -> None:
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+NULL_PROFILER = NullProfiler()
@@ -1,14 +1,14 @@
-import copy  # TODO temporarily added to avoid constructing the pddl string twice
+import json
 import os
 from tempfile import TemporaryDirectory
 from typing import Any, Iterable, Optional
 
-from beluga_lib.beluga_problem import BelugaProblem
+from beluga_lib.beluga_problem import BelugaProblem, BelugaProblemEncoder
 from beluga_lib.problem_state import BelugaProblemState
-from encoder.pddl_encoding import DomainEncoding, encode
+from encoder.pddl import PDDLProblem
+from encoder.pddl_encoding import DOMAIN_CACHE, encode
 from encoder.pddl_encoding.variant import Variant
-from plado.parser import parse_and_normalize
-from plado.semantics.applicable_actions_generator import ApplicableActionsGenerator
+from plado import pddl
 from plado.semantics.goal_checker import GoalChecker
 from plado.semantics.successor_generator import SuccessorGenerator
 from plado.semantics.task import State as PladoState
@@ -17,6 +17,16 @@ from plado.utils import Float
 from skdecide import EmptySpace, ImplicitSpace, Space, Value
 from skdecide.hub.space.gym import ListSpace
 
+from .incremental_aops import (
+    IncrementalApplicableActionsGenerator,
+    PladoApplicableActionsGenerator,
+    make_applicable_actions_generator,
+)
+from .packed_state import PackedState, StateLayout
+from .plado_builder import build_and_normalize
+from .profiling import NULL_PROFILER, Profiler
+from .snapshot import Snapshot, snapshot_key
+
 
 class State:
     """Class defining the state type used by the scikit-decide domains"""
@@ -150,13 +160,38 @@ class SkdBaseDomain(D):
     All those domains are based on a PDDL encoding of the actions
     to model the logics of the transition function."""
 
+    # Per-phase timings, disabled by default (see set_profiler)
+    profiler: Profiler = NULL_PROFILER
+
+    def set_profiler(self, profiler: Profiler) -> None:
+        """Enables the per-phase profiling of the domain
+
+        Args:
+            profiler (Profiler): profiler accumulating the timings of the domain phases
+        """
+        self.profiler = profiler
+
     def cleanup(self):
         """Erases the temporary directory containing PDDL files (if any)"""
         if self.temp_pddl_directory is not None:
             self.temp_pddl_directory.cleanup()
-
-    def _translate_state(self, state: PladoState) -> State:
-        return State(self, state, self.cost_functions)
+            self.temp_pddl_directory = None
+            self.domain_path = None
+            self.problem_path = None
+
+    def _translate_state(self, state: PladoState) -> State | PackedState:
+        with self.profiler.phase("state_translation"):
+            if self.state_layout is not None:
+                return PackedState(self, state)
+            return State(self, state, self.cost_functions)
+
+    def _translate_successor(
+        self, memory: State | PackedState, state: PladoState, successor: PladoState
+    ) -> State | PackedState:
+        with self.profiler.phase("state_translation"):
+            if isinstance(memory, PackedState):
+                return memory.successor(state, successor)
+            return State(self, successor, self.cost_functions)
 
     def _get_cost_from_state(self, state: PladoState) -> int:
         if self.total_cost is None:
@@ -164,23 +199,95 @@ class SkdBaseDomain(D):
         return int(state.fluents[self.total_cost][tuple()])
 
     def get_pddl_domain(self) -> os.PathLike:
-        """Get the path to the PDDL domain file
+        """Get the path to the PDDL domain file, writing it first if needed
 
         Returns:
             os.PathLike: Path to the PDDL domain file
         """
+        if self.domain_path is None:
+            self.dump_pddl()
         return self.domain_path
 
     def get_pddl_problem(self) -> os.PathLike:
-        """Get the path to the PDDL problem file
+        """Get the path to the PDDL problem file, writing it first if needed
 
         Returns:
             os.PathLike: Path to the PDDL problem file
         """
+        if self.problem_path is None:
+            self.dump_pddl()
         return self.problem_path
 
+    def dump_pddl(self) -> None:
+        """Writes the PDDL domain and problem files the domain was built from.
+        They are written in the instance directory passed to the domain, or
+        in a temporary directory (erased by `cleanup()`) if there is none."""
+        with self.profiler.phase("pddl_write"):
+            self._dump_pddl()
+
+    def _dump_pddl(self) -> None:
+        instance_dir = self._pddl_instance_dir
+        if instance_dir is None:
+            if self.temp_pddl_directory is None:
+                self.temp_pddl_directory = TemporaryDirectory()
+            instance_dir = self.temp_pddl_directory.name
+
+        self.domain_path = os.path.join(instance_dir, self._pddl_filenames[0])
+        with open(self.domain_path, "w") as f:
+            f.write(self.domain_str)
+
+        self.problem_path = os.path.join(instance_dir, self._pddl_filenames[1])
+        with open(self.problem_path, "w") as f:
+            self._current_pddl_problem().write_pddl(f, self.pddl_problem_name)
+
+    def _current_pddl_problem(self) -> PDDLProblem:
+        """PDDL problem corresponding to the current task, written by `dump_pddl()`"""
+        return self.pddl_problem
+
+    def _clear_state_cache(self) -> None:
+        """Forgets the cached plado view of the last state queried. Must be called
+        whenever the task changes, since the cached results depend on it."""
+        self._cached_state: D.T_state | None = None
+        self._cached_plado: PladoState | None = None
+        self._cached_goal: bool | None = None
+        self._cached_aops: Space[D.T_event] | None = None
+
+    def _save_state_cache(self) -> tuple:
+        """Returns the cached view of the last state queried (see `_to_plado`), to
+        be reinstated by `_restore_state_cache` once the task is the same again"""
+        return (
+            self._cached_state,
+            self._cached_plado,
+            self._cached_goal,
+            self._cached_aops,
+        )
+
+    def _restore_state_cache(self, cache: tuple) -> None:
+        (
+            self._cached_state,
+            self._cached_plado,
+            self._cached_goal,
+            self._cached_aops,
+        ) = cache
+
+    def _to_plado(self, state: D.T_state) -> PladoState:
+        """Plado view of a state. The view of the last state queried is cached
+        (by identity) together with its goal test and applicable actions, so that
+        consecutive queries on the same state, as done at every simulation step,
+        only convert it once. The returned state must not be modified."""
+        if state is not self._cached_state:
+            self._clear_state_cache()
+            with self.profiler.phase("plado_conversion"):
+                self._cached_plado = state.to_plado(self.cost_functions)
+            self._cached_state = state
+        return self._cached_plado
+
     def _is_terminal(self, state: D.T_state) -> D.T_predicate:
-        return self.check_goal(state.to_plado(self.cost_functions))
+        plado_state = self._to_plado(state)
+        if self._cached_goal is None:
+            with self.profiler.phase("goal_check"):
+                self._cached_goal = self.check_goal(plado_state)
+        return self._cached_goal
 
     def _get_transition_value(
         self,
@@ -191,19 +298,18 @@ class SkdBaseDomain(D):
         return Value(cost=self.transition_cost.get((memory, action, next_state), 1))
 
     def _get_goals_(self) -> Space[D.T_observation]:
-        return ImplicitSpace(lambda s: self.check_goal(s.to_plado(self.cost_functions)))
+        return ImplicitSpace(lambda s: self._is_terminal(s))
 
     def _get_initial_state_(self) -> D.T_state:
         return self._translate_state(self.task.initial_state)
 
     def _get_applicable_actions_from(self, memory: D.T_state) -> Space[D.T_event]:
-        aops = [
-            Action(self, a[0], a[1])
-            for a in self.aops_gen(memory.to_plado(self.cost_functions))
-        ]
-        if len(aops) == 0:
-            return EmptySpace()
-        return ListSpace(aops)
+        plado_state = self._to_plado(memory)
+        if self._cached_aops is None:
+            with self.profiler.phase("applicable_actions"):
+                aops = [Action(self, a[0], a[1]) for a in self.aops_gen(plado_state)]
+            self._cached_aops = EmptySpace() if len(aops) == 0 else ListSpace(aops)
+        return self._cached_aops
 
     def _get_action_space_(self) -> Space[D.T_event]:
         return self.action_space
@@ -301,33 +407,109 @@ class SkdBaseDomain(D):
     def _create_pddl_structs(
         self,
         domain_str: str,
-        problem_str: str,
+        pddl_problem: PDDLProblem,
+        problem_name: str,
         instance_dir: os.PathLike = None,
         domain_filename: str = "domain.pddl",
         problem_filename: str = "problem.pddl",
+        dump_pddl: bool = False,
+        packed_states: bool = False,
+        incremental_aops: bool = False,
     ):
+        # The encoded problem is handed to plado without going through PDDL
+        # files, which are only written on demand (see dump_pddl)
+        self._set_pddl_sources(
+            domain_str,
+            pddl_problem,
+            problem_name,
+            instance_dir,
+            domain_filename,
+            problem_filename,
+            dump_pddl,
+        )
 
-        if instance_dir is None:
-            self.temp_pddl_directory = TemporaryDirectory()
-            instance_dir = self.temp_pddl_directory.name
-        else:
-            self.temp_pddl_directory = None
-
-        self.domain_path = os.path.join(instance_dir, domain_filename)
-        with open(self.domain_path, "w") as f:
-            f.write(domain_str)
+        with self.profiler.phase("parse"):
+            domain, problem = build_and_normalize(
+                domain_str, pddl_problem, problem_name
+            )
+        with self.profiler.phase("task_build"):
+            task = Task(domain, problem)
+            self._set_task(
+                task,
+                GoalChecker(task),
+                make_applicable_actions_generator(task, incremental_aops),
+                SuccessorGenerator(task),
+                packed_states,
+            )
 
-        self.problem_path = os.path.join(instance_dir, problem_filename)
-        with open(self.problem_path, "w") as f:
-            f.write(problem_str)
+        return domain, problem
 
-        domain, problem = parse_and_normalize(self.domain_path, self.problem_path)
-        self.task: Task = Task(domain, problem)
-        self.check_goal: GoalChecker = GoalChecker(self.task)
-        self.aops_gen: ApplicableActionsGenerator = ApplicableActionsGenerator(
-            self.task
+    def _load_snapshot(
+        self,
+        snapshot: Snapshot,
+        instance_dir: os.PathLike = None,
+        dump_pddl: bool = False,
+        packed_states: bool = False,
+        incremental_aops: bool = False,
+    ) -> None:
+        """Equivalent of `_create_pddl_structs` taking the already built
+        structures from a snapshot"""
+        self._set_pddl_sources(
+            snapshot.domain_str,
+            snapshot.pddl_problem,
+            snapshot.pddl_problem_name,
+            instance_dir,
+            "domain.pddl",
+            "problem.pddl",
+            dump_pddl,
+        )
+        aops_gen = snapshot.aops_gen
+        if isinstance(aops_gen, IncrementalApplicableActionsGenerator) != incremental_aops:
+            # The snapshot was taken with the other kind of generator
+            aops_gen = make_applicable_actions_generator(snapshot.task, incremental_aops)
+        self._set_task(
+            snapshot.task,
+            snapshot.check_goal,
+            aops_gen,
+            snapshot.succ_gen,
+            packed_states,
         )
-        self.succ_gen: SuccessorGenerator = SuccessorGenerator(self.task)
+
+    def _set_pddl_sources(
+        self,
+        domain_str: str,
+        pddl_problem: PDDLProblem,
+        problem_name: str,
+        instance_dir: os.PathLike,
+        domain_filename: str,
+        problem_filename: str,
+        dump_pddl: bool,
+    ) -> None:
+        self.domain_str = domain_str
+        self.pddl_problem = pddl_problem
+        self.pddl_problem_name = problem_name
+        self._pddl_instance_dir = instance_dir
+        self._pddl_filenames = (domain_filename, problem_filename)
+        self.temp_pddl_directory = None
+        self.domain_path = None
+        self.problem_path = None
+        if dump_pddl:
+            self.dump_pddl()
+
+    def _set_task(
+        self,
+        task: Task,
+        check_goal: GoalChecker,
+        aops_gen: PladoApplicableActionsGenerator | IncrementalApplicableActionsGenerator,
+        succ_gen: SuccessorGenerator,
+        packed_states: bool,
+    ) -> None:
+        self.task: Task = task
+        self.check_goal: GoalChecker = check_goal
+        self.aops_gen: (
+            PladoApplicableActionsGenerator | IncrementalApplicableActionsGenerator
+        ) = aops_gen
+        self.succ_gen: SuccessorGenerator = succ_gen
         self.total_cost: int | None = None
         for i, f in enumerate(self.task.functions):
             if f.name == "total-cost":
@@ -337,6 +519,10 @@ class SkdBaseDomain(D):
             [self.total_cost] if self.total_cost is not None else []
         )
         self.transition_cost: dict[tuple[State, Action, State], int] = {}
+        self._clear_state_cache()
+        self.state_layout: StateLayout | None = (
+            StateLayout(self.task, self.cost_functions) if packed_states else None
+        )
 
         self.observation_space = ObservationSpace(
             (
@@ -353,38 +539,61 @@ class SkdBaseDomain(D):
 
         self._init_deserializer()
 
-    def _generate_pddl(
+    def _snapshot(
         self,
         beluga_problem: BelugaProblem,
         problem_name: str,
         variant: Variant,
-        state: BelugaProblemState = None,
-    ):
-
-        domain_encoding = DomainEncoding(variant, beluga_problem)
-        self.domain_str = domain_encoding.domain.to_pddl("beluga")
-
-        # TODO replaced the double encoding with a copy; there's a good chance not even the copy is needed
-        # domain_encoding = DomainEncoding(variant, beluga_problem)
-        # domain_str = domain_encoding.domain.to_pddl("beluga")
-        domain_str = copy.copy(self.domain_str)
-
-        pddl_problem = encode(
-            problem_name.replace(".json", ""),
+        plado_problem: pddl.Problem,
+    ) -> Snapshot:
+        """Snapshot of the structures built by `_create_pddl_structs`"""
+        return Snapshot(
             beluga_problem,
-            domain_encoding.domain,
+            problem_name,
+            variant,
+            self.domain_str,
+            self.pddl_problem,
+            self.pddl_problem_name,
+            plado_problem,
+            self.task,
+            self.check_goal,
+            self.aops_gen,
+            self.succ_gen,
+        )
+
+    def _snapshot_key(
+        self,
+        beluga_problem: BelugaProblem,
+        problem_name: str,
+        variant: Variant,
+        state: BelugaProblemState = None,
+    ) -> str:
+        return snapshot_key(
+            json.dumps(beluga_problem, cls=BelugaProblemEncoder),
+            problem_name,
             variant,
-            state=state,
+            None if state is None else state.to_json_str(),
         )
+
+    def _generate_pddl(
+        self,
+        beluga_problem: BelugaProblem,
+        problem_name: str,
+        variant: Variant,
+        state: BelugaProblemState = None,
+    ):
+        with self.profiler.phase("encode"):
+            cached_domain = DOMAIN_CACHE.get(variant, beluga_problem)
+            domain_str = cached_domain.domain_str
+
+            pddl_problem = encode(
+                problem_name.replace(".json", ""),
+                beluga_problem,
+                cached_domain.encoding.domain,
+                variant,
+                state=state,
+            )
         name = "beluga-" + problem_name
         name = name.replace(".", "")
-        problem_str = pddl_problem.to_pddl(name)
-
-        # print('-' * 78)
-        # print('DOMAIN PDDL')
-        # print(domain_str)
-        # print('-' * 78)
-        # print('PROBLEM PDDL')
-        # print(problem_str)
 
-        return domain_str, problem_str
+        return domain_str, pddl_problem, name
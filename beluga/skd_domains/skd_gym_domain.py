@@ -53,14 +53,17 @@ class BelugaGymCompatibleDomain(D):
         self.skd_beluga_domain: Union[SkdPDDLDomain, SkdPPDDLDomain, SkdSPDDLDomain] = (
             skd_beluga_domain
         )
+        self.current_pddl_state: SkdBaseDomain.T_state = None
 
     def _state_reset(self) -> D.T_state:
-        return self.make_state_array(self.skd_beluga_domain._state_reset())
+        self.current_pddl_state = self.skd_beluga_domain._state_reset()
+        return self.make_state_array(self.current_pddl_state)
 
     def _state_step(
         self, action: D.T_event
     ) -> TransitionOutcome[D.T_state, Value[D.T_value], D.T_predicate, D.T_info]:
         outcome = self.skd_beluga_domain._state_step(self.make_pddl_action(action))
+        self.current_pddl_state = outcome.state
         return TransitionOutcome(
             state=self.make_state_array(outcome.state),
             value=outcome.value,
@@ -73,6 +76,17 @@ class BelugaGymCompatibleDomain(D):
             self.make_pddl_state(memory)
         )
 
+    def get_applicable_action_arrays(self) -> list[ArrayLike]:
+        """Return the tensor actions applicable in the current PDDL state, i.e. the
+        state returned by the last call to the _state_reset() or _state_step() methods
+        """
+        return [
+            self.make_action_array(a)
+            for a in self.skd_beluga_domain._get_applicable_actions_from(
+                self.current_pddl_state
+            ).get_elements()
+        ]
+
     def make_state_array(self, pddl_state: SkdBaseDomain.T_state) -> ArrayLike:
         """Transform a PDDL state into a tensor state"""
         raise NotImplementedError()
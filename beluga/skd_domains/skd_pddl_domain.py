@@ -7,6 +7,7 @@ from beluga_lib.problem_state import BelugaProblemState
 from encoder.pddl_encoding.variant import Variant
 
 from .skd_base_domain import SkdBaseDomain
+from .snapshot import SnapshotCache, read_snapshot
 
 
 class SkdPDDLDomain(SkdBaseDomain, DeterministicPlanningDomain):
@@ -26,25 +27,83 @@ class SkdPDDLDomain(SkdBaseDomain, DeterministicPlanningDomain):
         problem_name: str,
         instance_dir: os.PathLike = None,
         classic : bool = True,
-        initial_state : BelugaProblemState = None
+        initial_state : BelugaProblemState = None,
+        dump_pddl: bool = False,
+        packed_states: bool = False,
+        snapshot_dir: os.PathLike = None,
+        incremental_aops: bool = False,
     ) -> None:
         variant = Variant()
         # variant.classic = True
         variant.classic = classic
         variant.probabilistic = False
-        domain_str, problem_str = self._generate_pddl(
+        cache = None
+        if snapshot_dir is not None:
+            cache = SnapshotCache(snapshot_dir)
+            key = self._snapshot_key(
+                beluga_problem, problem_name, variant, state=initial_state
+            )
+            snapshot = cache.load(key)
+            if snapshot is not None:
+                self._load_snapshot(
+                    snapshot, instance_dir, dump_pddl, packed_states, incremental_aops
+                )
+                return
+        domain_str, pddl_problem, name = self._generate_pddl(
             beluga_problem, problem_name, variant, state=initial_state
         )
-        self._create_pddl_structs(domain_str, problem_str, instance_dir)
+        _, plado_problem = self._create_pddl_structs(
+            domain_str,
+            pddl_problem,
+            name,
+            instance_dir,
+            dump_pddl=dump_pddl,
+            packed_states=packed_states,
+            incremental_aops=incremental_aops,
+        )
+        if cache is not None:
+            cache.store(
+                key,
+                self._snapshot(beluga_problem, problem_name, variant, plado_problem),
+            )
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        path: os.PathLike,
+        instance_dir: os.PathLike = None,
+        dump_pddl: bool = False,
+        packed_states: bool = False,
+        incremental_aops: bool = False,
+    ) -> "SkdPDDLDomain":
+        """Builds a domain from a snapshot file (see SnapshotCache), without
+        encoding nor parsing the problem
+
+        Args:
+            path (os.PathLike): path of the snapshot file
+            instance_dir (os.PathLike, optional): directory of the PDDL files. Defaults to None.
+            dump_pddl (bool, optional): write the PDDL files. Defaults to False.
+            packed_states (bool, optional): use packed states. Defaults to False.
+            incremental_aops (bool, optional): use the incremental applicable actions
+            generator, which enumerates the actions in another order. Defaults to False.
+
+        Returns:
+            SkdPDDLDomain: The domain
+        """
+        domain = cls.__new__(cls)
+        domain._load_snapshot(
+            read_snapshot(path), instance_dir, dump_pddl, packed_states, incremental_aops
+        )
+        return domain
 
     def _get_next_state(
         self, memory: SkdBaseDomain.T_state, action: SkdBaseDomain.T_event
     ) -> SkdBaseDomain.T_state:
-        successors = self.succ_gen(
-            memory.to_plado(self.cost_functions), (action.action_id, action.args)
-        )
+        state = self._to_plado(memory)
+        with self.profiler.phase("successor_generation"):
+            successors = self.succ_gen(state, (action.action_id, action.args))
         successor = successors[0][0]
-        t = self._translate_state(successor)
+        t = self._translate_successor(memory, state, successor)
         c = self._get_cost_from_state(successor)
         if c != 1:
             self.transition_cost[(memory, action, t)] = c
@@ -24,22 +24,36 @@ class SkdPPDDLDomain(SkdBaseDomain, GoalMDPDomain):
         beluga_problem: BelugaProblem,
         problem_name: str,
         instance_dir: os.PathLike = None,
+        dump_pddl: bool = False,
+        packed_states: bool = False,
+        incremental_aops: bool = False,
     ) -> None:
         variant = Variant()
         variant.classic = True
         variant.probabilistic = True
-        domain_str, problem_str = self._generate_pddl(
+        domain_str, pddl_problem, name = self._generate_pddl(
             beluga_problem, problem_name, variant
         )
-        self._create_pddl_structs(domain_str, problem_str, instance_dir)
+        self._create_pddl_structs(
+            domain_str,
+            pddl_problem,
+            name,
+            instance_dir,
+            dump_pddl=dump_pddl,
+            packed_states=packed_states,
+            incremental_aops=incremental_aops,
+        )
 
     def _get_next_state_distribution(
         self, memory: SkdBaseDomain.T_state, action: SkdBaseDomain.T_event
     ) -> DiscreteDistribution[SkdBaseDomain.T_state]:
-        successors = self.succ_gen(
-            memory.to_plado(self.cost_functions), (action.action_id, action.args)
-        )
-        ts = [(self._translate_state(succ), float(prob)) for succ, prob in successors]
+        state = self._to_plado(memory)
+        with self.profiler.phase("successor_generation"):
+            successors = self.succ_gen(state, (action.action_id, action.args))
+        ts = [
+            (self._translate_successor(memory, state, succ), float(prob))
+            for succ, prob in successors
+        ]
         for i in range(len(ts)):
             c = self._get_cost_from_state(successors[i][0])
             if c != 1:
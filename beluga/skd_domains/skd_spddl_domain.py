@@ -1,13 +1,17 @@
 import os
+from collections import OrderedDict
 
 from skdecide import RLDomain, Value, Space, TransitionOutcome
 from skdecide.builders.domain.observability import FullyObservable
 
-from beluga_lib.beluga_problem import BelugaProblem
+from beluga_lib.beluga_problem import BelugaProblem, ScenarioView
+from encoder.pddl import PDDLProblem
 from encoder.pddl_encoding.variant import Variant
 from utils.uncertainty import ArrivalSampler
 
+from .episode_template import Episode, EpisodeTemplate
 from .skd_base_domain import SkdBaseDomain
+from .snapshot import Snapshot, SnapshotCache, read_snapshot
 
 
 class SkdSPDDLDomain(SkdBaseDomain, RLDomain, FullyObservable):
@@ -25,8 +29,11 @@ class SkdSPDDLDomain(SkdBaseDomain, RLDomain, FullyObservable):
     calling the `step(action: Action)` method.
 
     Important note #2: the simulator is based on a random shuffle of the ordering of Beluga flights when calling
-    the `reset()` method at the beginning of each episode, from which an episode-specific PDDL file is generated
-    to define the logics of the transition function in the `step(action: Action)` method. It means that different
+    the `reset()` method at the beginning of each episode, from which an episode-specific PDDL task is obtained
+    to define the logics of the transition function in the `step(action: Action)` method. The PDDL encoding and
+    the plado task are only built once, at the first reset, and then patched with the flight ordering of each
+    episode (see EpisodeTemplate); the PDDL problem of the current episode is only encoded when the PDDL files
+    are written (see `dump_pddl()` and `get_pddl_problem()`). It means that different
     calls of the `step(action: Action)` from the same internal PDDL state but within different episodes will result
     in different next states (since the PDDL problems in each episode are different). In order to avoid misuse and
     misinterpretation of the internal state by the solver, we intentionally hide the internal state of the domain,
@@ -45,8 +52,18 @@ class SkdSPDDLDomain(SkdBaseDomain, RLDomain, FullyObservable):
         instance_dir: os.PathLike = None,
         seed: int = None,
         classic: bool = True,
+        dump_pddl: bool = False,
+        packed_states: bool = False,
+        snapshot_dir: os.PathLike = None,
+        incremental_aops: bool = False,
     ) -> None:
         self.task = None
+        self.template: EpisodeTemplate = None
+        self.episode: Episode = None
+        self._episode_pddl_problem: PDDLProblem = None
+        # Caches of the last episodes installed, see _install_episode
+        self.episode_cache_size: int = 1
+        self._episode_caches: OrderedDict[int, tuple] = OrderedDict()
         self.beluga_problem = beluga_problem
         self.problem_name = problem_name
         self.instance_dir = instance_dir
@@ -55,21 +72,170 @@ class SkdSPDDLDomain(SkdBaseDomain, RLDomain, FullyObservable):
         self.original_seed = seed
         self._current_seed = seed
         self.classic = classic
+        self.dump_pddl_files = dump_pddl
+        self.packed_states = packed_states
+        self.snapshot_dir = snapshot_dir
+        self.incremental_aops = incremental_aops
 
-    def _state_reset(self) -> SkdBaseDomain.T_state:
-        prb_seq, times = self.problem_sampler.sample_scenarios_as_problems(
-            self.beluga_problem, size=1, seed=self._current_seed
+    @classmethod
+    def from_snapshot(
+        cls,
+        path: os.PathLike,
+        seed: int = None,
+        dump_pddl: bool = False,
+        packed_states: bool = False,
+        incremental_aops: bool = False,
+    ) -> "SkdSPDDLDomain":
+        """Builds a domain from a snapshot file (see SnapshotCache), without
+        encoding nor parsing the problem
+
+        Args:
+            path (os.PathLike): path of the snapshot file
+            seed (int, optional): seed of the flight orderings. Defaults to None.
+            dump_pddl (bool, optional): write the PDDL files. Defaults to False.
+            packed_states (bool, optional): use packed states. Defaults to False.
+            incremental_aops (bool, optional): use the incremental applicable actions
+            generator, which enumerates the actions in another order. Defaults to False.
+
+        Returns:
+            SkdSPDDLDomain: The domain
+        """
+        snapshot = read_snapshot(path)
+        domain = cls(
+            snapshot.beluga_problem,
+            snapshot.problem_name,
+            seed=seed,
+            classic=snapshot.variant.classic,
+            dump_pddl=dump_pddl,
+            packed_states=packed_states,
+            incremental_aops=incremental_aops,
         )
-        # Change the RNG seed in a predictable fashion
-        if self.original_seed is not None:
-            self._current_seed += 1
+        domain._compile_template(snapshot)
+        return domain
+
+    def _variant(self) -> Variant:
         variant = Variant()
         variant.classic = self.classic
         variant.probabilistic = False
-        domain_str, problem_str = self._generate_pddl(
-            prb_seq[0], self.problem_name, variant
+        return variant
+
+    def _compile_template(self, snapshot: Snapshot = None) -> None:
+        variant = self._variant()
+        cache = None
+        if snapshot is None and self.snapshot_dir is not None:
+            cache = SnapshotCache(self.snapshot_dir)
+            key = self._snapshot_key(self.beluga_problem, self.problem_name, variant)
+            snapshot = cache.load(key)
+        if snapshot is not None:
+            # The PDDL files are written for each episode (see _install_episode)
+            self._load_snapshot(
+                snapshot,
+                packed_states=self.packed_states,
+                incremental_aops=self.incremental_aops,
+            )
+            problem = snapshot.plado_problem
+        else:
+            domain_str, pddl_problem, name = self._generate_pddl(
+                self.beluga_problem, self.problem_name, variant
+            )
+            _, problem = self._create_pddl_structs(
+                domain_str,
+                pddl_problem,
+                name,
+                packed_states=self.packed_states,
+                incremental_aops=self.incremental_aops,
+            )
+            # Stored before any episode patches the task
+            if cache is not None:
+                cache.store(
+                    key,
+                    self._snapshot(
+                        self.beluga_problem, self.problem_name, variant, problem
+                    ),
+                )
+        self.template = EpisodeTemplate(
+            self.task, problem, [f.name for f in self.beluga_problem.flights]
         )
-        self._create_pddl_structs(domain_str, problem_str)
+        self._flight_idx: dict[str, int] = {
+            f.name: i for i, f in enumerate(self.beluga_problem.flights)
+        }
+
+    def _sample_episode(self, seed: int = None) -> Episode:
+        """Samples the flight ordering of a new episode and computes the
+        corresponding task patch (without installing it)
+
+        Args:
+            seed (int, optional): seed of the flight ordering. Defaults to None,
+            in which case the (advancing) seed of the domain is used.
+
+        Returns:
+            Episode: The sampled episode
+        """
+        if seed is None:
+            seed = self._current_seed
+            # Change the RNG seed in a predictable fashion
+            if self.original_seed is not None:
+                self._current_seed += 1
+        flight_seq, times = self.problem_sampler.sample_flight_sequences(
+            self.beluga_problem, size=1, seed=seed
+        )
+        if self.template is None:
+            self._compile_template()
+        return self.template.episode(self._flight_idx[f.name] for f in flight_seq[0])
+
+    def _install_episode(self, episode: Episode) -> None:
+        """Patches the task of the domain with the given episode. The caches
+        computed on the task of the previous episode (applicable actions and plado
+        view of the last state) are kept aside for the last `episode_cache_size`
+        episodes, so that switching back to an episode (e.g. in BelugaVectorEnv)
+        reuses them instead of starting from scratch. They are keyed by episode
+        rather than by flight ordering, since concurrent episodes often share
+        their ordering but not their current state."""
+        if self.episode is not None and self.episode_cache_size > 0:
+            # The episode is kept with its caches so that its id is not reused
+            self._episode_caches[id(self.episode)] = (
+                self.episode,
+                self.aops_gen.save(),
+                self._save_state_cache(),
+            )
+            self._episode_caches.move_to_end(id(self.episode))
+            while len(self._episode_caches) > self.episode_cache_size:
+                self._episode_caches.popitem(last=False)
+        self.template.install(episode)
+        caches = self._episode_caches.pop(id(episode), None)
+        if caches is None:
+            self.aops_gen.invalidate()
+            self._clear_state_cache()
+        else:
+            self.aops_gen.restore(caches[1])
+            self._restore_state_cache(caches[2])
+        for o in self.template.flight_ids:
+            self._object_idx[self.task.objects[o].lower()] = o
+        self.episode = episode
+        # The PDDL files of the previous episode are outdated
+        self._episode_pddl_problem = None
+        self.domain_path = None
+        self.problem_path = None
+        if self.dump_pddl_files:
+            self.dump_pddl()
+
+    def _current_pddl_problem(self) -> PDDLProblem:
+        if self.episode is None:
+            return self.pddl_problem
+        if self._episode_pddl_problem is None:
+            flights = [self.beluga_problem.flights[i] for i in self.episode.order]
+            _, self._episode_pddl_problem, _ = self._generate_pddl(
+                ScenarioView(self.beluga_problem, flights),
+                self.problem_name,
+                self._variant(),
+            )
+        return self._episode_pddl_problem
+
+    def _state_reset(self) -> SkdBaseDomain.T_state:
+        with self.profiler.phase("episode_sampling"):
+            episode = self._sample_episode()
+        with self.profiler.phase("episode_install"):
+            self._install_episode(episode)
         self.state = self._translate_state(self.task.initial_state)
         return self.state
 
@@ -79,11 +245,11 @@ class SkdSPDDLDomain(SkdBaseDomain, RLDomain, FullyObservable):
         SkdBaseDomain.T_predicate,
         SkdBaseDomain.T_info,
     ]:
-        successors = self.succ_gen(
-            self.state.to_plado(self.cost_functions), (action.action_id, action.args)
-        )
+        state = self._to_plado(self.state)
+        with self.profiler.phase("successor_generation"):
+            successors = self.succ_gen(state, (action.action_id, action.args))
         successor = successors[0][0]
-        t = self._translate_state(successor)
+        t = self._translate_successor(self.state, state, successor)
         c = self._get_cost_from_state(successor)
         self.state = t
         return TransitionOutcome(
@@ -0,0 +1,364 @@
+import multiprocessing as mp
+import os
+import sys
+import traceback
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Optional
+
+import gymnasium as gym
+import numpy as np
+from numpy.typing import ArrayLike
+from ray.rllib.env.vector_env import VectorEnv
+from ray.rllib.utils.typing import EnvConfigDict
+
+from .skd_gym_domain import BelugaGymCompatibleDomain, BelugaGymEnv
+
+
+# SharedMemory accepts a `track` argument since Python 3.13
+_TRACK_ARGUMENT: bool = sys.version_info >= (3, 13)
+
+
+def _start_resource_tracker() -> None:
+    """Starts the resource tracker of the main process before the workers so that
+    they inherit it whatever the start method, and the shared memory blocks are
+    tracked (and unlinked if the main process crashes) by a single tracker"""
+    if os.name == "posix":
+        resource_tracker.ensure_running()
+
+
+class _SharedArray:
+    """Numpy array stored in a shared memory block"""
+
+    def __init__(
+        self, shape: tuple[int], dtype: np.dtype, name: Optional[str] = None
+    ) -> None:
+        self.shape: tuple[int] = tuple(shape)
+        self.dtype: np.dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        # Only the creator of the block unlinks it. The worker processes share the
+        # resource tracker of the main process (see `_start_resource_tracker()`), so
+        # attaching to the block must not register it again (nor unregister it, which
+        # would drop the registration of the main process)
+        kwargs = {"track": False} if name is not None and _TRACK_ARGUMENT else {}
+        self.shm: SharedMemory = SharedMemory(
+            name=name, create=name is None, size=size, **kwargs
+        )
+        self.array: np.ndarray = np.ndarray(self.shape, self.dtype, buffer=self.shm.buf)
+
+    def spec(self) -> tuple[tuple[int], str, str]:
+        return self.shape, self.dtype.str, self.shm.name
+
+    def close(self, unlink: bool = False) -> None:
+        del self.array
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _worker(
+    conn: Connection,
+    domain_factory: Callable[[int], BelugaGymCompatibleDomain],
+    seeds: list[int],
+    offset: int,
+    unwrap_spaces: bool,
+    max_nb_applicable_actions: int,
+) -> None:
+    """Main loop of a worker process owning the environments
+    offset, ..., offset + len(seeds) - 1 of a BelugaSubprocVecEnv"""
+    try:
+        domains = [domain_factory(seed) for seed in seeds]
+        envs = [
+            BelugaGymEnv({"domain": domain, "unwrap_spaces": unwrap_spaces})
+            for domain in domains
+        ]
+        conn.send(("ok", (envs[0].observation_space, envs[0].action_space)))
+        specs = conn.recv()
+        observations, actions, applicable, nb_applicable = (
+            _SharedArray(*spec) for spec in specs
+        )
+        rows = range(offset, offset + len(envs))
+
+        def write(k: int, obs: ArrayLike) -> None:
+            i = rows[k]
+            observations.array[i] = obs
+            if max_nb_applicable_actions > 0:
+                aops = domains[k].get_applicable_action_arrays()
+                if len(aops) > max_nb_applicable_actions:
+                    raise RuntimeError(
+                        "Too many applicable actions to store them in the action masks; "
+                        "please increase max_nb_applicable_actions"
+                    )
+                nb_applicable.array[i] = len(aops)
+                applicable.array[i] = -1
+                for j, a in enumerate(aops):
+                    applicable.array[i][j] = a
+
+        while True:
+            cmd, data = conn.recv()
+            if cmd == "reset":
+                res = {}
+                for k, seed in data.items():
+                    obs, info = envs[k].reset(seed=seed)
+                    write(k, obs)
+                    res[k] = info
+                conn.send(("ok", res))
+            elif cmd == "step":
+                res = []
+                for k, env in enumerate(envs):
+                    obs, reward, terminated, truncated, info = env.step(
+                        actions.array[rows[k]]
+                    )
+                    write(k, obs)
+                    res.append((reward, terminated, truncated, info))
+                conn.send(("ok", res))
+            elif cmd == "close":
+                for domain in domains:
+                    domain.skd_beluga_domain.cleanup()
+                for shared in (observations, actions, applicable, nb_applicable):
+                    shared.close()
+                conn.send(("ok", None))
+                break
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+class BelugaSubprocVecEnv(VectorEnv):
+    """Vectorized version of the BelugaGymEnv environment, whose environments are
+    distributed over a pool of worker processes so that rollouts use several cores.
+    Each worker owns a set of Gym-compatible Beluga domains and writes their
+    observations (and optionally their applicable actions) into shared memory
+    buffers, so that no state is pickled back to the main process. It can be
+    passed to RLlib in place of the BelugaGymEnv class.
+
+    Steps can either be synchronous with `vector_step()`, or asynchronous with
+    `step_async()` followed by `step_wait()`, which allows to do some work in the
+    main process while the workers simulate the environments.
+    """
+
+    def __init__(self, env_config: EnvConfigDict):
+        """The constructor of the vectorized Beluga environment
+
+        Args:
+            env_config (EnvConfigDict): Environment configuration dictionary.
+            This dictionary must at least contain the 'domain_factory' key which points
+            to a function taking a seed and returning a scikit-decide domain inherited
+            from BelugaGymCompatibleDomain (it must be picklable on platforms where
+            processes cannot be forked). It can also optionally contain:
+            - 'num_workers': the number of worker processes (defaults to 1);
+            - 'envs_per_worker': the number of environments per worker (defaults to 1);
+            - 'domain_seed': the seed from which the seeds passed to the domain factory
+            are deterministically derived (defaults to 0);
+            - 'max_nb_applicable_actions': the maximum number of applicable actions
+            stored for each environment (see `applicable_actions()`); they are not
+            computed if it is equal to 0, which is the default;
+            - 'unwrap_spaces': see BelugaGymEnv.
+        """
+        assert "domain_factory" in env_config
+        self._closed: bool = False
+        num_workers: int = env_config.get("num_workers", 1)
+        envs_per_worker: int = env_config.get("envs_per_worker", 1)
+        self.max_nb_applicable_actions: int = env_config.get(
+            "max_nb_applicable_actions", 0
+        )
+        # Different RLlib env runners get different seeds
+        seed_sequence = np.random.SeedSequence(
+            [
+                env_config.get("domain_seed", 0),
+                getattr(env_config, "worker_index", 0),
+            ]
+        )
+        seeds = [
+            int(s.generate_state(1)[0])
+            for s in seed_sequence.spawn(num_workers * envs_per_worker)
+        ]
+
+        ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else None)
+        _start_resource_tracker()
+        self._conns: list[Connection] = []
+        self._processes: list[mp.Process] = []
+        self._slices: list[range] = []
+        for w in range(num_workers):
+            conn, worker_conn = ctx.Pipe()
+            offset = w * envs_per_worker
+            process = ctx.Process(
+                target=_worker,
+                args=(
+                    worker_conn,
+                    env_config["domain_factory"],
+                    seeds[offset : offset + envs_per_worker],
+                    offset,
+                    env_config.get("unwrap_spaces", True),
+                    self.max_nb_applicable_actions,
+                ),
+                daemon=True,
+            )
+            process.start()
+            worker_conn.close()
+            self._conns.append(conn)
+            self._processes.append(process)
+            self._slices.append(range(offset, offset + envs_per_worker))
+
+        spaces = self._receive_all()
+        observation_space, action_space = spaces[0]
+        assert isinstance(observation_space, gym.spaces.Box) and isinstance(
+            action_space, gym.spaces.Box
+        ), "shared memory buffers require Box observation and action spaces"
+        super().__init__(observation_space, action_space, num_workers * envs_per_worker)
+
+        self._observations = _SharedArray(
+            (self.num_envs, *observation_space.shape), observation_space.dtype
+        )
+        self._actions = _SharedArray(
+            (self.num_envs, *action_space.shape), action_space.dtype
+        )
+        self._applicable = _SharedArray(
+            (self.num_envs, self.max_nb_applicable_actions, *action_space.shape),
+            action_space.dtype,
+        )
+        self._nb_applicable = _SharedArray((self.num_envs,), np.int32)
+        specs = tuple(
+            shared.spec()
+            for shared in (
+                self._observations,
+                self._actions,
+                self._applicable,
+                self._nb_applicable,
+            )
+        )
+        for conn in self._conns:
+            conn.send(specs)
+        self._waiting: bool = False
+
+    def _receive_all(self) -> list[Any]:
+        res = [conn.recv() for conn in self._conns]
+        for status, data in res:
+            if status == "error":
+                self.close()
+                raise RuntimeError(f"Beluga environment worker failed:\n{data}")
+        return [data for _, data in res]
+
+    def _worker_of(self, index: int) -> int:
+        return next(w for w, s in enumerate(self._slices) if index in s)
+
+    @property
+    def observations(self) -> np.ndarray:
+        """Zero-copy view of the current observations of the environments, which is
+        overwritten by the next reset or step"""
+        return self._observations.array
+
+    def applicable_actions(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the applicable actions of the environments after the last reset or
+        step, which requires the 'max_nb_applicable_actions' configuration key
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: A tensor of shape
+            (num_envs, max_nb_applicable_actions, *action_space.shape) whose entry
+            (i, k) is the k-th applicable action of the i-th environment (padded with -1),
+            and a boolean mask of shape (num_envs, max_nb_applicable_actions) of the
+            valid entries
+        """
+        assert self.max_nb_applicable_actions > 0, "applicable actions are not stored"
+        mask = (
+            np.arange(self.max_nb_applicable_actions)[None, :]
+            < self._nb_applicable.array[:, None]
+        )
+        return self._applicable.array.copy(), mask
+
+    def vector_reset(
+        self, *, seeds: Optional[list[int]] = None, options: Optional[list[dict]] = None
+    ) -> tuple[list[ArrayLike], list[dict]]:
+        requests = [{} for _ in self._conns]
+        for w, s in enumerate(self._slices):
+            for k, i in enumerate(s):
+                requests[w][k] = seeds[i] if seeds is not None else None
+        for conn, request in zip(self._conns, requests):
+            conn.send(("reset", request))
+        infos = [info for res in self._receive_all() for info in res.values()]
+        return list(self._observations.array.copy()), infos
+
+    def reset_at(
+        self,
+        index: Optional[int] = None,
+        *,
+        seed: Optional[int] = None,
+        options: Optional[dict] = None,
+    ) -> tuple[ArrayLike, dict]:
+        index = 0 if index is None else index
+        w = self._worker_of(index)
+        self._conns[w].send(("reset", {index - self._slices[w].start: seed}))
+        status, data = self._conns[w].recv()
+        if status == "error":
+            self.close()
+            raise RuntimeError(f"Beluga environment worker failed:\n{data}")
+        return self._observations.array[index].copy(), next(iter(data.values()))
+
+    def step_async(self, actions: list[ArrayLike]) -> None:
+        """Sends the actions to the workers without waiting for the outcomes
+
+        Args:
+            actions (list[ArrayLike]): The actions of the environments
+        """
+        assert not self._waiting, "step_wait() must be called before the next step"
+        self._actions.array[:] = np.asarray(actions, dtype=self._actions.dtype)
+        for conn in self._conns:
+            conn.send(("step", None))
+        self._waiting = True
+
+    def step_wait(
+        self,
+    ) -> tuple[list[ArrayLike], list[float], list[bool], list[bool], list[dict]]:
+        """Waits for the outcomes of the actions sent by `step_async()`
+
+        Returns:
+            tuple[list[ArrayLike], list[float], list[bool], list[bool], list[dict]]:
+            The observations, rewards, terminations, truncations and infos of the
+            environments
+        """
+        assert self._waiting, "step_async() must be called first"
+        self._waiting = False
+        res = [x for outcomes in self._receive_all() for x in outcomes]
+        rewards, terminateds, truncateds, infos = (list(x) for x in zip(*res))
+        return (
+            list(self._observations.array.copy()),
+            rewards,
+            terminateds,
+            truncateds,
+            infos,
+        )
+
+    def vector_step(
+        self, actions: list[ArrayLike]
+    ) -> tuple[list[ArrayLike], list[float], list[bool], list[bool], list[dict]]:
+        self.step_async(actions)
+        return self.step_wait()
+
+    def get_sub_environments(self) -> list[Any]:
+        # The environments live in the worker processes
+        return []
+
+    def close(self) -> None:
+        """Stops the workers and releases the shared memory buffers"""
+        if self._closed:
+            return
+        self._closed = True
+        for conn, process in zip(self._conns, self._processes):
+            if process.is_alive():
+                try:
+                    conn.send(("close", None))
+                    conn.recv()
+                except (BrokenPipeError, EOFError):
+                    pass
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        for name in ("_observations", "_actions", "_applicable", "_nb_applicable"):
+            if hasattr(self, name):
+                getattr(self, name).close(unlink=True)
+
+    def __del__(self) -> None:
+        if hasattr(self, "_closed"):
+            self.close()
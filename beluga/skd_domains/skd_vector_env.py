@@ -0,0 +1,221 @@
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from beluga_lib.beluga_problem import BelugaProblem
+
+from .episode_template import Episode
+from .skd_base_domain import Action, SkdBaseDomain
+from .skd_spddl_domain import SkdSPDDLDomain
+
+
+class BelugaVectorEnv:
+    """Vectorized environment running N episodes of the same Beluga problem in
+    lockstep. All the episodes share a single SkdSPDDLDomain, hence a single
+    compiled plado task: every episode only keeps its own task patch (see
+    EpisodeTemplate), which is installed in the shared task before operating on
+    the episode. Installing a patch only swaps a few references, so running N
+    episodes costs N steps of the domain, without recompiling anything.
+
+    Actions are represented as in the example Gym-compatible domain of the
+    generate_solve_rllib_test.py script, i.e. as integer vectors in the form
+    [action-id arg1-id ... argn-id] padded with -1 up to the maximum number of
+    action arguments across all the actions of the domain. The applicable actions
+    of the N episodes are returned as a padded tensor along with a boolean mask
+    of its valid entries (see `applicable_actions_batch()`).
+
+    Args:
+        beluga_problem (BelugaProblem): Beluga problem of the episodes
+        problem_name (str): Name of the problem
+        num_envs (int): Number of episodes run in parallel
+        instance_dir (os.PathLike, optional): Directory of the instance. Defaults to None.
+        seed (int, optional): Seed of the first episode, the following ones
+        (across episodes and resets) using the next seeds. Defaults to None.
+        classic (bool, optional): Use the classic encoding. Defaults to True.
+        packed_states (bool, optional): Use packed states. Defaults to False.
+        incremental_aops (bool, optional): Use the incremental applicable actions
+        generator, which enumerates the actions in another order. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        beluga_problem: BelugaProblem,
+        problem_name: str,
+        num_envs: int,
+        instance_dir: os.PathLike = None,
+        seed: int = None,
+        classic: bool = True,
+        packed_states: bool = False,
+        incremental_aops: bool = False,
+    ) -> None:
+        assert num_envs > 0, "at least one environment is required"
+        self.num_envs: int = num_envs
+        self.domain: SkdSPDDLDomain = SkdSPDDLDomain(
+            beluga_problem,
+            problem_name,
+            instance_dir,
+            seed=seed,
+            classic=classic,
+            packed_states=packed_states,
+            incremental_aops=incremental_aops,
+        )
+        # Keep the caches of every episode while the others are active
+        self.domain.episode_cache_size = num_envs
+        self.episodes: list[Optional[Episode]] = [None] * num_envs
+        self.states: list[Optional[SkdBaseDomain.T_state]] = [None] * num_envs
+        self.terminations: np.ndarray = np.zeros(num_envs, dtype=bool)
+        self._applicable: list[Optional[list[Action]]] = [None] * num_envs
+        self._active: Optional[Episode] = None
+        self.max_action_arity: int = 0
+
+    def activate(self, i: int) -> None:
+        """Installs the task patch of the i-th episode in the shared domain. The
+        object names of the task, used e.g. when printing or serializing states,
+        are the ones of the last episode activated."""
+        if self._active is not self.episodes[i]:
+            self.domain._install_episode(self.episodes[i])
+            self._active = self.episodes[i]
+
+    def reset_env(self, i: int, seed: int = None) -> SkdBaseDomain.T_state:
+        """Starts a new episode in the i-th environment
+
+        Args:
+            i (int): index of the environment
+            seed (int, optional): seed of the flight ordering of the episode.
+            Defaults to None, in which case the next seed of the domain is used.
+
+        Returns:
+            SkdBaseDomain.T_state: The initial state of the episode
+        """
+        self.episodes[i] = self.domain._sample_episode(seed)
+        if self._active is None:
+            self.max_action_arity = max(
+                (a.parameters for a in self.domain.task.actions), default=0
+            )
+        self.activate(i)
+        self.states[i] = self.domain._translate_state(self.domain.task.initial_state)
+        self.terminations[i] = self.domain._is_terminal(self.states[i])
+        self._applicable[i] = None
+        return self.states[i]
+
+    def reset_batch(
+        self, seeds: Optional[Sequence[int]] = None
+    ) -> list[SkdBaseDomain.T_state]:
+        """Starts a new episode in every environment
+
+        Args:
+            seeds (Optional[Sequence[int]], optional): seeds of the flight orderings
+            of the episodes. Defaults to None, in which case the next seeds of the
+            domain are used.
+
+        Returns:
+            list[SkdBaseDomain.T_state]: The initial states of the episodes
+        """
+        if seeds is not None:
+            assert len(seeds) == self.num_envs, "one seed per environment expected"
+        for i in range(self.num_envs):
+            self.reset_env(i, seeds[i] if seeds is not None else None)
+        return list(self.states)
+
+    def _applicable_actions(self, i: int) -> list[Action]:
+        if self._applicable[i] is None:
+            self.activate(i)
+            self._applicable[i] = (
+                []
+                if self.terminations[i]
+                else list(
+                    self.domain._get_applicable_actions_from(
+                        self.states[i]
+                    ).get_elements()
+                )
+            )
+        return self._applicable[i]
+
+    def make_action_array(self, action: Action) -> np.ndarray:
+        """Transforms a PDDL action into its vector representation"""
+        res = np.full(1 + self.max_action_arity, -1, dtype=np.int64)
+        res[0] = action.action_id
+        res[1 : 1 + len(action.args)] = action.args
+        return res
+
+    def make_pddl_action(self, action_array: ArrayLike) -> Action:
+        """Transforms the vector representation of an action into a PDDL action"""
+        action_id = int(action_array[0])
+        arity = self.domain.task.actions[action_id].parameters
+        return Action(
+            self.domain,
+            action_id,
+            tuple(int(o) for o in action_array[1 : 1 + arity]),
+        )
+
+    def applicable_actions_batch(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the applicable actions in the current state of every episode
+        (none for the terminated ones)
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: An integer tensor of shape
+            (num_envs, max_nb_applicable_actions, 1 + max_action_arity) whose entry
+            (i, k) is the vector representation of the k-th applicable action of
+            the i-th episode, and a boolean mask of shape
+            (num_envs, max_nb_applicable_actions) of the valid entries
+        """
+        applicable = [self._applicable_actions(i) for i in range(self.num_envs)]
+        width = max((len(aops) for aops in applicable), default=0)
+        actions = np.full(
+            (self.num_envs, width, 1 + self.max_action_arity), -1, dtype=np.int64
+        )
+        mask = np.zeros((self.num_envs, width), dtype=bool)
+        for i, aops in enumerate(applicable):
+            mask[i, : len(aops)] = True
+            for k, a in enumerate(aops):
+                actions[i, k, 0] = a.action_id
+                actions[i, k, 1 : 1 + len(a.args)] = a.args
+        return actions, mask
+
+    def step_batch(
+        self, actions: ArrayLike
+    ) -> tuple[list[SkdBaseDomain.T_state], np.ndarray, np.ndarray]:
+        """Applies one action in every episode which is not terminated
+
+        Args:
+            actions (ArrayLike): integer array of shape (num_envs, 1 + max_action_arity)
+            with the vector representation of the action of each episode (ignored
+            for the terminated episodes)
+
+        Raises:
+            ValueError: if an action is not applicable in the current state of its episode
+
+        Returns:
+            tuple[list[SkdBaseDomain.T_state], np.ndarray, np.ndarray]: The next
+            states, the rewards and the terminations of the episodes
+        """
+        actions = np.asarray(actions)
+        assert len(actions) == self.num_envs, "one action per environment expected"
+        # All the actions are checked before any is applied, so that an invalid
+        # action leaves every episode untouched
+        pddl_actions = {}
+        for i in range(self.num_envs):
+            if self.terminations[i]:
+                continue
+            action = self.make_pddl_action(actions[i])
+            if action not in self._applicable_actions(i):
+                raise ValueError(
+                    f"action {action} is not applicable in environment {i}"
+                )
+            pddl_actions[i] = action
+        rewards = np.zeros(self.num_envs, dtype=np.float64)
+        for i, action in pddl_actions.items():
+            self.activate(i)
+            self.domain.state = self.states[i]
+            outcome = self.domain._state_step(action)
+            self.states[i] = outcome.state
+            rewards[i] = -outcome.value.cost
+            self.terminations[i] = outcome.termination
+            self._applicable[i] = None
+        return list(self.states), rewards, self.terminations.copy()
+
+    def cleanup(self) -> None:
+        """Erases the temporary directory containing PDDL files (if any)"""
+        self.domain.cleanup()
@@ -0,0 +1,298 @@
+import builtins
+import copyreg
+import functools
+import hashlib
+import io
+import json
+import marshal
+import mmap
+import os
+import pickle
+import struct
+import sys
+import types
+from importlib.metadata import version
+from tempfile import NamedTemporaryFile
+from typing import Any
+
+from beluga_lib.beluga_problem import BelugaProblem
+from encoder.pddl import PDDLProblem
+from encoder.pddl_encoding.variant import Variant
+from plado import pddl
+from plado.datalog.evaluator import DatalogEngine
+from plado.semantics.goal_checker import GoalChecker
+from plado.semantics.successor_generator import SuccessorGenerator
+from plado.semantics.task import Task
+
+from .incremental_aops import (
+    IncrementalApplicableActionsGenerator,
+    PladoApplicableActionsGenerator,
+)
+
+# Version of the snapshot format, to be increased whenever the layout of the
+# files changes (changes of the pickled classes are detected, see _source_digest)
+SNAPSHOT_VERSION = 2
+
+_MAGIC = b"BLGSNAP\0"
+# Magic, format version, payload length, sha256 of the payload, tag length
+_HEADER = struct.Struct("<8sIQ32sH")
+
+
+# Modules and packages of the repository whose classes are pickled in the snapshots
+_PICKLED_MODULES = (
+    "beluga_lib",
+    "encoder.pddl",
+    Variant.__module__,
+    IncrementalApplicableActionsGenerator.__module__,
+    __name__,
+)
+
+
+@functools.cache
+def _source_digest() -> str:
+    """Hash of the sources of the modules whose classes are pickled in the
+    snapshots, so that the snapshots written by another version of the code are
+    not loaded"""
+    h = hashlib.sha256()
+    for name in _PICKLED_MODULES:
+        path = sys.modules[name].__file__
+        if os.path.basename(path) == "__init__.py":
+            directory = os.path.dirname(path)
+            paths = sorted(
+                os.path.join(root, f)
+                for root, _, files in os.walk(directory)
+                for f in files
+                if f.endswith(".py")
+            )
+        else:
+            directory, paths = os.path.dirname(path), [path]
+        for path in paths:
+            h.update(f"{name}/{os.path.relpath(path, directory)}\0".encode())
+            with open(path, "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def _environment_tag() -> bytes:
+    """The compiled datalog engines are stored as marshalled code objects, which
+    are only valid for the Python version that produced them, and the pickled
+    tasks depend on the plado version and on the code of the pickled classes"""
+    return (
+        f"python{sys.version_info[0]}.{sys.version_info[1]}-plado{version('plado')}"
+        f"-src{_source_digest()}"
+    ).encode()
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is invalid, corrupted or was written by an
+    incompatible version"""
+
+
+class Snapshot:
+    """Decoded Beluga problem together with its PDDL encoding and the grounded
+    plado structures of a domain built from it, i.e. everything a domain needs
+    to be constructed without encoding, parsing nor compiling anything.
+
+    Args:
+        beluga_problem (BelugaProblem): decoded Beluga problem
+        problem_name (str): name of the problem (as passed to the domain)
+        variant (Variant): planning variant of the encoding
+        domain_str (str): PDDL domain
+        pddl_problem (PDDLProblem): encoded PDDL problem
+        pddl_problem_name (str): name of the PDDL problem
+        plado_problem (pddl.Problem): normalized plado problem
+        task (Task): plado task
+        check_goal (GoalChecker): goal checker of the task
+        aops_gen (PladoApplicableActionsGenerator | IncrementalApplicableActionsGenerator): applicable actions generator of the task
+        succ_gen (SuccessorGenerator): successor generator of the task
+    """
+
+    def __init__(
+        self,
+        beluga_problem: BelugaProblem,
+        problem_name: str,
+        variant: Variant,
+        domain_str: str,
+        pddl_problem: PDDLProblem,
+        pddl_problem_name: str,
+        plado_problem: pddl.Problem,
+        task: Task,
+        check_goal: GoalChecker,
+        aops_gen: PladoApplicableActionsGenerator | IncrementalApplicableActionsGenerator,
+        succ_gen: SuccessorGenerator,
+    ) -> None:
+        self.beluga_problem: BelugaProblem = beluga_problem
+        self.problem_name: str = problem_name
+        self.variant: Variant = variant
+        self.domain_str: str = domain_str
+        self.pddl_problem: PDDLProblem = pddl_problem
+        self.pddl_problem_name: str = pddl_problem_name
+        self.plado_problem: pddl.Problem = plado_problem
+        self.task: Task = task
+        self.check_goal: GoalChecker = check_goal
+        self.aops_gen: (
+            PladoApplicableActionsGenerator | IncrementalApplicableActionsGenerator
+        ) = aops_gen
+        self.succ_gen: SuccessorGenerator = succ_gen
+
+
+def _restore_engine(state: dict[str, Any]) -> DatalogEngine:
+    engine = DatalogEngine.__new__(DatalogEngine)
+    engine.__dict__.update(state)
+    engine.bin = marshal.loads(state["bin"])
+    engine.execute_datalog_engine = types.FunctionType(
+        marshal.loads(state["execute_datalog_engine"]),
+        {"__builtins__": builtins},
+        "generated_datalog_engine",
+    )
+    return engine
+
+
+def _reduce_engine(engine: DatalogEngine) -> tuple:
+    # The generated code of the engines is stored compiled, so that loading a
+    # snapshot does not run the query planner nor the compiler again
+    state = dict(engine.__dict__)
+    state["bin"] = marshal.dumps(engine.bin)
+    state["execute_datalog_engine"] = marshal.dumps(
+        engine.execute_datalog_engine.__code__
+    )
+    return _restore_engine, (state,)
+
+
+class _SnapshotPickler(pickle.Pickler):
+    dispatch_table = copyreg.dispatch_table.copy()
+    dispatch_table[DatalogEngine] = _reduce_engine
+
+
+def write_snapshot(path: os.PathLike, snapshot: Snapshot) -> None:
+    """Writes a snapshot file. The file is written to a temporary file first and
+    then renamed, so that concurrent readers never see a partially written one.
+
+    Args:
+        path (os.PathLike): path of the snapshot file
+        snapshot (Snapshot): snapshot to write
+    """
+    buffer = io.BytesIO()
+    _SnapshotPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(snapshot)
+    payload = buffer.getbuffer()
+    tag = _environment_tag()
+    directory = os.path.dirname(os.path.abspath(path))
+    with NamedTemporaryFile("wb", dir=directory, delete=False) as f:
+        f.write(
+            _HEADER.pack(
+                _MAGIC,
+                SNAPSHOT_VERSION,
+                len(payload),
+                hashlib.sha256(payload).digest(),
+                len(tag),
+            )
+        )
+        f.write(tag)
+        f.write(payload)
+    os.replace(f.name, path)
+
+
+def read_snapshot(path: os.PathLike) -> Snapshot:
+    """Reads a snapshot file, checking its format version, the environment it was
+    written in and the integrity of its content
+
+    Args:
+        path (os.PathLike): path of the snapshot file
+
+    Raises:
+        SnapshotError: if the file is not a valid snapshot for this environment
+
+    Returns:
+        Snapshot: The snapshot
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < _HEADER.size:
+            raise SnapshotError(f"{path} is not a Beluga snapshot")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, file_version, length, digest, tag_length = _HEADER.unpack_from(data)
+            if magic != _MAGIC:
+                raise SnapshotError(f"{path} is not a Beluga snapshot")
+            if file_version != SNAPSHOT_VERSION:
+                raise SnapshotError(
+                    f"{path} has format version {file_version}, expected {SNAPSHOT_VERSION}"
+                )
+            start = _HEADER.size + tag_length
+            tag = data[_HEADER.size : start]
+            if tag != _environment_tag():
+                raise SnapshotError(
+                    f"{path} was written by an incompatible environment ({tag.decode(errors='replace')})"
+                )
+            if len(data) != start + length:
+                raise SnapshotError(f"{path} is truncated")
+            with memoryview(data)[start:] as payload:
+                if hashlib.sha256(payload).digest() != digest:
+                    raise SnapshotError(f"{path} is corrupted (checksum mismatch)")
+                snapshot = pickle.loads(payload)
+    if not isinstance(snapshot, Snapshot):
+        raise SnapshotError(f"{path} does not contain a snapshot")
+    return snapshot
+
+
+def snapshot_key(
+    source_json: str,
+    problem_name: str,
+    variant: Variant,
+    state_json: str | None = None,
+) -> str:
+    """Key of the snapshot of a problem in a SnapshotCache
+
+    Args:
+        source_json (str): JSON representation of the Beluga problem
+        problem_name (str): name of the problem (as passed to the domain)
+        variant (Variant): planning variant of the encoding
+        state_json (str, optional): JSON representation of the initial state, if
+        it is not the one of the problem. Defaults to None.
+
+    Returns:
+        str: Hexadecimal sha256 hash identifying the snapshot
+    """
+    h = hashlib.sha256()
+    h.update(
+        json.dumps(
+            [SNAPSHOT_VERSION, problem_name, sorted(vars(variant).items())]
+        ).encode()
+    )
+    h.update(b"\0" + source_json.encode())
+    if state_json is not None:
+        h.update(b"\0" + state_json.encode())
+    return h.hexdigest()
+
+
+class SnapshotCache:
+    """Directory of snapshot files named after their keys (see `snapshot_key`)
+
+    Args:
+        directory (os.PathLike): cache directory, created if needed
+    """
+
+    def __init__(self, directory: os.PathLike) -> None:
+        self.directory: os.PathLike = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".snapshot")
+
+    def load(self, key: str) -> Snapshot | None:
+        """Returns the snapshot stored with the given key, or None if there is no
+        valid one (invalid snapshots are removed from the cache)"""
+        path = self.path(key)
+        try:
+            return read_snapshot(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Besides SnapshotError, unpickling a snapshot written by other code
+            # may raise about anything (AttributeError, ModuleNotFoundError, ...)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+
+    def store(self, key: str, snapshot: Snapshot) -> None:
+        write_snapshot(self.path(key), snapshot)
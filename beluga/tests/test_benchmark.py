@@ -0,0 +1,41 @@
+import json
+import os
+
+import benchmark
+from beluga_lib.beluga_problem import BelugaProblemDecoder
+from simulation import make_controller, make_domain, run_episode
+
+PROBLEM_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "problems")
+PROBLEM_NAME = "medium_instance3.json"
+PROBLEM_PATH = os.path.join(PROBLEM_FOLDER, PROBLEM_NAME)
+MAX_STEPS = 30
+
+
+def _simulation_domain(domain_seed):
+    """The domain built by simulation.py with the given seed"""
+    with open(PROBLEM_PATH, "r") as fp:
+        inst = json.load(fp, cls=BelugaProblemDecoder)
+    return make_domain(inst, PROBLEM_NAME, PROBLEM_FOLDER, domain_seed)
+
+
+def _flight_order(domain):
+    domain.reset()
+    return [domain.task.objects[o] for o in domain.template.flight_ids]
+
+
+def test_benchmark_episodes_match_simulation():
+    # The first run compiles the problem, the next ones reuse it with other seeds
+    for domain_seed in (3, 5, 6):
+        domain = benchmark._load_problem(PROBLEM_PATH, domain_seed, benchmark.Profiler())
+        assert _flight_order(domain) == _flight_order(_simulation_domain(domain_seed))
+
+
+def test_benchmark_rows_match_simulation():
+    for domain_seed in (3, 5):
+        for controller_name in ("random", "median"):
+            row = benchmark.run((PROBLEM_PATH, controller_name, domain_seed, 7, MAX_STEPS))
+            assert row["error"] == ""
+            domain = _simulation_domain(domain_seed)
+            controller, _ = make_controller(controller_name, domain, 7)
+            outcome = run_episode(domain, controller, MAX_STEPS)
+            assert {k: row[k] for k in outcome} == outcome
@@ -0,0 +1,102 @@
+import json
+import os
+import subprocess
+import sys
+
+PROBLEM_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "problems")
+MAX_STEPS = 30
+
+# Simulates an episode of a domain using a snapshot cache, and checks that the
+# objects loaded from the snapshot compare equal to (and hash as) copies built
+# anew from their components in the current process. When asked to, the elements
+# of the snapshot are hashed and the snapshot is written again, so that it
+# contains whatever the objects cache once hashed
+SCRIPT = """
+import json
+import os
+import sys
+
+from beluga_lib.beluga_problem import BelugaProblemDecoder
+from beluga_lib.jigs import Jig
+from controller import RandomController
+from encoder.pddl import PDDLParam, PDDLPredicate
+from skd_domains.skd_spddl_domain import SkdSPDDLDomain
+from skd_domains.snapshot import read_snapshot, write_snapshot
+
+problem_path, snapshot_dir, max_steps = sys.argv[1], sys.argv[2], int(sys.argv[3])
+rewrite = sys.argv[4] == "rewrite"
+with open(problem_path, "r") as fp:
+    inst = json.load(fp, cls=BelugaProblemDecoder)
+domain = SkdSPDDLDomain(inst, "problem.json", seed=5, classic=True, snapshot_dir=snapshot_dir)
+controller = RandomController(domain, seed=3)
+s = domain.reset()
+trajectory = [str(s)]
+for _ in range(max_steps):
+    if domain._is_terminal(s):
+        break
+    a = controller.control(s)
+    o = domain.step(a)
+    s = o.observation
+    trajectory += [str(a), o.value.reward, str(s)]
+
+def of_type(elements, cls):
+    return set(x for x in elements if type(x) is cls)
+
+jigs = set(domain.beluga_problem.jigs.values())
+objects = of_type(domain.pddl_problem.objects, PDDLParam)
+init = of_type(domain.pddl_problem.init, PDDLPredicate)
+json.dump({
+    "trajectory": trajectory,
+    "jigs": all(Jig(j.name, j.type) in jigs for j in jigs),
+    "objects": len(objects) > 0 and all(PDDLParam(o.name, o.type) in objects for o in objects),
+    "init": len(init) > 0 and all(
+        PDDLPredicate(p.name, *(PDDLParam(a.name, a.type) for a in p.args), negated=p.negated) in init
+        for p in init
+    ),
+}, sys.stdout)
+
+if rewrite:
+    path = os.path.join(snapshot_dir, os.listdir(snapshot_dir)[0])
+    snapshot = read_snapshot(path)
+    hash(frozenset(snapshot.beluga_problem.jigs.values()))
+    hash(frozenset(snapshot.pddl_problem.objects))
+    hash(frozenset(snapshot.pddl_problem.init))
+    write_snapshot(path, snapshot)
+"""
+
+
+def _run(problem_path, snapshot_dir, hash_seed, rewrite=False):
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed))
+    res = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            SCRIPT,
+            problem_path,
+            snapshot_dir,
+            str(MAX_STEPS),
+            "rewrite" if rewrite else "",
+        ],
+        cwd=os.path.dirname(PROBLEM_FOLDER),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(res.stdout)
+
+
+def test_snapshot_round_trip_across_hash_seeds(tmp_path):
+    problem_path = os.path.join(PROBLEM_FOLDER, "small_instance1.json")
+    snapshot_dir = str(tmp_path)
+    # The first process writes the snapshot, the second one loads it
+    written = _run(problem_path, snapshot_dir, 1, rewrite=True)
+    files = os.listdir(snapshot_dir)
+    assert len(files) == 1
+    mtime = os.path.getmtime(os.path.join(snapshot_dir, files[0]))
+    loaded = _run(problem_path, snapshot_dir, 2)
+    assert os.listdir(snapshot_dir) == files
+    assert os.path.getmtime(os.path.join(snapshot_dir, files[0])) == mtime
+    for outcome in (written, loaded):
+        assert outcome["jigs"] and outcome["objects"] and outcome["init"]
+    assert loaded["trajectory"] == written["trajectory"]
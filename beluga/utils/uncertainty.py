@@ -1,10 +1,9 @@
-from beluga_lib import BelugaProblem
+from beluga_lib import BelugaProblem, ScenarioView
 import numpy as np
 from importlib import resources
 from . import configuration
 import json
 from typing import Iterable
-import copy
 
 def add_reference_arrivals(prb : BelugaProblem,
                            seed : int,
@@ -145,10 +144,8 @@ class ArrivalSampler:
         assert(size is None or size > 0)
         # Sample sequences of flights
         flight_seq, times = self.sample_flight_sequences(prb, size, seed, rebase)
-        # Use the sequeces to initialize multiple copies of the original problem
-        prb_seq = [copy.deepcopy(prb) for s in flight_seq]
-        for p, s in zip(prb_seq, flight_seq):
-            p.flights = s
+        # Use the sequeces to initialize multiple views of the original problem
+        prb_seq = [ScenarioView(prb, s) for s in flight_seq]
         # Return results
         return prb_seq, times
 